@@ -8,36 +8,75 @@ def main():
     cfg = Config()
     pathlib.PosixPath = Utils.fix_pathlib()
 
-    image_processor = ImageProcessor()
+    # Unrelated still images gain nothing from tracking the previous face position;
+    # the tracked crop only covers one face, so several faces always use the full frame
+    multiple_faces = cfg.mode == 'camera' and cfg.camera_max_faces > 1
+    image_processor = ImageProcessor(
+        roi_tracking=cfg.face_roi_tracking and cfg.mode != 'image'
+        and not multiple_faces,
+        roi_size=cfg.face_roi_size,
+        roi_margin=cfg.face_roi_margin,
+        max_num_faces=cfg.camera_max_faces if multiple_faces else 1)
+    # Still images are never gated; camera and video frames reuse landmarks of unchanged frames
+    if cfg.motion_gate_threshold is not None and cfg.mode != 'image':
+        image_processor = MotionGate(
+            image_processor, cfg.motion_gate_threshold,
+            max_reused_frames=cfg.motion_gate_max_reused_frames)
     coordinates_parser = CoordinatesParser()
     classifier = RandomForest(activation_certainty=0.5,
-                              prediction_memory_size=50)
+                              prediction_memory_size=50,
+                              cache_size=cfg.classifier_cache_size,
+                              cache_resolution=cfg.classifier_cache_resolution)
 
     perclos_finder = PerclosFinder(
-        cfg.perclos_threshold)
+        cfg.perclos_threshold, cfg.perclos_windows)
     yawn_finder = YawnFinder(cfg.yawn_threshold)
     face_angle_finder = angle_finder.AngleFinder()
 
     if cfg.mode == 'camera':
-        camera = cv2.VideoCapture(0)
+        camera = CameraCapture(cfg.camera_index,
+                               cfg.camera_resolution,
+                               cfg.camera_fourcc,
+                               cfg.camera_buffer_size,
+                               cfg.camera_fps)
         if not camera.isOpened():
             raise IOError("Camera access failed")
+        camera.start()
 
         data_saver = DataSaver(cfg.results_name)
         gui = GUI()
 
+        # Landmark extrapolation follows a single face
+        inference_scheduler = None
+        if cfg.camera_inference_budget and not multiple_faces:
+            inference_scheduler = InferenceScheduler(
+                cfg.perclos_threshold, cfg.yawn_threshold,
+                cfg.camera_inference_budget,
+                cfg.camera_max_skipped_frames)
+
         camera_mode = CameraMode(
             camera, image_processor, coordinates_parser,
             data_saver,
             perclos_finder, yawn_finder, face_angle_finder,
-            classifier, gui
+            classifier, gui,
+            inference_scheduler=inference_scheduler,
+            presence_detector=PresenceDetector()
+            if cfg.camera_idle_timeout is not None else None,
+            idle_timeout=cfg.camera_idle_timeout,
+            idle_frame_interval=cfg.camera_idle_frame_interval,
+            preview_scale=cfg.camera_preview_scale,
+            face_tracker=FaceTracker() if multiple_faces else None
         )
 
         thread = threading.Thread(target=camera_mode.run,
                                   daemon=True)
         thread.start()
         gui.start()
+        camera_mode.stop()
         camera.release()
+        thread.join(timeout=5.0)
+        # The detection thread may give up on the writer before it has drained
+        camera_mode.close()
 
     elif cfg.mode == 'image':
         folders = [
@@ -65,7 +104,13 @@ def main():
                                    "evaluation"]:
             processor = VideoProcessor(
                 image_processor, perclos_finder,
-                yawn_finder, face_angle_finder, classifier
+                yawn_finder, face_angle_finder, classifier,
+                file_format=cfg.file_format,
+                frame_stride=cfg.video_frame_stride,
+                landmark_cache=LandmarkCache(cfg.landmark_cache_folder,
+                                             cfg.landmark_cache_dtype)
+                if cfg.landmark_cache_folder else None,
+                batch_prediction=cfg.video_batch_prediction
             )
 
             folder = cfg.training_folder if cfg.processing_mode == "training" else cfg.validation_folder
@@ -76,16 +121,27 @@ def main():
             videos = [f for f in folder.rglob('*') if
                       f.is_file() and f.suffix in ['.mp4',
                                                    '.avi']]
-            with tqdm(total=len(videos),
-                      desc="Processing videos") as pbar:
-                for video in videos:
-                    print(f"Processing: {video.name}")
-                    save_path = processor.process_video(video,
-                                                        output,
-                                                        cfg.processing_mode,
-                                                        cfg.dataset)
-                    # print(f"Saved to5: {save_path}")
-                    pbar.update(1)
+            if cfg.video_workers == 1:
+                with tqdm(total=len(videos),
+                          desc="Processing videos") as pbar:
+                    for video in videos:
+                        print(f"Processing: {video.name}")
+                        save_path = processor.process_video(video,
+                                                            output,
+                                                            cfg.processing_mode,
+                                                            cfg.dataset)
+                        # print(f"Saved to5: {save_path}")
+                        pbar.update(1)
+            elif cfg.video_segment_seconds:
+                runner = ParallelVideoRunner(cfg, cfg.video_workers)
+                runner.run_sharded(videos, output, cfg.processing_mode,
+                                   cfg.dataset, processor,
+                                   cfg.video_segment_seconds,
+                                   cfg.video_warmup_seconds)
+            else:
+                runner = ParallelVideoRunner(cfg, cfg.video_workers)
+                runner.run(videos, output, cfg.processing_mode,
+                           cfg.dataset)
 
         elif cfg.processing_mode == "apply_drowsiness":
             if cfg.dataset == 'nthuddd':
@@ -111,14 +167,15 @@ def main():
         training_folder = cfg.output_folder / "Training"
         validation_folder = cfg.output_folder / "Validation"
         sequence_data_folder = cfg.output_folder / "Sequenced_data"
+        sequence_suffix = DataSaver.FILE_FORMATS[cfg.file_format]
 
 
 
         for i in range(0, 7):
             seq_length = 2 ** i
 
-            training_save_path = sequence_data_folder / f"train_drozy_seq_{seq_length}.csv"
-            validation_save_path = sequence_data_folder / f"val_drozy_seq_{seq_length}.csv"
+            training_save_path = sequence_data_folder / f"train_drozy_seq_{seq_length}{sequence_suffix}"
+            validation_save_path = sequence_data_folder / f"val_drozy_seq_{seq_length}{sequence_suffix}"
 
             training_dataset_creator = DatasetCreator(
                 load_folder=training_folder,
@@ -134,6 +191,44 @@ def main():
                   F"Training_dataset: {training_save_path} \n"
                   F"Validation_dataset: {validation_save_path}")
 
+    elif cfg.mode == 'sweep':
+        # The sweep replays the landmarks cached by a "training" video run
+        # against the labels applied to its result files
+        if not cfg.landmark_cache_folder:
+            raise ValueError("Sweep mode requires landmark_cache_folder")
+        landmark_cache = LandmarkCache(cfg.landmark_cache_folder,
+                                       cfg.landmark_cache_dtype)
+        processor = VideoProcessor(
+            image_processor, perclos_finder,
+            yawn_finder, face_angle_finder, classifier,
+            frame_stride=cfg.video_frame_stride,
+            landmark_cache=landmark_cache
+        )
+
+        entries = []
+        for video in [f for f in cfg.training_folder.rglob('*') if
+                      f.is_file() and f.suffix in ['.mp4', '.avi']]:
+            entry = processor.find_cached_result(
+                video, cfg.output_folder / "Training", "training",
+                cfg.dataset)
+            if entry is None:
+                print(f"No cached landmarks or results for: {video.name}")
+                continue
+            entries.append(entry)
+
+        sweep = ThresholdSweep(
+            landmark_cache,
+            cfg.sweep_perclos_thresholds, cfg.sweep_perclos_windows,
+            cfg.sweep_perclos_bands, cfg.sweep_memory_sizes,
+            cfg.sweep_activation_certainties, cfg.sweep_yawn_thresholds,
+            worker_count=cfg.video_workers)
+        report = sweep.run(entries)
+
+        report_path = cfg.output_folder / "threshold_sweep.csv"
+        report.to_csv(report_path, index=False)
+        print(report.head(10).to_string(index=False))
+        print(f"Sweep report saved to: {report_path}")
+
 
 if __name__ == "__main__":
     try:
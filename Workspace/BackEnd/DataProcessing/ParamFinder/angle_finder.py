@@ -1,6 +1,7 @@
 import math
 import numpy as np
-from typing import Tuple, Any
+from typing import Tuple, Any, Optional
+from Workspace.Utilities import RollingWindow
 from .param_finder import ParamFinder
 
 
@@ -10,95 +11,121 @@ class AngleFinder(ParamFinder):
     na podstawie wybranych wskaźników (landmarków) twarzy pochodzących z MediaPipe.
     """
 
-    def __init__(self, roll_memory_size = 15, pitch_memory_size = 15) -> None:
+    def __init__(self, roll_window: float = 0.5, pitch_window: float = 0.5) -> None:
         """
         Inicjalizuje obiekt AngleFinder poprzez zdefiniowanie zbioru par indeksów,
-        na których będzie przeprowadzana analiza kąta pochylenia twarzy.
+        na których będzie przeprowadzana analiza kąta pochylenia twarzy, oraz okien
+        czasowych, w których kąty są uśredniane.
+
+        :param roll_window: Długość okna uśredniania kąta roll w sekundach.
+        :type roll_window: float
+        :param pitch_window: Długość okna uśredniania kąta pitch w sekundach.
+        :type pitch_window: float
         """
         self.face_oval_indices: np.ndarray = np.array([[109, 148], [10, 152], [338, 377]])
-        self.roll_memory = np.array(np.zeros(roll_memory_size))
-        self.pitch_memory = np.array(np.zeros(pitch_memory_size))
+        self.roll_memory = RollingWindow.for_duration((roll_window,), self.max_frame_rate)
+        self.pitch_memory = RollingWindow.for_duration((pitch_window,), self.max_frame_rate)
 
     def reset_memory(self):
-        self.roll_memory = np.array(np.zeros(len(self.roll_memory)))
-        self.pitch_memory = np.array(np.zeros(len(self.pitch_memory)))
+        self.roll_memory.reset()
+        self.pitch_memory.reset()
 
-    def find_parameter(self, face_coords: Any) -> Tuple[float, float]:
+    def find_parameter(self, face_coords: Any, timestamp: Optional[float] = None) -> Tuple[float, float]:
         """
         Główna metoda interfejsu ParamFinder. Zwraca kąt przechylenia (roll)
         i kąt pochylenia (pitch) twarzy dla przekazanego zestawu współrzędnych.
 
         :param face_coords: Wynik działania biblioteki MediaPipe, zawierający
-                            obiekt multi_face_landmarks z wykrytymi punktami twarzy.
+                            obiekt multi_face_landmarks z wykrytymi punktami twarzy,
+                            lub tablica landmarków o kształcie (twarze, 478, 3).
                             Zwykle: face_mesh_results = mediapipe.python.solutions.face_mesh.FaceMesh.process(image)
         :type face_coords: Any (np. obiekt z atrybutem multi_face_landmarks)
+        :param timestamp: Znacznik czasu klatki w sekundach (domyślnie bieżący czas).
+        :type timestamp: float lub None
         :return: Krotka (roll, pitch) wyrażona w stopniach.
         :rtype: Tuple[float, float]
         """
-        roll, pitch = self._find_face_angle(face_coords)
+        roll, pitch = self._find_face_angle(face_coords, self._resolve_timestamp(timestamp))
         return roll, pitch
 
-    def _find_face_angle(self, face_coords: Any) -> Tuple[float, float]:
+    def find_parameters_batch(self, landmarks: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wektorowa wersja find_parameter() dla serii klatek. Kąty liczone są jednocześnie
+        dla wszystkich klatek z wykrytą twarzą, a średnie kroczące wyznaczane są
+        na podstawie sum skumulowanych okien czasowych.
+
+        :param landmarks: Tablica landmarków o kształcie (N, 478, 3), z NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        :param timestamps: Niemalejące znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Krotka (roll, pitch) - tablice o kształcie (N,) w stopniach.
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        landmarks, timestamps, has_face = self._prepare_batch(landmarks, timestamps)
+        mean_roll = np.zeros(len(timestamps))
+        mean_pitch = np.zeros(len(timestamps))
+
+        if has_face.any():
+            roll_estimates, pitch_estimates = self._calculate_euler_angles(
+                landmarks[has_face], self.face_oval_indices[0:-1])
+            face_timestamps = timestamps[has_face]
+
+            roll_sums, roll_sizes = self.roll_memory.push_batch(roll_estimates.mean(axis=-1), face_timestamps)
+            pitch_sums, pitch_sizes = self.pitch_memory.push_batch(pitch_estimates.mean(axis=-1), face_timestamps)
+            mean_roll[has_face] = roll_sums[:, 0] / roll_sizes[:, 0]
+            mean_pitch[has_face] = pitch_sums[:, 0] / pitch_sizes[:, 0]
+
+        return mean_roll, mean_pitch
+
+    def _find_face_angle(self, face_coords: Any, timestamp: float) -> Tuple[float, float]:
         """
         Oblicza średnie wartości kąta przechylenia (roll) i pochylenia (pitch) twarzy,
-        bazując na parach punktów w `self.face_oval_indices`.
+        bazując na parach punktów w `self.face_oval_indices`, uśrednione w oknie czasowym.
 
-        :param face_coords: Obiekt zawierający listę wykrytych twarzy (multi_face_landmarks).
+        :param face_coords: Wynik MediaPipe lub tablica landmarków o kształcie (twarze, 478, 3).
         :type face_coords: Any
+        :param timestamp: Znacznik czasu klatki w sekundach.
+        :type timestamp: float
         :return: Krotka (roll, pitch) w stopniach (lub (0, 0), jeśli nie wykryto żadnej twarzy).
         :rtype: Tuple[float, float]
         """
-        if face_coords.multi_face_landmarks:
-            for face_mesh in face_coords.multi_face_landmarks:
-                roll_estimates = []
-                pitch_estimates = []
-
-                # Pobieranie kątów dla każdej pary wskaźników zdefiniowanej w face_oval_indices
-                for pair in self.face_oval_indices[0:-1]:
-                    roll_val, pitch_val = self._calculate_euler_angles(face_mesh, pair)
-                    roll_estimates.append(roll_val)
-                    pitch_estimates.append(pitch_val)
+        landmarks = self._as_landmark_array(face_coords)
+        if len(landmarks):
+            # Pobieranie kątów dla każdej pary wskaźników zdefiniowanej w face_oval_indices
+            roll_estimates, pitch_estimates = self._calculate_euler_angles(
+                landmarks[0], self.face_oval_indices[0:-1])
 
             roll = float(np.mean(roll_estimates))
             pitch = float(np.mean(pitch_estimates))
-            self.roll_memory = np.roll(self.roll_memory, -1)
-            self.pitch_memory = np.roll(self.pitch_memory, -1)
-            self.roll_memory[-1] = roll
-            self.pitch_memory[-1] = pitch
+            self.roll_memory.push(roll, timestamp)
+            self.pitch_memory.push(pitch, timestamp)
 
-            mean_roll = float(np.mean(self.roll_memory))
-            mean_pitch = float(np.mean(self.pitch_memory))
+            mean_roll = self.roll_memory.mean()
+            mean_pitch = self.pitch_memory.mean()
 
             return mean_roll, mean_pitch
         else:
             return 0.0, 0.0
 
     @staticmethod
-    def _calculate_euler_angles(face_mesh: Any, pair: np.ndarray) -> Tuple[float, float]:
+    def _calculate_euler_angles(landmarks: np.ndarray, pairs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
-        Na podstawie dwóch wskaźników (landmarków) twarzy oblicza kąt przechylenia (roll)
-        oraz kąt pochylenia (pitch) w stopniach.
-
-        :param face_mesh: Pojedynczy obiekt reprezentujący twarz (np. jeden element z multi_face_landmarks).
-        :type face_mesh: Any
-        :param pair: Tablica zawierająca dwa indeksy landmarków (np. [10, 152]).
-        :type pair: np.ndarray
-        :return: Krotka (roll, pitch) w stopniach.
-        :rtype: Tuple[float, float]
+        Na podstawie par wskaźników (landmarków) twarzy oblicza kąt przechylenia (roll)
+        oraz kąt pochylenia (pitch) w stopniach, osobno dla każdej pary.
+
+        :param landmarks: Tablica landmarków o kształcie (..., 478, 3).
+        :type landmarks: np.ndarray
+        :param pairs: Tablica par indeksów landmarków (np. [[109, 148], [10, 152]]).
+        :type pairs: np.ndarray
+        :return: Krotka (roll, pitch) w stopniach, każda o kształcie (..., liczba_par).
+        :rtype: Tuple[np.ndarray, np.ndarray]
         """
-        x2 = face_mesh.landmark[pair[0]].x
-        y2 = face_mesh.landmark[pair[0]].y
-        z2 = face_mesh.landmark[pair[0]].z
-
-        x1 = face_mesh.landmark[pair[1]].x
-        y1 = face_mesh.landmark[pair[1]].y
-        z1 = face_mesh.landmark[pair[1]].z
-
-        delta_x = x2 - x1
-        delta_y = y2 - y1
-        delta_z = z2 - z1
+        delta = landmarks[..., pairs[:, 0], :].astype(np.float64) - landmarks[..., pairs[:, 1], :]
+        delta_x = np.ascontiguousarray(delta[..., 0])
+        delta_y = np.ascontiguousarray(delta[..., 1])
+        delta_z = np.ascontiguousarray(delta[..., 2])
 
         # Obliczenia kątów w stopniach (atan2 zwraca wynik w radianach).
-        roll = math.atan2(delta_y, delta_x) * 180.0 / math.pi + 90
-        pitch = math.atan2(delta_y, delta_z) * 180.0 / math.pi + 90
+        roll = np.arctan2(delta_y, delta_x) * 180.0 / math.pi + 90
+        pitch = np.arctan2(delta_y, delta_z) * 180.0 / math.pi + 90
         return roll, pitch
@@ -1,13 +1,23 @@
 import abc
-from typing import Any
+import time
+import numpy as np
+from typing import Any, Optional, Tuple
+from Workspace.Utilities import Utils
 
 
 class ParamFinder(metaclass=abc.ABCMeta):
     """
     Klasa abstrakcyjna odpowiedzialna za wyznaczanie konkretnego
     parametru na podstawie współrzędnych twarzy.
+
+    Okna czasowe (pamięci) klas pochodnych definiowane są w sekundach i przesuwane na
+    podstawie znaczników czasu kolejnych klatek, dzięki czemu ich znaczenie nie zależy
+    od liczby klatek na sekundę.
     """
 
+    # Maksymalna spodziewana liczba klatek na sekundę - wyznacza rozmiar buforów okien czasowych.
+    max_frame_rate: float = 120.0
+
     @abc.abstractmethod
     def __init__(self) -> None:
         """
@@ -16,15 +26,110 @@ class ParamFinder(metaclass=abc.ABCMeta):
         pass
 
     @abc.abstractmethod
-    def find_parameter(self, face_coords: Any) -> Any:
+    def find_parameter(self, face_coords: Any, timestamp: Optional[float] = None) -> Any:
         """
         Metoda abstrakcyjna do zwrócenia szukanego parametru
         na podstawie wskaźników (landmarków) na twarzy.
 
         :param face_coords: Obiekt zawierający współrzędne twarzy
-                            (np. z biblioteki MediaPipe).
+                            (wynik MediaPipe lub tablica landmarków o kształcie (twarze, 478, 3)).
         :type face_coords: Any
+        :param timestamp: Znacznik czasu klatki w sekundach. Gdy nie zostanie podany,
+                          używany jest bieżący czas monotoniczny.
+        :type timestamp: float lub None
         :return: Wartosc lub obiekt reprezentujący wyliczony parametr.
         :rtype: Any
         """
         pass
+
+    def find_parameters_batch(self, landmarks: np.ndarray, timestamps: np.ndarray) -> Any:
+        """
+        Wyznacza parametr dla całej serii klatek (np. fragmentu nagrania przetwarzanego offline).
+        Wyniki są identyczne z kolejnymi wywołaniami find_parameter() dla tych samych klatek,
+        a stan okien czasowych jest kontynuowany pomiędzy kolejnymi wywołaniami.
+        Implementacja domyślna wywołuje find_parameter() klatka po klatce; klasy pochodne
+        nadpisują ją wersją wektorową.
+
+        :param landmarks: Tablica landmarków pierwszej twarzy o kształcie (N, 478, 3).
+                          Klatki bez wykrytej twarzy oznaczane są wartościami NaN.
+        :type landmarks: np.ndarray
+        :param timestamps: Niemalejące znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Tablica (lub krotka tablic) o długości N z wartościami zwracanymi przez find_parameter().
+        :rtype: Any
+        """
+        landmarks, timestamps, has_face = self._prepare_batch(landmarks, timestamps)
+        results = [
+            self.find_parameter(landmarks[index:index + 1] if has_face[index] else landmarks[:0],
+                                float(timestamps[index]))
+            for index in range(len(timestamps))
+        ]
+        if results and isinstance(results[0], tuple):
+            return tuple(np.asarray(column) for column in zip(*results))
+        return np.asarray(results)
+
+    @staticmethod
+    def _prepare_batch(landmarks: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sprawdza dane wejściowe trybu wsadowego i wyznacza maskę klatek z wykrytą twarzą.
+
+        :param landmarks: Tablica landmarków o kształcie (N, 478, 3), z NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        :param timestamps: Znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Krotka (landmarks, timestamps, has_face).
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        landmarks = np.asarray(landmarks)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if landmarks.ndim != 3 or len(landmarks) != len(timestamps):
+            raise ValueError("Batch landmarks must have shape (N, landmarks, 3) matching N timestamps")
+        if np.any(np.diff(timestamps) < 0):
+            raise ValueError("Batch timestamps must be non-decreasing")
+
+        has_face = ~np.isnan(landmarks[:, 0, 0])
+        return landmarks, timestamps, has_face
+
+    @staticmethod
+    def _resolve_timestamp(timestamp: Optional[float]) -> float:
+        """
+        Zwraca znacznik czasu klatki lub bieżący czas monotoniczny, jeżeli nie został podany.
+
+        :param timestamp: Znacznik czasu klatki w sekundach lub None.
+        :type timestamp: float lub None
+        :return: Znacznik czasu w sekundach.
+        :rtype: float
+        """
+        return time.monotonic() if timestamp is None else float(timestamp)
+
+    @staticmethod
+    def _as_landmark_array(face_coords: Any) -> np.ndarray:
+        """
+        Zwraca współrzędne twarzy w postaci tablicy NumPy (twarze, 478, 3),
+        konwertując wynik MediaPipe, jeżeli zajdzie taka potrzeba.
+
+        :param face_coords: Wynik MediaPipe lub tablica landmarków.
+        :type face_coords: Any
+        :return: Tablica landmarków dla wszystkich wykrytych twarzy.
+        :rtype: np.ndarray
+        """
+        return Utils.landmarks_to_array(face_coords)
+
+    @staticmethod
+    def _distance_2d(landmarks: np.ndarray, pairs: np.ndarray) -> np.ndarray:
+        """
+        Oblicza odległości euklidesowe w płaszczyźnie XY pomiędzy parami landmarków
+        dla wszystkich twarzy jednocześnie.
+
+        :param landmarks: Tablica landmarków o kształcie (..., 478, 3).
+        :type landmarks: np.ndarray
+        :param pairs: Tablica par indeksów o kształcie (liczba_par, 2).
+        :type pairs: np.ndarray
+        :return: Tablica odległości o kształcie (..., liczba_par).
+        :rtype: np.ndarray
+        """
+        first = landmarks[..., pairs[:, 0], :2].astype(np.float64)
+        second = landmarks[..., pairs[:, 1], :2].astype(np.float64)
+        delta_x = first[..., 0] - second[..., 0]
+        delta_y = first[..., 1] - second[..., 1]
+        return np.sqrt(delta_x * delta_x + delta_y * delta_y)
@@ -1,5 +1,6 @@
 import numpy as np
-from typing import Any, List, Tuple
+from typing import Any, Dict, Optional, Sequence, Tuple
+from Workspace.Utilities import RollingWindow
 from .param_finder import ParamFinder
 
 
@@ -9,44 +10,80 @@ class PerclosFinder(ParamFinder):
     powieki są zamknięte) na podstawie wartości EAR (Eye Aspect Ratio) dla lewego i prawego oka.
     """
 
-    def __init__(self, perclos_threshold: float) -> None:
+    def __init__(self, perclos_threshold: float, perclos_windows: Sequence[float] = (60.0,),
+                 max_frame_gap: float = 1.0) -> None:
         """
         Inicjalizuje obiekt klasy PerclosFinder, ustalając m.in. pary indeksów
         niezbędne do obliczania EAR dla lewego i prawego oka oraz próg (threshold)
         stosowany do wyznaczania PERCLOS.
 
+        PERCLOS liczony jest jako odsetek czasu (a nie liczby klatek) w oknie o zadanej
+        długości w sekundach, w którym oczy były zamknięte. Każda klatka reprezentuje czas,
+        który upłynął od poprzedniej klatki, więc zmiana liczby klatek na sekundę
+        (np. ograniczenie FPS lub zgubione klatki) nie zmienia znaczenia wskaźnika.
+        Historia przechowywana jest w prealokowanym buforze cyklicznym (RollingWindow),
+        dzięki czemu aktualizacja i odczyt PERCLOS dla każdego z okien kosztuje O(1).
+
         :param perclos_threshold: Próg, poniżej którego oko uznawane jest za zamknięte.
         :type perclos_threshold: float
+        :param perclos_windows: Długości okien (w sekundach), dla których liczony jest PERCLOS.
+                                Pierwsze okno jest oknem głównym zwracanym przez find_parameter().
+        :type perclos_windows: Sequence[float]
+        :param max_frame_gap: Maksymalny czas (w sekundach) przypisywany pojedynczej klatce,
+                              ograniczający wpływ długich przerw w strumieniu klatek.
+        :type max_frame_gap: float
         """
-        self.left_eye_indices: List[Tuple[int, int]] = [(385, 380), (387, 373), (263, 362)]
-        self.right_eye_indices: List[Tuple[int, int]] = [(160, 144), (158, 153), (133, 33)]
-        self.ear_per_face_memory: dict[int, dict[int, Tuple[float, float]]] = {1: {1: (0, 0)}}
+        self.left_eye_indices: np.ndarray = np.array([(385, 380), (387, 373), (263, 362)])
+        self.right_eye_indices: np.ndarray = np.array([(160, 144), (158, 153), (133, 33)])
         self.previous_perclos: float = 0.0
         self.perclos_threshold: float = perclos_threshold
+        self.max_frame_gap: float = max_frame_gap
+
+        if not perclos_windows or min(perclos_windows) <= 0:
+            raise ValueError("PERCLOS windows must be positive")
+        self.perclos_windows: Tuple[float, ...] = tuple(float(window) for window in perclos_windows)
+
+        # Suma czasu zamknięcia oczu w poszczególnych oknach czasowych
+        self._closed_time_memory = RollingWindow.for_duration(self.perclos_windows, self.max_frame_rate)
+        self._previous_timestamp: Optional[float] = None
 
     def reset_memory(self):
         self.previous_perclos = 0.0
+        self._closed_time_memory.reset()
+        self._previous_timestamp = None
 
-    def find_parameter(self, face_coords: Any) -> Tuple[float, float]:
+    def find_parameter(self, face_coords: Any, timestamp: Optional[float] = None) -> Tuple[float, float]:
         """
         Oblicza dwa parametry związane z oczami:
         1. PERCLOS (procent czasu, gdy oczy są zamknięte),
         2. Średnią wartość EAR (Eye Aspect Ratio) obu oczu.
 
-        :param face_coords: Współrzędne twarzy z biblioteki MediaPipe (multi_face_landmarks).
+        :param face_coords: Współrzędne twarzy z biblioteki MediaPipe (multi_face_landmarks)
+                            lub tablica landmarków o kształcie (twarze, 478, 3).
         :type face_coords: Any
+        :param timestamp: Znacznik czasu klatki w sekundach (domyślnie bieżący czas).
+        :type timestamp: float lub None
         :return: Krotka (perclos, mean_ear), gdzie:
                  - perclos (float): Obliczony procent czasu zamknięcia powiek.
                  - mean_ear (float): Średnie EAR (Eye Aspect Ratio) dla obu oczu.
         :rtype: tuple[float, float]
         """
-        left_ear = self._find_eye_aspect_ratio(face_coords, self.left_eye_indices)
-        right_ear = self._find_eye_aspect_ratio(face_coords, self.right_eye_indices)
+        timestamp = self._resolve_timestamp(timestamp)
+        landmarks = self._as_landmark_array(face_coords)
 
-        if face_coords.multi_face_landmarks:
-            perclos = self._calculate_perclos(left_ear[0], right_ear[0], 1)
+        # Czas reprezentowany przez bieżącą klatkę (od poprzedniej klatki)
+        if self._previous_timestamp is None:
+            frame_duration = 0.0
+        else:
+            frame_duration = min(max(timestamp - self._previous_timestamp, 0.0), self.max_frame_gap)
+        self._previous_timestamp = timestamp
+
+        if len(landmarks):
+            left_ear = float(self._find_eye_aspect_ratio(landmarks[0], self.left_eye_indices))
+            right_ear = float(self._find_eye_aspect_ratio(landmarks[0], self.right_eye_indices))
+            perclos = self._calculate_perclos(left_ear, right_ear, frame_duration, timestamp)
             self.previous_perclos = perclos
-            mean_ear = (left_ear[0] + right_ear[0]) / 2
+            mean_ear = (left_ear + right_ear) / 2
             mean_ear = np.clip(mean_ear, 0, 1)
         else:
             perclos = 0.0
@@ -54,91 +91,118 @@ class PerclosFinder(ParamFinder):
 
         return perclos, mean_ear
 
+    def find_parameters_batch(self, landmarks: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Wektorowa wersja find_parameter() dla serii klatek. EAR liczony jest jednocześnie
+        dla wszystkich klatek, a PERCLOS na podstawie sum skumulowanych (RollingWindow.push_batch),
+        dzięki czemu wyniki są identyczne z przetwarzaniem klatka po klatce.
+
+        :param landmarks: Tablica landmarków o kształcie (N, 478, 3), z NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        :param timestamps: Niemalejące znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Krotka (perclos, mean_ear) - tablice o kształcie (N,).
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        landmarks, timestamps, has_face = self._prepare_batch(landmarks, timestamps)
+        perclos = np.zeros(len(timestamps))
+        mean_ear = np.zeros(len(timestamps))
+        if not len(timestamps):
+            return perclos, mean_ear
+
+        # Czas reprezentowany przez każdą z klatek (od poprzedniej klatki)
+        first_previous = timestamps[0] if self._previous_timestamp is None else self._previous_timestamp
+        previous_timestamps = np.concatenate(([first_previous], timestamps[:-1]))
+        frame_durations = np.minimum(np.maximum(timestamps - previous_timestamps, 0.0), self.max_frame_gap)
+        self._previous_timestamp = float(timestamps[-1])
+
+        if has_face.any():
+            faces = landmarks[has_face]
+            left_ear = self._find_eye_aspect_ratio(faces, self.left_eye_indices)
+            right_ear = self._find_eye_aspect_ratio(faces, self.right_eye_indices)
+            mean_from_pair = (left_ear + right_ear) / 2
+
+            closed_time = np.where(mean_from_pair < self.perclos_threshold, frame_durations[has_face], 0.0)
+            sums, _ = self._closed_time_memory.push_batch(closed_time, timestamps[has_face])
+            perclos[has_face] = sums[:, 0] / self.perclos_windows[0]
+            mean_ear[has_face] = np.clip(mean_from_pair, 0, 1)
+            self.previous_perclos = float(perclos[has_face][-1])
+
+        return perclos, mean_ear
+
     @staticmethod
-    def _find_eye_aspect_ratio(face_coords: Any, indices: List[Tuple[int, int]]) -> List[float]:
+    def _find_eye_aspect_ratio(landmarks: np.ndarray, indices: np.ndarray) -> np.ndarray:
         """
         Oblicza Eye Aspect Ratio (EAR) dla zestawu twarzy na podstawie wskazanych
         indeksów landmarków oczu. Wykorzystuje pary punktów pionowych i jedną
-        parę poziomą, by wyznaczyć proporcje (delta_y/delta_x).
+        parę poziomą, by wyznaczyć proporcje (delta_y/delta_x). Obliczenia wykonywane
+        są wektorowo dla wszystkich twarzy jednocześnie.
 
-        :param face_coords: Obiekt multi_face_landmarks z biblioteki MediaPipe.
-        :type face_coords: Any
-        :param indices: Lista krotek indeksów punktów:
+        :param landmarks: Tablica landmarków o kształcie (..., 478, 3).
+        :type landmarks: np.ndarray
+        :param indices: Tablica par indeksów punktów:
                         - kilka par pionowych (np. (385,380), (387,373))
                         - jedna para pozioma (np. (263,362)).
-        :type indices: list[tuple[int, int]]
-        :return: Lista zawierająca wartości EAR dla każdej wykrytej twarzy.
-        :rtype: list[float]
+        :type indices: np.ndarray
+        :return: Tablica wartości EAR dla każdej wykrytej twarzy.
+        :rtype: np.ndarray
         """
-        all_faces_ear: List[float] = []
-        if face_coords.multi_face_landmarks:
-            for face_mesh in face_coords.multi_face_landmarks:
-                all_delta_ver_dist = np.array([])
-                # Obliczanie odległości pionowych
-                for pair in indices[:-1]:
-                    y2 = face_mesh.landmark[pair[0]].y
-                    x2 = face_mesh.landmark[pair[0]].x
-                    y1 = face_mesh.landmark[pair[1]].y
-                    x1 = face_mesh.landmark[pair[1]].x
-
-                    delta_ver_dist = ((y2 - y1) ** 2 + (x2 - x1) ** 2) ** 0.5
-                    all_delta_ver_dist = np.append(all_delta_ver_dist, delta_ver_dist)
-
-                # Obliczanie odległości poziomej
-                y2 = face_mesh.landmark[indices[-1][0]].y
-                x2 = face_mesh.landmark[indices[-1][0]].x
-                y1 = face_mesh.landmark[indices[-1][1]].y
-                x1 = face_mesh.landmark[indices[-1][1]].x
-                hor_distance = ((y2 - y1) ** 2 + (x2 - x1) ** 2) ** 0.5
-
-                # EAR = (średnia z pionowych) / pozioma
-                mean_ver_distance = float(np.mean(all_delta_ver_dist))
-                eye_aspect_ratio = mean_ver_distance / hor_distance
-                # Zakładamy, że wartość EAR nie może przekroczyć 1
-                eye_aspect_ratio = np.clip(eye_aspect_ratio, 0, 1)
-                all_faces_ear.append(float(eye_aspect_ratio))
-
-        return all_faces_ear
+        distances = ParamFinder._distance_2d(landmarks, indices)
+
+        # EAR = (średnia z pionowych) / pozioma
+        mean_ver_distance = distances[..., :-1].mean(axis=-1)
+        eye_aspect_ratio = mean_ver_distance / distances[..., -1]
+        # Zakładamy, że wartość EAR nie może przekroczyć 1
+        return np.clip(eye_aspect_ratio, 0, 1)
 
     def _calculate_perclos(
         self,
         left_eye_aspect_ratio: float,
         right_eye_aspect_ratio: float,
-        memory_key: int
+        frame_duration: float,
+        timestamp: float
     ) -> float:
         """
-        Oblicza współczynnik PERCLOS (procent czasu, gdy oczy są zamknięte), bazując na historii
-        odczytów EAR dla danej twarzy (zidentyfikowanej przez 'memory_key'). Dla każdej klatki
-        obliczana jest średnia EAR z obydwu oczu i porównywana z progiem (self.perclos_threshold).
+        Oblicza współczynnik PERCLOS (procent czasu, gdy oczy są zamknięte) dla głównego okna.
+        Dla każdej klatki obliczana jest średnia EAR z obydwu oczu i porównywana z progiem
+        (self.perclos_threshold); czas trwania klatki zamkniętej dopisywany jest do okna.
 
         :param left_eye_aspect_ratio: EAR lewego oka.
         :type left_eye_aspect_ratio: float
         :param right_eye_aspect_ratio: EAR prawego oka.
         :type right_eye_aspect_ratio: float
-        :param memory_key: Unikalny identyfikator twarzy, dla której liczymy PERCLOS.
-        :type memory_key: int
-        :return: Procent klatek, w których oczy były uznane za zamknięte.
+        :param frame_duration: Czas (w sekundach) reprezentowany przez bieżącą klatkę.
+        :type frame_duration: float
+        :param timestamp: Znacznik czasu klatki w sekundach.
+        :type timestamp: float
+        :return: Odsetek czasu w oknie, w którym oczy były uznane za zamknięte.
         :rtype: float
         """
-        period = 1800  # liczba klatek uwzględnianych w pamięci (np. 1800 ~ 60s przy 60 FPS)
-
-        # Usunięcie najstarszego wpisu, jeśli osiągnięto limit 'period'
-        if len(self.ear_per_face_memory[memory_key]) >= period:
-            oldest_frame = min(self.ear_per_face_memory[memory_key].keys())
-            del self.ear_per_face_memory[memory_key][oldest_frame]
-
-        # Dodanie nowego wpisu dla aktualnej klatki
-        latest_frame = max(self.ear_per_face_memory[memory_key].keys())
-        ecr_ratios: Tuple[float, float] = (left_eye_aspect_ratio, right_eye_aspect_ratio)
-        self.ear_per_face_memory[memory_key].update({latest_frame + 1: ecr_ratios})
-
-        # Zliczanie klatek, w których średnia EAR < próg (oczy zamknięte)
-        closed_count = 0
-        for _, pair in self.ear_per_face_memory[memory_key].items():
-            mean_from_pair = (pair[0] + pair[1]) / 2
-            if mean_from_pair < self.perclos_threshold:
-                closed_count += 1
-
-        # PERCLOS to odsetek (closed_count / period)
-        perclos = closed_count / period
-        return perclos
+        # Klatka uznawana jest za zamkniętą, gdy średnia EAR < próg
+        mean_from_pair = (left_eye_aspect_ratio + right_eye_aspect_ratio) / 2
+        closed_time = frame_duration if mean_from_pair < self.perclos_threshold else 0.0
+        self._closed_time_memory.push(closed_time, timestamp)
+
+        return self.get_perclos(0)
+
+    def get_perclos(self, window: int = 0) -> float:
+        """
+        Zwraca PERCLOS dla jednego z okien podanych w konstruktorze. Wartość jest
+        odsetkiem (czas_zamknięcia / długość_okna), więc do czasu zapełnienia okna
+        rośnie stopniowo od zera.
+
+        :param window: Indeks okna w 'perclos_windows'.
+        :type window: int
+        :return: Odsetek czasu w oknie, w którym oczy były uznane za zamknięte.
+        :rtype: float
+        """
+        return self._closed_time_memory.sum(window) / self.perclos_windows[window]
+
+    def get_perclos_for_windows(self) -> Dict[float, float]:
+        """
+        Zwraca PERCLOS dla wszystkich okien zdefiniowanych w konstruktorze.
+
+        :return: Słownik {długość_okna_w_sekundach: perclos}.
+        :rtype: dict[float, float]
+        """
+        return {window: self.get_perclos(index) for index, window in enumerate(self.perclos_windows)}
@@ -5,8 +5,8 @@
 # wspierającej zastosowanie prędkości ruchów sakkadowych, podjęto decyzję o rezygnacji
 # z wykorzystania tej klasy w systemie do wykrywania senności.
 
-import time
 import numpy as np
+from typing import Optional, Tuple
 from .param_finder import ParamFinder
 
 class SaccadeVel(ParamFinder):
@@ -25,38 +25,134 @@ class SaccadeVel(ParamFinder):
         self.right_iris_indices = np.array([469, 470, 471, 472])
         self.left_iris_indices = np.array([474, 475, 476, 477])
         self.iris_previous_state = np.zeros((2, 4, 4))
+        # NaN w kolumnie czasu oznacza brak poprzedniej klatki (czas 0.0 jest poprawnym znacznikiem)
+        self.iris_previous_state[:, :, 3] = np.nan
         self.landmark_previous_state = np.zeros((2, 2, 3))
 
-    def find_parameter(self, face_coords) -> float:
+    def find_parameter(self, face_coords, timestamp: Optional[float] = None) -> float:
         """
         Główna metoda z interfejsu ParamFinder. Oblicza średnią prędkość (sakkady)
         na podstawie dwóch tęczówek (prawej i lewej).
 
-        :param face_coords: Wyniki analizy MediaPipe (multi_face_landmarks).
+        :param face_coords: Wyniki analizy MediaPipe (multi_face_landmarks)
+                            lub tablica landmarków o kształcie (twarze, 478, 3).
         :type face_coords: Union[...] lub podobne
+        :param timestamp: Znacznik czasu klatki w sekundach (domyślnie bieżący czas).
+        :type timestamp: float lub None
         :return: Średnia prędkość ruchów sakkadowych (float).
         :rtype: float
         """
+        landmarks = self._as_landmark_array(face_coords)
+        timestamp = self._resolve_timestamp(timestamp)
         right_saccade_velocity = self._find_saccade_velocity(
-            face_coords, self.right_iris_indices, right_flag=True
+            landmarks, self.right_iris_indices, timestamp, right_flag=True
         )
         left_saccade_velocity = self._find_saccade_velocity(
-            face_coords, self.left_iris_indices, left_flag=True
+            landmarks, self.left_iris_indices, timestamp, left_flag=True
         )
         mean_saccade_velocity = (right_saccade_velocity + left_saccade_velocity) / 2
         return mean_saccade_velocity
 
-    def _find_saccade_velocity(self, face_coords, indices: np.ndarray,
+    def find_parameters_batch(self, landmarks: np.ndarray, timestamps: np.ndarray) -> np.ndarray:
+        """
+        Wektorowa wersja find_parameter() dla serii klatek. Poprzednią pozycją tęczówki
+        dla każdej klatki z twarzą jest pozycja z poprzedniej klatki z twarzą (lub zapisany stan).
+
+        :param landmarks: Tablica landmarków o kształcie (N, 478, 3), z NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        :param timestamps: Niemalejące znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Średnie prędkości ruchów sakkadowych, tablica o kształcie (N,).
+        :rtype: np.ndarray
+        """
+        landmarks, timestamps, has_face = self._prepare_batch(landmarks, timestamps)
+        mean_saccade_velocity = np.zeros(len(timestamps))
+        if not has_face.any():
+            return mean_saccade_velocity
+
+        faces = landmarks[has_face]
+        face_timestamps = timestamps[has_face]
+        right_velocity = self._calculate_velocity_batch(faces, self.right_iris_indices, face_timestamps,
+                                                        0, np.array([362, 263]))
+        left_velocity = self._calculate_velocity_batch(faces, self.left_iris_indices, face_timestamps,
+                                                       1, np.array([33, 133]))
+        mean_saccade_velocity[has_face] = (right_velocity + left_velocity) / 2
+        return mean_saccade_velocity
+
+    def _calculate_velocity_batch(self, faces: np.ndarray, landmark_indices: np.ndarray, timestamps: np.ndarray,
+                                  select_iris: int, adjust_to_landmarks: np.ndarray) -> np.ndarray:
+        """
+        Oblicza średnią prędkość sakkady wybranej tęczówki dla serii klatek z wykrytą twarzą
+        i aktualizuje stan poprzedni na podstawie ostatniej klatki.
+
+        :param faces: Tablica landmarków klatek z twarzą o kształcie (M, 478, 3).
+        :type faces: np.ndarray
+        :param landmark_indices: Indeksy analizowanych landmarków tęczówki.
+        :type landmark_indices: np.ndarray
+        :param timestamps: Znaczniki czasu klatek w sekundach, o kształcie (M,).
+        :type timestamps: np.ndarray
+        :param select_iris: Indeks wskazujący, którą tęczówkę (0 - prawa, 1 - lewa) analizujemy.
+        :type select_iris: int
+        :param adjust_to_landmarks: Tablica landmarków referencyjnych (kąciki oczu).
+        :type adjust_to_landmarks: np.ndarray
+        :return: Średnie prędkości sakkady, tablica o kształcie (M,).
+        :rtype: np.ndarray
+        """
+        current, previous, previous_ticks = self._shift_state(
+            faces[:, landmark_indices], self.iris_previous_state[select_iris], timestamps)
+        corners, previous_corners, _ = self._shift_state(
+            faces[:, adjust_to_landmarks], self.landmark_previous_state[select_iris])
+
+        distance = np.sqrt(((current - previous) ** 2).sum(axis=-1))
+        delta_t = np.where(np.isnan(previous_ticks), 1e-6, timestamps[:, None] - previous_ticks)
+        adjust_by_distance = np.sqrt(((corners - previous_corners) ** 2).sum(axis=-1)).mean(axis=-1)
+        saccade_velocity = (distance - adjust_by_distance[:, None]) / delta_t
+
+        # Aktualizacja stanu
+        self.iris_previous_state[select_iris, :, :3] = current[-1]
+        self.iris_previous_state[select_iris, :, 3] = timestamps[-1]
+        self.landmark_previous_state[select_iris] = corners[-1]
+
+        return saccade_velocity.mean(axis=-1)
+
+    @staticmethod
+    def _shift_state(points: np.ndarray, state: np.ndarray,
+                     timestamps: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Zestawia bieżące pozycje punktów z pozycjami z poprzedniej klatki (dla pierwszej
+        klatki - z zapisanym stanem).
+
+        :param points: Pozycje punktów o kształcie (M, liczba_punktów, 3).
+        :type points: np.ndarray
+        :param state: Zapisany stan: pozycje (i opcjonalnie czas w ostatniej kolumnie).
+        :type state: np.ndarray
+        :param timestamps: Znaczniki czasu klatek; gdy podane, zwracane są także czasy poprzednich klatek.
+        :type timestamps: np.ndarray lub None
+        :return: Krotka (current, previous, previous_ticks).
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        current = points.astype(np.float64)
+        previous = np.concatenate((state[None, :, :3], current[:-1]))
+        previous_ticks = None
+        if timestamps is not None:
+            previous_ticks = np.empty((len(timestamps), len(state)))
+            previous_ticks[0] = state[:, 3]
+            previous_ticks[1:] = timestamps[:-1, None]
+        return current, previous, previous_ticks
+
+    def _find_saccade_velocity(self, landmarks: np.ndarray, indices: np.ndarray, timestamp: float,
                                left_flag: bool = False, right_flag: bool = False) -> float:
         """
         Oblicza prędkość sakkady dla wybranej tęczówki (lewej lub prawej), korzystając
         z indeksów landmarków i poprzedniego stanu (pozycji i czasu). Umożliwia też
         kompensację ruchu głowy.
 
-        :param face_coords: Wyniki analizy MediaPipe (multi_face_landmarks).
-        :type face_coords: Union[...] lub podobne
+        :param landmarks: Tablica landmarków o kształcie (twarze, 478, 3).
+        :type landmarks: np.ndarray
         :param indices: Tablica indeksów tęczówki.
         :type indices: np.ndarray
+        :param timestamp: Znacznik czasu klatki w sekundach.
+        :type timestamp: float
         :param left_flag: Określa, czy obliczamy ruch lewej tęczówki.
         :type left_flag: bool
         :param right_flag: Określa, czy obliczamy ruch prawej tęczówki.
@@ -64,75 +160,69 @@ class SaccadeVel(ParamFinder):
         :return: Prędkość sakkady (float).
         :rtype: float
         """
-        all_landmark_saccade_velocity = np.array([])
-
         if left_flag:
             iris_selection = 1
-            adjust_to_landmarks = [33, 133]
+            adjust_to_landmarks = np.array([33, 133])
         elif right_flag:
             iris_selection = 0
-            adjust_to_landmarks = [362, 263]
+            adjust_to_landmarks = np.array([362, 263])
         else:
             iris_selection = 0
-            adjust_to_landmarks = [362, 263]
-
-        if face_coords.multi_face_landmarks:
-            for face_mesh in face_coords.multi_face_landmarks:
-                for index, landmark in enumerate(indices):
-                    velocity = self._calculate_velocity(
-                        face_mesh,
-                        landmark,
-                        index,
-                        iris_selection,
-                        adjust_to_landmarks
-                    )
-                    all_landmark_saccade_velocity = np.append(all_landmark_saccade_velocity, velocity)
-
-            saccade_velocity = np.mean(all_landmark_saccade_velocity)
+            adjust_to_landmarks = np.array([362, 263])
+
+        if len(landmarks):
+            velocities = self._calculate_velocity(
+                landmarks[0],
+                indices,
+                timestamp,
+                iris_selection,
+                adjust_to_landmarks
+            )
+            saccade_velocity = float(np.mean(velocities))
             return saccade_velocity
         else:
             return 0.0
 
-    def _calculate_velocity(self, face_mesh, landmark_ind: int, index: int, select_iris: int,
-                           adjust_to_landmarks: list) -> float:
+    def _calculate_velocity(self, face_landmarks: np.ndarray, landmark_indices: np.ndarray,
+                            timestamp: float, select_iris: int, adjust_to_landmarks: np.ndarray) -> np.ndarray:
         """
-        Oblicza prędkość (pochodną) ruchu konkretnego landmarku tęczówki między bieżącą a poprzednią
+        Oblicza prędkość (pochodną) ruchu landmarków tęczówki między bieżącą a poprzednią
         klatką. Uwzględnia też poprawkę na ruch głowy, by zmierzyć wyłącznie ruch gałki ocznej.
 
-        :param face_mesh: Reprezentacja pojedynczej twarzy z biblioteki MediaPipe.
-        :type face_mesh: Union[...] lub podobne
-        :param landmark_ind: Indeks aktualnie analizowanego landmarku tęczówki.
-        :type landmark_ind: int
-        :param index: Indeks w tablicy stanu (dla poszczególnych landmarków tęczówki).
-        :type index: int
+        :param face_landmarks: Tablica landmarków pojedynczej twarzy o kształcie (478, 3).
+        :type face_landmarks: np.ndarray
+        :param landmark_indices: Indeksy analizowanych landmarków tęczówki.
+        :type landmark_indices: np.ndarray
+        :param timestamp: Znacznik czasu klatki w sekundach.
+        :type timestamp: float
         :param select_iris: Indeks wskazujący, którą tęczówkę (0 - prawa, 1 - lewa) analizujemy.
         :type select_iris: int
-        :param adjust_to_landmarks: Lista landmarków referencyjnych (np. kąciki oczu),
+        :param adjust_to_landmarks: Tablica landmarków referencyjnych (np. kąciki oczu),
                                     względem których korygujemy ruch głowy.
-        :type adjust_to_landmarks: list
-        :return: Prędkość ruchu sakkady (float).
-        :rtype: float
+        :type adjust_to_landmarks: np.ndarray
+        :return: Prędkości ruchu sakkady dla każdego landmarku tęczówki.
+        :rtype: np.ndarray
         """
-        prev_state = self.iris_previous_state[select_iris][index]
-        x2, y2, z2, tick2 = prev_state
+        prev_state = self.iris_previous_state[select_iris]
+        tick2 = prev_state[:, 3]
 
-        x1 = face_mesh.landmark[landmark_ind].x
-        y1 = face_mesh.landmark[landmark_ind].y
-        z1 = face_mesh.landmark[landmark_ind].z
-        tick1 = time.time()
+        current = face_landmarks[landmark_indices].astype(np.float64)
+        tick1 = timestamp
 
-        distance = np.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
-        delta_t = tick1 - tick2 if tick2 > 0 else 1e-6
+        distance = np.sqrt(((current - prev_state[:, :3]) ** 2).sum(axis=-1))
+        delta_t = np.where(np.isnan(tick2), 1e-6, tick1 - tick2)
 
-        adjust_by_distance = self.adjust_speed_to_landmarks(adjust_to_landmarks, select_iris, face_mesh)
+        adjust_by_distance = self.adjust_speed_to_landmarks(adjust_to_landmarks, select_iris, face_landmarks)
         saccade_velocity = (distance - adjust_by_distance) / delta_t
 
         # Aktualizacja stanu
-        self.iris_previous_state[select_iris][index] = [x1, y1, z1, tick1]
+        self.iris_previous_state[select_iris, :, :3] = current
+        self.iris_previous_state[select_iris, :, 3] = tick1
 
         return saccade_velocity
 
-    def adjust_speed_to_landmarks(self, landmark_indices: list, select_iris: int, face_mesh) -> float:
+    def adjust_speed_to_landmarks(self, landmark_indices: np.ndarray, select_iris: int,
+                                  face_landmarks: np.ndarray) -> float:
         """
         Koryguje prędkość ruchu ocznego o ruch głowy. Oblicza przesunięcie
         wybranych punktów referencyjnych (np. kąciki oczu) między obecną
@@ -140,27 +230,19 @@ class SaccadeVel(ParamFinder):
 
         :param landmark_indices: Indeksy punktów referencyjnych
                                  używanych do korekcji ruchu głowy.
-        :type landmark_indices: list
+        :type landmark_indices: np.ndarray
         :param select_iris: Wskaźnik wybierający prawą (0) lub lewą (1) tęczówkę.
         :type select_iris: int
-        :param face_mesh: Obiekt opisujący bieżącą twarz (landmarki),
-                          dostarczany przez MediaPipe.
-        :type face_mesh: Union[...] lub podobne
+        :param face_landmarks: Tablica landmarków bieżącej twarzy o kształcie (478, 3).
+        :type face_landmarks: np.ndarray
         :return: Średni dystans przesunięcia punktów (float).
         :rtype: float
         """
-        distances = np.zeros(len(landmark_indices))
-        for idx, landmark_ind in enumerate(landmark_indices):
-            prev_state = self.landmark_previous_state[select_iris][idx]
-            x2, y2, z2 = prev_state
-
-            x1 = face_mesh.landmark[landmark_ind].x
-            y1 = face_mesh.landmark[landmark_ind].y
-            z1 = face_mesh.landmark[landmark_ind].z
-
-            distances[idx] = np.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2 + (z1 - z2) ** 2)
+        current = face_landmarks[landmark_indices].astype(np.float64)
+        prev_state = self.landmark_previous_state[select_iris]
+        distances = np.sqrt(((current - prev_state) ** 2).sum(axis=-1))
 
-            # Uaktualnienie stanu poprzedniego
-            self.landmark_previous_state[select_iris][idx] = [x1, y1, z1]
+        # Uaktualnienie stanu poprzedniego
+        self.landmark_previous_state[select_iris] = current
 
-        return distances.mean()
+        return float(distances.mean())
@@ -1,4 +1,6 @@
 import numpy as np
+from typing import Optional, Tuple
+from Workspace.Utilities import RollingWindow
 from .param_finder import ParamFinder
 
 
@@ -8,7 +10,7 @@ class YawnFinder(ParamFinder):
     proporcji (stosunku pionowej wysokości ust do jej szerokości).
     """
 
-    def __init__(self, yawn_threshold: float, is_image_mode = False):
+    def __init__(self, yawn_threshold: float, is_image_mode = False, yawn_window: float = 0.3):
         """
         Inicjalizuje obiekt YawnFinder, ustala indeksy ust i pamięć
         do zliczania ziewnięć, a także ustawia próg (threshold) decydujący
@@ -17,103 +19,110 @@ class YawnFinder(ParamFinder):
         :param yawn_threshold: Wartość progowa stosunku ust (wysokość/szerokość),
                                powyżej której uznajemy, że następuje ziewanie.
         :type yawn_threshold: float
+        :param is_image_mode: Tryb pojedynczych obrazów - każde ziewnięcie liczone jest osobno.
+        :type is_image_mode: bool
+        :param yawn_window: Czas (w sekundach), przez który otwarte usta traktowane są
+                            jako kontynuacja tego samego ziewnięcia.
+        :type yawn_window: float
         """
         self.mouth_indices = np.array([[37, 84], [0, 17], [267, 314], [62, 29]])
         self.yawn_counter = 0
         if is_image_mode:
-            self.yawn_memory = np.zeros(1, dtype=bool)
-        else:
-            self.yawn_memory = np.zeros(10, dtype=bool)
+            yawn_window = 0.0
+        self.yawn_memory = RollingWindow.for_duration((yawn_window,), self.max_frame_rate)
         self.yawn_threshold = yawn_threshold
 
     def reset_memory(self):
-        self.yawn_memory = np.zeros(len(self.yawn_memory), dtype=bool)
+        self.yawn_memory.reset()
 
-    def find_parameter(self, face_coords) -> tuple:
+    def find_parameter(self, face_coords, timestamp: Optional[float] = None) -> tuple:
         """
         Główna metoda interfejsu ParamFinder. Zwraca informację,
         czy użytkownik ziewa, liczbę dotychczasowych ziewnięć oraz
         aktualny stosunek ust (MAR - Mouth Aspect Ratio).
 
-        :param face_coords: Wynik działania MediaPipe (multi_face_landmarks),
-                            przechowujący punkty siatki twarzy.
+        :param face_coords: Wynik działania MediaPipe (multi_face_landmarks)
+                            lub tablica landmarków o kształcie (twarze, 478, 3).
         :type face_coords: Union[...] lub podobne
+        :param timestamp: Znacznik czasu klatki w sekundach (domyślnie bieżący czas).
+        :type timestamp: float lub None
         :return: Krotka (is_yawning, yawn_counter, mouth_ratio).
                  - is_yawning (bool): flaga czy ziewanie jest obecne,
                  - yawn_counter (int): liczba zliczonych ziewnięć,
                  - mouth_ratio (float): wartość stosunku ust (wysokość / szerokość).
         :rtype: tuple
         """
-        yawn_ratios = self._find_yawn_ratio(face_coords)
-        is_jawning = self._check_for_yawn(yawn_ratios)
-        mouth_ratio = yawn_ratios[0] if face_coords.multi_face_landmarks else 0.0
+        landmarks = self._as_landmark_array(face_coords)
+        yawn_ratios = self._find_yawn_ratio(landmarks)
+        is_jawning = self._check_for_yawn(yawn_ratios, self._resolve_timestamp(timestamp))
+        mouth_ratio = float(yawn_ratios[0]) if len(landmarks) else 0.0
         return is_jawning, self.yawn_counter, mouth_ratio
 
-    def _find_yawn_ratio(self, face_coords) -> list:
+    def find_parameters_batch(self, landmarks: np.ndarray,
+                              timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Wektorowa wersja find_parameter() dla serii klatek. MAR liczony jest jednocześnie
+        dla wszystkich klatek, a początki ziewnięć wyznaczane są na podstawie sum
+        skumulowanych okna czasowego.
+
+        :param landmarks: Tablica landmarków o kształcie (N, 478, 3), z NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        :param timestamps: Niemalejące znaczniki czasu klatek w sekundach, o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Krotka (is_yawning, yawn_counter, mouth_ratio) - tablice o kształcie (N,).
+        :rtype: Tuple[np.ndarray, np.ndarray, np.ndarray]
+        """
+        landmarks, timestamps, has_face = self._prepare_batch(landmarks, timestamps)
+        mouth_ratio = np.zeros(len(timestamps))
+        if has_face.any():
+            mouth_ratio[has_face] = self._find_yawn_ratio(landmarks[has_face])
+
+        is_yawning = mouth_ratio >= self.yawn_threshold
+        sums, _ = self.yawn_memory.push_batch(is_yawning, timestamps)
+        # Nowe ziewnięcie - w oknie (poza bieżącą klatką) nie było otwartych ust
+        yawn_started = is_yawning & (sums[:, 0] - is_yawning <= 0)
+        yawn_counter = self.yawn_counter + np.cumsum(yawn_started)
+        if len(yawn_counter):
+            self.yawn_counter = int(yawn_counter[-1])
+
+        return is_yawning, yawn_counter, mouth_ratio
+
+    def _find_yawn_ratio(self, landmarks: np.ndarray) -> np.ndarray:
         """
         Oblicza stosunek „wysokości” ust do ich „szerokości” (MAR – Mouth Aspect Ratio)
         dla każdej wykrytej twarzy. Jeśli nie wykryto żadnej twarzy, zwraca [0].
 
-        :param face_coords: Obiekt zawierający multi_face_landmarks.
-        :type face_coords: Union[...] lub podobne
-        :return: Lista wartości MAR dla wszystkich wykrytych twarzy.
-        :rtype: list
+        :param landmarks: Tablica landmarków o kształcie (twarze, 478, 3).
+        :type landmarks: np.ndarray
+        :return: Tablica wartości MAR dla wszystkich wykrytych twarzy.
+        :rtype: np.ndarray
         """
-        all_delta_ver_dist = np.array([])
-        all_faces_yawn_ratio = []
-
-        if face_coords.multi_face_landmarks:
-            for face_mesh in face_coords.multi_face_landmarks:
-                for pair in self.mouth_indices[:-1]:
-                    delta_ver_dist = YawnFinder._calculate_distance(face_mesh, pair)
-                    all_delta_ver_dist = np.append(all_delta_ver_dist, delta_ver_dist)
-
-                hor_distance = self._calculate_distance(face_mesh, self.mouth_indices[-1])
-                mean_ver_distance = np.mean(all_delta_ver_dist)
-                jawn_ratio = mean_ver_distance / hor_distance
-                all_faces_yawn_ratio.append(jawn_ratio)
-            return all_faces_yawn_ratio
-        else:
-            return [0]
-
-    @staticmethod
-    def _calculate_distance(face_mesh, pair: list) -> float:
-        """
-        Zwraca odległość euklidesową między dwoma punktami (landmarkami) ust.
-
-        :param face_mesh: Pojedyncza wykryta twarz z biblioteki MediaPipe.
-        :type face_mesh: Union[...] lub podobne
-        :param pair: Para indeksów punktów (landmarków),
-                     na podstawie których wyliczana jest odległość.
-        :type pair: list
-        :return: Odległość między punktami (float).
-        :rtype: float
-        """
-        y2 = face_mesh.landmark[pair[0]].y
-        x2 = face_mesh.landmark[pair[0]].x
-        y1 = face_mesh.landmark[pair[1]].y
-        x1 = face_mesh.landmark[pair[1]].x
-        return np.sqrt((y2 - y1) ** 2 + (x2 - x1) ** 2)
+        if not len(landmarks):
+            return np.zeros(1)
+
+        distances = self._distance_2d(landmarks, self.mouth_indices)
+        mean_ver_distance = distances[..., :-1].mean(axis=-1)
+        return mean_ver_distance / distances[..., -1]
 
-    def _check_for_yawn(self, yawn_ratio: float) -> bool:
+    def _check_for_yawn(self, yawn_ratio: np.ndarray, timestamp: float) -> bool:
         """
         Sprawdza, czy aktualna wartość yawn_ratio przekracza próg (yawn_threshold)
-        i jeśli tak, aktualizuje licznik ziewnięć. Wykorzystuje rolling memory
+        i jeśli tak, aktualizuje licznik ziewnięć. Wykorzystuje okno czasowe
         (self.yawn_memory), by rozróżnić pojedyncze długie ziewnięcie od wielu
         krótkich.
 
-        :param yawn_ratio: Lista wartości MAR dla ust (wysokość/szerokość).
-        :type yawn_ratio: list
+        :param yawn_ratio: Tablica wartości MAR dla ust (wysokość/szerokość).
+        :type yawn_ratio: np.ndarray
+        :param timestamp: Znacznik czasu klatki w sekundach.
+        :type timestamp: float
         :return: True, jeśli użytkownik aktualnie ziewa; w przeciwnym wypadku False.
         :rtype: bool
         """
-        self.yawn_memory = np.roll(self.yawn_memory, -1)
-        self.yawn_memory[-1] = False
+        is_yawning = bool(yawn_ratio[0] >= self.yawn_threshold)
+        self.yawn_memory.push(is_yawning, timestamp)
 
-        if yawn_ratio[0] >= self.yawn_threshold:
-            if not any(self.yawn_memory):
-                self.yawn_counter += 1
-            self.yawn_memory[-1] = True
-            return True
+        # Nowe ziewnięcie - w oknie (poza bieżącą klatką) nie było otwartych ust
+        if is_yawning and self.yawn_memory.sum() - is_yawning <= 0:
+            self.yawn_counter += 1
 
-        return False
+        return is_yawning
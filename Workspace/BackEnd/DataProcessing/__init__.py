@@ -1,3 +1,6 @@
 from .ParamFinder import *
 from .coordinates_parser import *
-from .image_processsor import *
\ No newline at end of file
+from .face_tracker import *
+from .image_processsor import *
+from .motion_gate import *
+from .presence_detector import *
\ No newline at end of file
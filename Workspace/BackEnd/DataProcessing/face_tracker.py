@@ -0,0 +1,93 @@
+import numpy as np
+from typing import List
+
+
+class FaceTracker:
+    """
+    Klasa FaceTracker nadaje wykrytym twarzom stałe identyfikatory (track ID) na podstawie
+    dopasowania środków ciężkości landmarków do twarzy z poprzednich klatek. Dzięki temu stan
+    wyznaczania parametrów (PERCLOS, ziewanie, kąty, pamięć klasyfikatora) może być prowadzony
+    osobno dla każdej osoby w kadrze (np. kierowcy i pasażera), niezależnie od kolejności,
+    w jakiej MediaPipe zwraca twarze.
+    """
+
+    def __init__(self, max_distance: float = 0.15, max_missed_frames: int = 15) -> None:
+        """
+        Inicjalizuje obiekt FaceTracker.
+
+        :param max_distance: Maksymalna odległość (we współrzędnych znormalizowanych) między
+                             środkiem twarzy a ostatnim położeniem śladu, przy której twarz
+                             uznawana jest za kontynuację śladu.
+        :type max_distance: float
+        :param max_missed_frames: Liczba kolejnych klatek bez dopasowania, po której ślad jest usuwany.
+        :type max_missed_frames: int
+        """
+        self.max_distance = max_distance
+        self.max_missed_frames = max_missed_frames
+
+        # Stan śladów w zwartych tablicach: identyfikatory, środki twarzy i liczba klatek bez dopasowania
+        self.track_ids: np.ndarray = np.empty(0, dtype=np.int64)
+        self._centroids: np.ndarray = np.empty((0, 2))
+        self._missed: np.ndarray = np.empty(0, dtype=np.int64)
+        self._next_id = 0
+        # Identyfikatory śladów usuniętych podczas ostatniego wywołania update()
+        self.removed_tracks: List[int] = []
+
+    def reset(self) -> None:
+        """
+        Usuwa wszystkie ślady.
+        """
+        self.removed_tracks = self.track_ids.tolist()
+        self.track_ids = np.empty(0, dtype=np.int64)
+        self._centroids = np.empty((0, 2))
+        self._missed = np.empty(0, dtype=np.int64)
+
+    def update(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Dopasowuje twarze z bieżącej klatki do istniejących śladów (zachłannie, od najmniejszej
+        odległości), zakłada nowe ślady dla niedopasowanych twarzy i usuwa ślady, które zbyt
+        długo pozostawały bez dopasowania.
+
+        :param landmarks: Tablica landmarków o kształcie (twarze, 478, 3).
+        :type landmarks: np.ndarray
+        :return: Identyfikatory śladów kolejnych twarzy, tablica o kształcie (twarze,).
+        :rtype: np.ndarray
+        """
+        centroids = landmarks[:, :, :2].mean(axis=1).astype(np.float64)
+        face_tracks = np.full(len(centroids), -1, dtype=np.int64)
+        matched = np.zeros(len(self.track_ids), dtype=bool)
+
+        if len(centroids) and len(self.track_ids):
+            distances = np.linalg.norm(centroids[:, None, :] - self._centroids[None, :, :], axis=-1)
+            for flat_index in np.argsort(distances, axis=None):
+                face, track = np.unravel_index(flat_index, distances.shape)
+                if distances[face, track] > self.max_distance:
+                    break
+                if face_tracks[face] < 0 and not matched[track]:
+                    face_tracks[face] = track
+                    matched[track] = True
+
+        # Aktualizacja dopasowanych śladów
+        has_track = face_tracks >= 0
+        self._centroids[face_tracks[has_track]] = centroids[has_track]
+        self._missed[matched] = 0
+        self._missed[~matched] += 1
+
+        # Nowe ślady dla niedopasowanych twarzy
+        new_faces = np.flatnonzero(~has_track)
+        new_ids = np.arange(self._next_id, self._next_id + len(new_faces))
+        self._next_id += len(new_faces)
+        face_tracks[new_faces] = np.arange(len(self.track_ids), len(self.track_ids) + len(new_faces))
+        self.track_ids = np.concatenate((self.track_ids, new_ids))
+        self._centroids = np.concatenate((self._centroids, centroids[new_faces]))
+        self._missed = np.concatenate((self._missed, np.zeros(len(new_faces), dtype=np.int64)))
+        face_ids = self.track_ids[face_tracks]
+
+        # Usunięcie śladów bez dopasowania przez zbyt wiele klatek
+        kept = self._missed <= self.max_missed_frames
+        self.removed_tracks = self.track_ids[~kept].tolist()
+        self.track_ids = self.track_ids[kept]
+        self._centroids = self._centroids[kept]
+        self._missed = self._missed[kept]
+
+        return face_ids
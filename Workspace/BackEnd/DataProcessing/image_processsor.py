@@ -1,7 +1,8 @@
 import cv2
 import numpy as np
 from mediapipe import solutions
-from typing import Tuple, Any
+from typing import Tuple, Any, Dict, Optional
+from Workspace.Utilities import Utils
 
 
 class ImageProcessor:
@@ -10,20 +11,82 @@ class ImageProcessor:
     wycinanie (crop), konwersję do skali szarości oraz wykrywanie siatki twarzy (face mesh).
     """
 
-    def __init__(self) -> None:
+    def __init__(self, roi_tracking: bool = False, roi_size: int = 256, roi_margin: float = 0.25,
+                 max_num_faces: int = 1) -> None:
         """
         Inicjalizuje obiekt ImageProcessor, definiując narzędzia z biblioteki
         MediaPipe (drawing_utils, face_mesh) oraz parametry rysowania landmarków.
+
+        W trybie śledzenia obszaru twarzy (roi_tracking) FaceMesh otrzymuje jedynie
+        kwadratowy wycinek klatki obejmujący landmarki z poprzedniej klatki (powiększone
+        o margines), przeskalowany do rozmiaru roi_size x roi_size. Pełna klatka
+        przetwarzana jest tylko wtedy, gdy twarz nie zostanie odnaleziona w wycinku.
+
+        :param roi_tracking: Czy przetwarzać jedynie obszar twarzy z poprzedniej klatki.
+        :type roi_tracking: bool
+        :param roi_size: Bok (w pikselach) przeskalowanego wycinka przekazywanego do FaceMesh.
+        :type roi_size: int
+        :param roi_margin: Margines dodawany z każdej strony obszaru landmarków (względem jego boku).
+        :type roi_margin: float
+        :param max_num_faces: Maksymalna liczba twarzy wykrywanych przez FaceMesh. Śledzenie
+                              obszaru twarzy obejmuje tylko pierwszą twarz, dlatego przy wielu
+                              twarzach należy je wyłączyć.
+        :type max_num_faces: int
         """
         self._mp_draw = solutions.drawing_utils
         self._mp_face_mesh = solutions.face_mesh
+        # Ustawienia FaceMesh (wykorzystywane również jako część klucza pamięci podręcznej landmarków)
+        self.face_mesh_settings = {
+            "max_num_faces": max_num_faces,
+            "refine_landmarks": True,
+            "min_detection_confidence": 0.5,
+            "min_tracking_confidence": 0.5
+        }
         try:
-            self._face_mesh = self._mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True)
+            self._face_mesh = self._mp_face_mesh.FaceMesh(**self.face_mesh_settings)
         except Exception as e:
             print("ERROR creating FaceMesh:", e)
             raise
 
         self._draw_spec = self._mp_draw.DrawingSpec(thickness=1, circle_radius=1, color=(0, 255, 0))
+        # Pary indeksów landmarków tworzące kontury twarzy, o kształcie (liczba_odcinków, 2)
+        self._contour_connections: np.ndarray = np.array(sorted(self._mp_face_mesh.FACEMESH_CONTOURS))
+
+        self.roi_tracking: bool = roi_tracking
+        self.roi_size: int = roi_size
+        self.roi_margin: float = roi_margin
+        # Obszar twarzy (x0, y0, x1, y1) w pikselach, wyznaczony na podstawie poprzedniej klatki
+        self._roi: Optional[Tuple[int, int, int, int]] = None
+        # Bufory wykorzystywane ponownie w kolejnych klatkach (konwersja do RGB, wycinek twarzy)
+        self._rgb_buffer: Optional[np.ndarray] = None
+        self._roi_buffer: Optional[np.ndarray] = None
+        self._roi_rgb_buffer: Optional[np.ndarray] = None
+        self.roi_hits: int = 0
+        self.full_frame_detections: int = 0
+        if self.roi_tracking:
+            # Osobna instancja dla wycinków - jej wewnętrzne śledzenie nie miesza
+            # współrzędnych wycinków i pełnych klatek
+            self._roi_face_mesh = self._mp_face_mesh.FaceMesh(**self.face_mesh_settings)
+
+    def get_settings(self) -> Dict[str, Any]:
+        """
+        Zwraca ustawienia wpływające na wyznaczane landmarki (ustawienia FaceMesh
+        oraz, jeśli włączone, parametry śledzenia obszaru twarzy).
+
+        :return: Słownik ustawień.
+        :rtype: dict
+        """
+        settings = dict(self.face_mesh_settings)
+        if self.roi_tracking:
+            settings.update(roi_size=self.roi_size, roi_margin=self.roi_margin)
+        return settings
+
+    def reset_tracking(self) -> None:
+        """
+        Zapomina obszar twarzy z poprzedniej klatki (np. przed przetwarzaniem nowego nagrania),
+        dzięki czemu kolejna klatka przetwarzana jest w całości.
+        """
+        self._roi = None
 
     @staticmethod
     def _crop_image(image: np.ndarray, crop_width: int, crop_height: int) -> np.ndarray:
@@ -64,30 +127,75 @@ class ImageProcessor:
 
     def _find_face_mesh(self, image: np.ndarray) -> Tuple[np.ndarray, Any]:
         """
-        Wykrywa siatkę twarzy (face mesh) na obrazie i nanosi wykryte landmarki.
-        Do przetwarzania obrazu używany jest tryb RGB (konwersja z BGR).
+        Wykrywa siatkę twarzy (face mesh) na obrazie. Do przetwarzania obrazu używany
+        jest tryb RGB (konwersja z BGR). Obraz nie jest modyfikowany - landmarki można
+        nanieść osobno metodą draw_overlay().
 
         :param image: Obraz w formacie BGR.
         :type image: np.ndarray
         :return: Krotka (image, results), gdzie:
-                 - image (np.ndarray): Obraz w BGR z zaznaczonymi landmarkami twarzy (jeśli wykryto),
+                 - image (np.ndarray): Obraz wejściowy w BGR,
                  - results: Wynik przetwarzania z MediaPipe, zawierający m.in. multi_face_landmarks.
         :rtype: tuple
         """
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        self._rgb_buffer = self._reuse_buffer(self._rgb_buffer, image.shape)
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
         results = self._face_mesh.process(image_rgb)
+        return image, results
 
-        if results.multi_face_landmarks:
-            for face_landmarks in results.multi_face_landmarks:
-                self._mp_draw.draw_landmarks(
-                    image,
-                    face_landmarks,
-                    self._mp_face_mesh.FACEMESH_CONTOURS,
-                    self._draw_spec,
-                    self._draw_spec
-                )
+    @staticmethod
+    def _reuse_buffer(buffer: Optional[np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Zwraca przekazany bufor, jeśli ma wymagany kształt, a w przeciwnym razie
+        alokuje nowy (np. przy pierwszej klatce lub zmianie rozdzielczości).
 
-        return image, results
+        :param buffer: Dotychczasowy bufor lub None.
+        :type buffer: Optional[np.ndarray]
+        :param shape: Wymagany kształt bufora.
+        :type shape: Tuple[int, ...]
+        :return: Bufor uint8 o zadanym kształcie.
+        :rtype: np.ndarray
+        """
+        if buffer is None or buffer.shape != shape:
+            return np.empty(shape, dtype=np.uint8)
+        return buffer
+
+    def draw_overlay(self, image: np.ndarray, landmarks: np.ndarray, scale: float = 1.0,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Nanosi landmarki i kontury twarzy (FACEMESH_CONTOURS) na kopię obrazu, opcjonalnie
+        zmniejszoną. Obraz wejściowy nie jest modyfikowany, więc rysowanie może odbywać się
+        później i w innym wątku (np. w wątku GUI), a przetwarzanie bez podglądu nic nie kosztuje.
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :param landmarks: Tablica landmarków (twarze, 478, 3) we współrzędnych znormalizowanych.
+        :type landmarks: np.ndarray
+        :param scale: Skala podglądu względem obrazu wejściowego.
+        :type scale: float
+        :param out: Bufor na podgląd wykorzystywany ponownie między klatkami (alokowany,
+                    gdy jest pusty lub ma inny rozmiar).
+        :type out: Optional[np.ndarray]
+        :return: Kopia obrazu (w zadanej skali) z naniesionymi landmarkami.
+        :rtype: np.ndarray
+        """
+        height, width = image.shape[:2]
+        preview_shape = (round(height * scale), round(width * scale)) + image.shape[2:]
+        preview = self._reuse_buffer(out, preview_shape)
+        if scale != 1.0:
+            cv2.resize(image, (preview_shape[1], preview_shape[0]), dst=preview, interpolation=cv2.INTER_AREA)
+        else:
+            np.copyto(preview, image)
+
+        height, width = preview.shape[:2]
+        for face in landmarks:
+            points = np.rint(face[:, :2] * (width, height)).astype(np.int32)
+            cv2.polylines(preview, points[self._contour_connections], False,
+                          self._draw_spec.color, self._draw_spec.thickness)
+            for x, y in points:
+                cv2.circle(preview, (int(x), int(y)), self._draw_spec.circle_radius,
+                           self._draw_spec.color, self._draw_spec.thickness)
+        return preview
 
     def crop_and_convert_to_gray(
         self,
@@ -112,18 +220,92 @@ class ImageProcessor:
         gray_image = self._set_grayscale(cropped_image)
         return gray_image
 
-    def process_face_image(self, image: np.ndarray) -> Tuple[np.ndarray, Any]:
+    def _find_face_mesh_in_roi(self, image: np.ndarray) -> Tuple[Any, np.ndarray]:
+        """
+        Wykrywa siatkę twarzy w obszarze twarzy z poprzedniej klatki. Wycinek jest
+        najpierw skalowany do rozmiaru roi_size, a dopiero potem konwertowany do RGB,
+        a wykryte landmarki przeliczane są na współrzędne pełnej klatki.
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :return: Krotka (results, landmarks), gdzie results to wynik MediaPipe
+                 (we współrzędnych wycinka), a landmarks - tablica (twarze, 478, 3)
+                 we współrzędnych pełnej klatki (pusta, gdy twarz została zgubiona).
+        :rtype: tuple
         """
-        Wykrywa siatkę twarzy (face mesh) na przekazanym obrazie i rysuje landmarki.
-        Zwraca również wyniki obliczeń MediaPipe w postaci obiektu zawierającego
-        m.in. listę wykrytych twarzy i ich punktów (multi_face_landmarks).
+        x0, y0, x1, y1 = self._roi
+        roi_view = image[y0:y1, x0:x1]
+        roi_shape = (self.roi_size, self.roi_size) + image.shape[2:]
+        self._roi_buffer = self._reuse_buffer(self._roi_buffer, roi_shape)
+        self._roi_rgb_buffer = self._reuse_buffer(self._roi_rgb_buffer, roi_shape)
+        cv2.resize(roi_view, (self.roi_size, self.roi_size), dst=self._roi_buffer, interpolation=cv2.INTER_AREA)
+        results = self._roi_face_mesh.process(
+            cv2.cvtColor(self._roi_buffer, cv2.COLOR_BGR2RGB, dst=self._roi_rgb_buffer))
+
+        landmarks = Utils.landmarks_to_array(results)
+        if not len(landmarks):
+            return results, landmarks
+
+        # Wycinek jest kwadratem skalowanym jednorodnie: z skaluje się tak jak x
+        height, width = image.shape[:2]
+        scale = np.array([(x1 - x0) / width, (y1 - y0) / height, (x1 - x0) / width], dtype=np.float32)
+        offset = np.array([x0 / width, y0 / height, 0.0], dtype=np.float32)
+        landmarks = landmarks * scale + offset
+        return results, landmarks
+
+    def _update_roi(self, landmarks: np.ndarray, width: int, height: int) -> None:
+        """
+        Wyznacza kwadratowy obszar twarzy dla następnej klatki na podstawie
+        prostokąta otaczającego landmarki pierwszej twarzy, powiększonego o margines.
+
+        :param landmarks: Tablica landmarków (twarze, 478, 3) we współrzędnych pełnej klatki.
+        :type landmarks: np.ndarray
+        :param width: Szerokość klatki w pikselach.
+        :type width: int
+        :param height: Wysokość klatki w pikselach.
+        :type height: int
+        """
+        if not len(landmarks):
+            self._roi = None
+            return
+
+        x_min, y_min = landmarks[0, :, :2].min(axis=0) * (width, height)
+        x_max, y_max = landmarks[0, :, :2].max(axis=0) * (width, height)
+        side = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.roi_margin)
+        side = int(min(max(side, 1), width, height))
+        x0 = int(np.clip((x_min + x_max - side) / 2, 0, width - side))
+        y0 = int(np.clip((y_min + y_max - side) / 2, 0, height - side))
+        self._roi = (x0, y0, x0 + side, y0 + side)
+
+    def process_face_image(self, image: np.ndarray) -> Tuple[np.ndarray, Any, np.ndarray]:
+        """
+        Wykrywa siatkę twarzy (face mesh) na przekazanym obrazie (bez rysowania
+        landmarków - do tego służy draw_overlay()). Zwraca również wyniki obliczeń
+        MediaPipe w postaci obiektu zawierającego m.in. listę wykrytych twarzy i ich
+        punktów (multi_face_landmarks) oraz te same punkty w postaci jednej, ciągłej
+        tablicy NumPy.
 
         :param image: Obraz w formacie BGR, na którym zostanie wykryta twarz.
         :type image: np.ndarray
-        :return: Krotka (processed_image, face_mesh_coords), gdzie:
-                 - processed_image (np.ndarray): Obraz z zaznaczonymi punktami twarzy,
-                 - face_mesh_coords: Obiekt MediaPipe z informacjami o wykrytych landmarkach.
+        :return: Krotka (processed_image, face_mesh_coords, landmarks), gdzie:
+                 - processed_image (np.ndarray): Obraz wejściowy (niezmodyfikowany),
+                 - face_mesh_coords: Obiekt MediaPipe z informacjami o wykrytych landmarkach,
+                 - landmarks (np.ndarray): Tablica float32 o kształcie (twarze, 478, 3).
+                 W trybie śledzenia obszaru twarzy obiekt MediaPipe może zawierać współrzędne
+                 względem wycinka, natomiast tablica landmarks zawsze odnosi się do pełnej klatki.
         :rtype: tuple
         """
+        if self.roi_tracking and self._roi is not None:
+            face_mesh_coords, landmarks = self._find_face_mesh_in_roi(image)
+            if len(landmarks):
+                self.roi_hits += 1
+                self._update_roi(landmarks, image.shape[1], image.shape[0])
+                return image, face_mesh_coords, landmarks
+
+        # Brak śledzonego obszaru lub twarz zgubiona - wykrywanie na pełnej klatce
         processed_image, face_mesh_coords = self._find_face_mesh(image)
-        return processed_image, face_mesh_coords
+        landmarks = Utils.landmarks_to_array(face_mesh_coords)
+        if self.roi_tracking:
+            self.full_frame_detections += 1
+            self._update_roi(landmarks, image.shape[1], image.shape[0])
+        return processed_image, face_mesh_coords, landmarks
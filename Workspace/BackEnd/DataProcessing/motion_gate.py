@@ -0,0 +1,152 @@
+import cv2
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+from .image_processsor import ImageProcessor
+
+
+class MotionGate:
+    """
+    Klasa MotionGate pomija wykrywanie siatki twarzy dla klatek, które niemal nie różnią się
+    od ostatniej przetworzonej klatki. Każda klatka jest przycinana i konwertowana do skali
+    szarości (ImageProcessor.crop_and_convert_to_gray), a następnie zmniejszana; jeśli średnia
+    bezwzględna różnica względem klatki odniesienia jest mniejsza od progu, zwracany jest
+    poprzedni wynik. Klasa udostępnia ten sam interfejs co ImageProcessor, więc może go
+    zastąpić w trybie kamery i trybie wideo.
+    """
+
+    def __init__(self, image_processor: ImageProcessor, threshold: float = 2.0,
+                 size: Tuple[int, int] = (64, 48), crop_fraction: float = 1.0,
+                 max_reused_frames: int = 30) -> None:
+        """
+        Inicjalizuje obiekt MotionGate.
+
+        :param image_processor: Obiekt wykrywający siatkę twarzy.
+        :type image_processor: ImageProcessor
+        :param threshold: Średnia bezwzględna różnica jasności (0-255), poniżej której
+                          klatka uznawana jest za niezmienioną.
+        :type threshold: float
+        :param size: Rozmiar (szerokość, wysokość) porównywanych, zmniejszonych klatek.
+        :type size: Tuple[int, int]
+        :param crop_fraction: Część klatki (wycinana ze środka) uwzględniana w porównaniu.
+        :type crop_fraction: float
+        :param max_reused_frames: Maksymalna liczba kolejnych klatek z powtórzonym wynikiem.
+        :type max_reused_frames: int
+        """
+        self.image_processor = image_processor
+        self.threshold = threshold
+        self.size = size
+        self.crop_fraction = crop_fraction
+        self.max_reused_frames = max_reused_frames
+
+        self.processed_frames = 0
+        self.skipped_frames = 0
+        self.last_difference = 0.0
+
+        self._reference: Optional[np.ndarray] = None
+        self._previous_result: Optional[Tuple[Any, np.ndarray]] = None
+        self._reused_in_row = 0
+
+    @property
+    def face_mesh_settings(self) -> Dict[str, Any]:
+        """
+        Ustawienia FaceMesh obiektu ImageProcessor.
+        """
+        return self.image_processor.face_mesh_settings
+
+    def get_settings(self) -> Dict[str, Any]:
+        """
+        Zwraca ustawienia wpływające na wyznaczane landmarki, uzupełnione o parametry bramki.
+
+        :return: Słownik ustawień.
+        :rtype: dict
+        """
+        settings = self.image_processor.get_settings()
+        settings.update(motion_threshold=self.threshold, motion_size=list(self.size),
+                        motion_crop_fraction=self.crop_fraction,
+                        motion_max_reused_frames=self.max_reused_frames)
+        return settings
+
+    def reset_tracking(self) -> None:
+        """
+        Zapomina klatkę odniesienia i poprzedni wynik (np. przed przetwarzaniem nowego nagrania).
+        """
+        self.image_processor.reset_tracking()
+        self._reference = None
+        self._previous_result = None
+        self._reused_in_row = 0
+
+    def draw_overlay(self, image: np.ndarray, landmarks: np.ndarray, scale: float = 1.0,
+                     out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Nanosi landmarki na kopię obrazu (patrz ImageProcessor.draw_overlay).
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :param landmarks: Tablica landmarków (twarze, 478, 3) we współrzędnych znormalizowanych.
+        :type landmarks: np.ndarray
+        :param scale: Skala podglądu względem obrazu wejściowego.
+        :type scale: float
+        :param out: Bufor na podgląd wykorzystywany ponownie między klatkami.
+        :type out: Optional[np.ndarray]
+        :return: Kopia obrazu (w zadanej skali) z naniesionymi landmarkami.
+        :rtype: np.ndarray
+        """
+        return self.image_processor.draw_overlay(image, landmarks, scale, out)
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Zwraca liczniki klatek przetworzonych i pominiętych przez bramkę.
+
+        :return: Słownik z licznikami, odsetkiem pominiętych klatek i ostatnią różnicą.
+        :rtype: dict
+        """
+        total = self.processed_frames + self.skipped_frames
+        return {
+            "processed_frames": self.processed_frames,
+            "skipped_frames": self.skipped_frames,
+            "skipped_ratio": self.skipped_frames / total if total else 0.0,
+            "last_difference": self.last_difference
+        }
+
+    def _downsample(self, image: np.ndarray) -> np.ndarray:
+        """
+        Wycina środek klatki, konwertuje go do skali szarości i zmniejsza do rozmiaru 'size'.
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :return: Zmniejszony obraz w skali szarości (int16).
+        :rtype: np.ndarray
+        """
+        # _crop_image przycina pierwszą oś obrazu (wiersze) do pierwszego wymiaru
+        gray = self.image_processor.crop_and_convert_to_gray(
+            image,
+            int(image.shape[0] * self.crop_fraction),
+            int(image.shape[1] * self.crop_fraction))
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def process_face_image(self, image: np.ndarray) -> Tuple[np.ndarray, Any, np.ndarray]:
+        """
+        Wykrywa siatkę twarzy tylko wtedy, gdy klatka zmieniła się względem klatki odniesienia
+        (ostatniej klatki przekazanej do ImageProcessor); w przeciwnym razie zwraca poprzedni wynik
+        wraz z bieżącą klatką.
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :return: Krotka (processed_image, face_mesh_coords, landmarks), jak w ImageProcessor.process_face_image.
+        :rtype: tuple
+        """
+        small = self._downsample(image)
+        if self._reference is not None and self._reused_in_row < self.max_reused_frames:
+            self.last_difference = float(np.abs(small - self._reference).mean())
+            if self.last_difference < self.threshold:
+                self.skipped_frames += 1
+                self._reused_in_row += 1
+                face_mesh_coords, landmarks = self._previous_result
+                return image, face_mesh_coords, landmarks
+
+        processed_image, face_mesh_coords, landmarks = self.image_processor.process_face_image(image)
+        self.processed_frames += 1
+        self._reused_in_row = 0
+        self._reference = small
+        self._previous_result = (face_mesh_coords, landmarks)
+        return processed_image, face_mesh_coords, landmarks
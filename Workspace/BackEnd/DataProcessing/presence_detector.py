@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+from mediapipe import solutions
+from typing import Tuple
+
+
+class PresenceDetector:
+    """
+    Klasa PresenceDetector sprawdza, czy w kadrze znajduje się twarz, korzystając
+    z lekkiego detektora twarzy MediaPipe (face_detection) uruchamianego na zmniejszonej
+    klatce. Służy do wybudzania potoku z trybu bezczynności, gdy nikt nie siedzi przed kamerą,
+    bez uruchamiania pełnego FaceMesh.
+    """
+
+    def __init__(self, size: Tuple[int, int] = (160, 120), min_detection_confidence: float = 0.5) -> None:
+        """
+        Inicjalizuje obiekt PresenceDetector.
+
+        :param size: Rozmiar (szerokość, wysokość), do którego zmniejszana jest klatka.
+        :type size: Tuple[int, int]
+        :param min_detection_confidence: Minimalna pewność wykrycia twarzy.
+        :type min_detection_confidence: float
+        """
+        self.size = size
+        # model_selection=0 - model krótkiego zasięgu (twarz do ok. 2 m od kamery)
+        self._face_detection = solutions.face_detection.FaceDetection(
+            model_selection=0, min_detection_confidence=min_detection_confidence)
+
+    def detect(self, image: np.ndarray) -> bool:
+        """
+        Sprawdza, czy na obrazie wykryto co najmniej jedną twarz.
+
+        :param image: Obraz w formacie BGR.
+        :type image: np.ndarray
+        :return: True, jeśli wykryto twarz.
+        :rtype: bool
+        """
+        small = cv2.resize(image, self.size, interpolation=cv2.INTER_AREA)
+        results = self._face_detection.process(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        return bool(results.detections)
@@ -1,2 +1,5 @@
 from .random_forest import *
-from .data_saver import *
\ No newline at end of file
+from .flat_forest import *
+from .data_saver import *
+from .async_data_writer import *
+from .landmark_cache import *
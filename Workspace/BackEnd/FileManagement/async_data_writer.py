@@ -0,0 +1,160 @@
+import csv
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .data_saver import DataSaver
+
+
+class AsyncDataWriter:
+    """
+    Klasa AsyncDataWriter zapisuje wiersze danych do pliku CSV w osobnym wątku.
+    Wiersze trafiają do ograniczonej kolejki, a wątek zapisujący formatuje je
+    bez użycia pandas (moduł csv) i zapisuje paczkami - po zebraniu zadanej liczby
+    wierszy lub po upływie zadanego czasu. Plik otwierany jest tylko raz na całą sesję.
+    Ścieżka pliku (wraz z unikalną nazwą) pochodzi z obiektu DataSaver.
+    """
+
+    def __init__(self, data_saver: DataSaver, batch_size: int = 100,
+                 flush_interval: float = 1.0, max_queue_size: int = 10000) -> None:
+        """
+        Inicjalizuje obiekt AsyncDataWriter.
+
+        :param data_saver: Obiekt DataSaver wyznaczający ścieżkę pliku wynikowego.
+        :type data_saver: DataSaver
+        :param batch_size: Liczba wierszy, po której zebraniu następuje zapis.
+        :type batch_size: int
+        :param flush_interval: Maksymalny czas (w sekundach) przechowywania wierszy przed zapisem.
+        :type flush_interval: float
+        :param max_queue_size: Maksymalna liczba wierszy oczekujących w kolejce; przy pełnej
+                               kolejce metoda write() czeka na zwolnienie miejsca.
+        :type max_queue_size: int
+        """
+        self.data_saver = data_saver
+        self.saving_path = data_saver.saving_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.written_rows = 0
+        self.write_count = 0
+        self.last_write_latency = 0.0
+        self.max_write_latency = 0.0
+        self.total_write_latency = 0.0
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_marker = object()
+        self._thread: Optional[threading.Thread] = None
+        self._fieldnames: Optional[List[str]] = None
+
+    def start(self) -> "AsyncDataWriter":
+        """
+        Uruchamia wątek zapisujący.
+
+        :return: Obiekt AsyncDataWriter (umożliwia łączenie wywołań).
+        :rtype: AsyncDataWriter
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_worker, daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, data: Dict[str, Any]) -> None:
+        """
+        Dodaje wiersz danych do kolejki zapisu.
+
+        :param data: Słownik z danymi do zapisania (klucze pierwszego wiersza stanowią nagłówek).
+        :type data: dict
+        """
+        self._queue.put(data.copy())
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Zatrzymuje wątek zapisujący po zapisaniu wszystkich oczekujących wierszy.
+
+        :param timeout: Maksymalny czas oczekiwania (w sekundach) na zakończenie zapisu;
+                        None oznacza oczekiwanie do zapisania wszystkich wierszy.
+        :type timeout: float lub None
+        """
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(self._stop_marker)
+        thread.join(timeout=timeout)
+        if not thread.is_alive():
+            self._thread = None
+
+    def get_status(self) -> Dict[str, Any]:
+        """
+        Zwraca informacje o stanie zapisu.
+
+        :return: Słownik z głębokością kolejki, liczbą zapisanych wierszy i czasami zapisu (w sekundach).
+        :rtype: dict
+        """
+        return {
+            "queue_depth": self._queue.qsize(),
+            "written_rows": self.written_rows,
+            "last_write_latency": self.last_write_latency,
+            "max_write_latency": self.max_write_latency,
+            "mean_write_latency": self.total_write_latency / self.write_count if self.write_count else 0.0
+        }
+
+    def _writer_worker(self) -> None:
+        """
+        Wątek roboczy: zbiera wiersze z kolejki i zapisuje je paczkami.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        is_running = True
+
+        with open(self.saving_path, "a", newline="") as file:
+            writer = csv.writer(file)
+            while is_running:
+                try:
+                    row = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+                    if row is self._stop_marker:
+                        is_running = False
+                    else:
+                        batch.append(row)
+                except queue.Empty:
+                    pass
+
+                if batch and (len(batch) >= self.batch_size or not is_running
+                              or time.monotonic() >= deadline):
+                    self._write_batch(file, writer, batch)
+                    batch = []
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.flush_interval
+
+    def _write_batch(self, file, writer, batch: List[Dict[str, Any]]) -> None:
+        """
+        Formatuje i zapisuje paczkę wierszy, mierząc czas zapisu.
+
+        :param file: Otwarty plik wynikowy.
+        :param writer: Obiekt csv.writer powiązany z plikiem.
+        :param batch: Lista wierszy do zapisania.
+        :type batch: list
+        """
+        start = time.perf_counter()
+        if self._fieldnames is None:
+            self._fieldnames = list(batch[0].keys())
+            writer.writerow(self._fieldnames)
+
+        writer.writerows(
+            ["" if row.get(name) is None else row.get(name) for name in self._fieldnames]
+            for row in batch
+        )
+        file.flush()
+
+        latency = time.perf_counter() - start
+        self.written_rows += len(batch)
+        self.data_saver.index += len(batch)
+        self.write_count += 1
+        self.last_write_latency = latency
+        self.total_write_latency += latency
+        self.max_write_latency = max(self.max_write_latency, latency)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
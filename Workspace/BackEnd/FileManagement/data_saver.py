@@ -1,5 +1,9 @@
+import os
 import pathlib
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import openpyxl
 from typing import Dict, Any, List
 import threading
@@ -11,17 +15,51 @@ class DataSaver:
     unikając przy tym nadpisania istniejących plików. Główne metody to:
     - save_to_csv(): dopisywanie danych do istniejącego pliku bądź tworzenie nowego.
     - change_name_if_exists(): automatyczne zmienianie nazwy pliku, jeśli plik o danej nazwie istnieje.
+
+    Oprócz CSV dane wsadowe mogą być zapisywane w binarnych formatach kolumnowych
+    (Parquet, Feather, NPZ) ze zwartymi typami danych (cechy jako float32, etykiety
+    jako bool/uint8, indeksy klatek jako int32), co eliminuje koszt formatowania
+    i parsowania liczb zmiennoprzecinkowych w postaci tekstowej. Pliki Parquet i Feather
+    zapisywane są przyrostowo (kolejne grupy wierszy dopisywane do otwartego pliku),
+    a plik docelowy pojawia się po wywołaniu close().
     """
 
     default_filename = "results.csv"
 
+    # Obsługiwane formaty plików i odpowiadające im rozszerzenia
+    FILE_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather", "npz": ".npz"}
+
+    # Kolumny zapisywane w formatach kolumnowych jako liczby całkowite (indeksy)
+    INDEX_COLUMNS = ("Frame", "Sequence_id")
+    # Kolumny etykiet zapisywane jako bool lub uint8
+    LABEL_COLUMNS = ("Drowsy",)
+    # Kolumny wymagające pełnej precyzji float64
+    PRECISE_COLUMNS = ("Timestamp",)
+    # Liczba wierszy gromadzonych przed zapisaniem kolejnej grupy wierszy (Parquet, Feather)
+    ROW_GROUP_SIZE = 65536
+
     def __init__(self, filename: str = default_filename, save_path: pathlib.Path = None,
                  batch_size: int = 100, auto_flush_interval: float = 30.0,
-                 auto_flush_enabled: bool = False, flush_thread = None) -> None:
+                 auto_flush_enabled: bool = False, flush_thread = None,
+                 file_format: str = "csv", atomic: bool = False) -> None:
         """
-        Inicjalizuje obiekt DataSaver, ustalając ścieżkę docelową pliku CSV i
+        Inicjalizuje obiekt DataSaver, ustalając ścieżkę docelową pliku i
         zapewniając unikalną nazwę pliku (jeżeli istnieje konflikt nazw).
+        Rozszerzenie pliku dopasowywane jest do wybranego formatu.
+
+        :param file_format: Format zapisu danych wsadowych: "csv", "parquet", "feather" lub "npz".
+        :type file_format: str
+        :param atomic: Czy dane wsadowe mają być zapisywane atomowo - plik docelowy pojawia się
+                       dopiero przy close(), w całości (nigdy częściowo zapisany).
+                       Formaty kolumnowe zapisywane są zawsze w ten sposób.
+        :type atomic: bool
         """
+        if file_format not in self.FILE_FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+        self.file_format = file_format
+        self.atomic = atomic
+        filename = str(pathlib.PurePath(filename).with_suffix(self.FILE_FORMATS[file_format]))
+
         # Ustalanie ścieżki domyślnej, wychodząc z lokalizacji bieżącego pliku.
         if save_path is None:
             self.working_directory = pathlib.Path(__file__).parent.parent.parent
@@ -40,6 +78,14 @@ class DataSaver:
         self.lock = threading.Lock()
         self.auto_flush_enabled = auto_flush_enabled
         self.flush_thread = flush_thread
+        # Dane formatów kolumnowych (oraz zapisu atomowego) trafiają do pliku tymczasowego,
+        # który przy close() zastępuje plik docelowy
+        self.columnar_chunks: List[pd.DataFrame] = []
+        self.pending_rows = 0
+        self.temporary_path = self.saving_path.with_name(f"{self.saving_path.name}.{os.getpid()}.tmp")
+        self._writer = None
+        self._schema = None
+        self._temporary_file_created = False
 
     def save_to_csv(self, data: Dict[str, Any]) -> None:
         """
@@ -92,21 +138,205 @@ class DataSaver:
 
         self.index += len(data_list)
 
+    def batch_save(self, data_list: List[Dict[str, Any]]) -> None:
+        """
+        Zapisuje listę słowników w wybranym formacie. W przypadku CSV dane są dopisywane
+        do pliku. W formatach Parquet i Feather (oraz w trybie atomowym) wiersze gromadzone
+        są do rozmiaru ROW_GROUP_SIZE i dopisywane do pliku tymczasowego; format NPZ
+        nie wspiera dopisywania, więc jego dane zapisywane są w całości przy close().
+
+        :param data_list: Lista słowników z danymi do zapisania
+        """
+        if not data_list:
+            return
+
+        if self.file_format == "csv" and not self.atomic:
+            self.batch_save_to_csv(data_list)
+            return
+
+        df = pd.DataFrame(data_list)
+        if self.file_format != "csv":
+            df = self.compact_dtypes(df)
+        self.columnar_chunks.append(df)
+        self.pending_rows += len(df)
+        self.index += len(df)
+        if self.file_format != "npz" and self.pending_rows >= self.ROW_GROUP_SIZE:
+            self._write_pending_rows()
+
+    def _write_pending_rows(self) -> None:
+        """
+        Dopisuje zgromadzone wiersze do pliku tymczasowego jako kolejną grupę wierszy
+        (dla CSV - kolejne wiersze tekstu), otwierając plik przy pierwszym zapisie.
+        """
+        if not self.columnar_chunks:
+            return
+        df = pd.concat(self.columnar_chunks, ignore_index=True)
+        self.columnar_chunks = []
+        self.pending_rows = 0
+
+        if self.file_format == "csv":
+            df.to_csv(self.temporary_path, mode="a", header=not self._temporary_file_created, index=False)
+            self._temporary_file_created = True
+            return
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self._writer is None:
+            self._temporary_file_created = True
+            self._schema = table.schema
+            if self.file_format == "parquet":
+                self._writer = pq.ParquetWriter(self.temporary_path, self._schema)
+            else:
+                # Feather w wersji 2 to plik Arrow IPC (kompresja jak w DataFrame.to_feather)
+                self._writer = pa.ipc.new_file(str(self.temporary_path), self._schema,
+                                               options=pa.ipc.IpcWriteOptions(compression="lz4"))
+        elif table.schema != self._schema:
+            # Kolejne grupy wierszy muszą mieć schemat pierwszej
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+
     def _flush_batch(self) -> None:
         """
         Wewnętrzna metoda do zapisywania batcha. Nie używać bezpośrednio.
         """
         if self.batch_buffer:
-            self.batch_save_to_csv(self.batch_buffer)
+            self.batch_save(self.batch_buffer)
             self.batch_buffer.clear()
             self.last_flush_time = time.time()
 
     def flush_batch(self) -> None:
         """
-        Wymusza natychmiastowe zapisanie wszystkich danych z batcha.
+        Wymusza natychmiastowe zapisanie wszystkich danych z batcha. W formatach Parquet
+        i Feather (i w trybie atomowym) dane dopisywane są do pliku tymczasowego,
+        bez ponownego zapisywania wcześniejszych wierszy; plik docelowy pojawia się przy close().
         """
         with self.lock:
             self._flush_batch()
+            if self.file_format != "npz":
+                self._write_pending_rows()
+
+    def close(self) -> None:
+        """
+        Zapisuje wszystkie dane i zamyka plik. W formatach kolumnowych (i w trybie atomowym)
+        plik tymczasowy zastępuje plik docelowy, więc ten nigdy nie jest zapisany częściowo.
+        Kolejne wywołania nie mają efektu, dopóki nie zostaną dodane nowe dane.
+        """
+        with self.lock:
+            self._flush_batch()
+            if self.file_format == "npz":
+                if self.columnar_chunks:
+                    self.write_data_frame(pd.concat(self.columnar_chunks, ignore_index=True),
+                                          self.saving_path)
+                    self.columnar_chunks = []
+                    self.pending_rows = 0
+                return
+
+            self._write_pending_rows()
+            if not self._temporary_file_created:
+                return
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._temporary_file_created = False
+            os.replace(self.temporary_path, self.saving_path)
+
+    @classmethod
+    def compact_dtypes(cls, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Zwraca kopię ramki danych ze zwartymi typami kolumn: indeksy jako int32,
+        etykiety jako bool lub uint8, pozostałe cechy zmiennoprzecinkowe jako float32.
+
+        :param df: Ramka danych do konwersji.
+        :type df: pandas.DataFrame
+        :return: Ramka danych ze zwartymi typami kolumn.
+        :rtype: pandas.DataFrame
+        """
+        df = df.copy()
+        for column in df.columns:
+            values = df[column]
+            if column in cls.INDEX_COLUMNS:
+                df[column] = values.astype(np.int32)
+            elif column in cls.LABEL_COLUMNS:
+                if values.isna().any():
+                    # Brak etykiety (np. brak twarzy) zapisywany jest jako NaN
+                    df[column] = values.astype(np.float32)
+                elif values.dtype == object:
+                    df[column] = values.astype(bool)
+                elif values.dtype != bool:
+                    df[column] = values.astype(np.uint8)
+            elif column not in cls.PRECISE_COLUMNS and pd.api.types.is_float_dtype(values):
+                df[column] = values.astype(np.float32)
+        return df
+
+    @classmethod
+    def write_data_frame(cls, df: pd.DataFrame, path: pathlib.Path) -> None:
+        """
+        Zapisuje całą ramkę danych do pliku w formacie wynikającym z rozszerzenia.
+        Dla formatów kolumnowych stosowane są zwarte typy kolumn. Zapis jest atomowy:
+        dane trafiają najpierw do pliku tymczasowego, który następnie zastępuje plik docelowy,
+        więc przerwany zapis nigdy nie pozostawia częściowo zapisanego pliku.
+
+        :param df: Ramka danych do zapisania.
+        :type df: pandas.DataFrame
+        :param path: Ścieżka pliku (.csv, .parquet, .feather lub .npz).
+        :type path: pathlib.Path
+        """
+        path = pathlib.Path(path)
+        suffix = path.suffix.lower()
+        if suffix not in cls.FILE_FORMATS.values():
+            raise ValueError(f"Unsupported file format: {suffix}")
+        if suffix != ".csv":
+            df = cls.compact_dtypes(df).reset_index(drop=True)
+
+        temporary_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with open(temporary_path, "wb") as file:
+                if suffix == ".csv":
+                    df.to_csv(file, index=False)
+                elif suffix == ".parquet":
+                    df.to_parquet(file, index=False)
+                elif suffix == ".feather":
+                    df.to_feather(file)
+                else:
+                    np.savez(file, **{column: df[column].to_numpy() for column in df.columns})
+            os.replace(temporary_path, path)
+        finally:
+            if temporary_path.exists():
+                temporary_path.unlink()
+
+    @classmethod
+    def load_data_frame(cls, path: pathlib.Path) -> pd.DataFrame:
+        """
+        Wczytuje ramkę danych z pliku w formacie wynikającym z rozszerzenia.
+
+        :param path: Ścieżka pliku (.csv, .parquet, .feather lub .npz).
+        :type path: pathlib.Path
+        :return: Wczytana ramka danych.
+        :rtype: pandas.DataFrame
+        """
+        path = pathlib.Path(path)
+        suffix = path.suffix.lower()
+        if suffix == ".csv":
+            return pd.read_csv(path)
+        if suffix == ".parquet":
+            return pd.read_parquet(path)
+        if suffix == ".feather":
+            return pd.read_feather(path)
+        if suffix == ".npz":
+            with np.load(path, allow_pickle=False) as data:
+                return pd.DataFrame({column: data[column] for column in data.files})
+        raise ValueError(f"Unsupported file format: {suffix}")
+
+    @classmethod
+    def is_supported_file(cls, path: pathlib.Path) -> bool:
+        """
+        Sprawdza, czy plik ma rozszerzenie jednego z obsługiwanych formatów.
+
+        :param path: Ścieżka pliku.
+        :type path: pathlib.Path
+        :return: True, jeśli format pliku jest obsługiwany.
+        :rtype: bool
+        """
+        return pathlib.Path(path).suffix.lower() in cls.FILE_FORMATS.values()
 
     def start_auto_flush(self) -> None:
         """
@@ -125,7 +355,7 @@ class DataSaver:
         self.auto_flush_enabled = False
         if self.flush_thread:
             self.flush_thread.join(timeout=1.0)
-        self.flush_batch()  # Final flush
+        self.close()  # Final flush
 
     def _auto_flush_worker(self) -> None:
         """
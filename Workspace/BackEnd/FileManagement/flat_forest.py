@@ -0,0 +1,105 @@
+import numpy as np
+from typing import Any, List, Optional
+
+
+class FlatForest:
+    """
+    Klasa FlatForest przechowuje las decyzyjny scikit-learn (np. RandomForestClassifier)
+    w postaci płaskich tablic NumPy: numer cechy, próg, dzieci i rozkład klas w liściu
+    dla wszystkich węzłów wszystkich drzew. Predykcja dla jednej obserwacji schodzi
+    jednocześnie po wszystkich drzewach, bez walidacji danych i rozdzielania zadań
+    między wątki, które w scikit-learn kosztują milisekundy przy pojedynczej próbce.
+    Głosy klas (uśrednione rozkłady z liści) są takie same jak w predict_proba().
+    """
+
+    def __init__(self, forest: Any) -> None:
+        """
+        Inicjalizuje obiekt FlatForest, eksportując drzewa przekazanego lasu do płaskich tablic.
+
+        :param forest: Wytrenowany klasyfikator scikit-learn złożony z drzew (atrybut estimators_).
+        :type forest: Any
+        :raises ValueError: Jeśli model nie jest klasyfikatorem złożonym z drzew decyzyjnych.
+        """
+        if not self.supports(forest):
+            raise ValueError(f"Unsupported model for FlatForest: {type(forest).__name__}")
+
+        self.classes_: np.ndarray = np.asarray(forest.classes_)
+        # Kolejność cech, w której model był trenowany (None, jeśli trenowano bez nazw kolumn)
+        feature_names = getattr(forest, "feature_names_in_", None)
+        self.feature_names: Optional[List[str]] = None if feature_names is None else list(feature_names)
+        self.n_features: int = int(forest.n_features_in_)
+
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        node_counts = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(node_counts)[:-1]))
+        n_classes = len(self.classes_)
+
+        # Korzenie kolejnych drzew we wspólnej numeracji węzłów
+        self.roots: np.ndarray = offsets.astype(np.intp)
+        self.max_depth: int = max(tree.max_depth for tree in trees)
+        self.feature: np.ndarray = np.concatenate([tree.feature for tree in trees]).astype(np.intp)
+        self.threshold: np.ndarray = np.concatenate([tree.threshold for tree in trees]).astype(np.float64)
+        # Dzieci węzła w kolumnach [lewe, prawe]; liście wskazują same na siebie, dzięki czemu
+        # wszystkie drzewa można przechodzić jednocześnie przez max_depth kroków
+        self.children: np.ndarray = np.empty((len(self.feature), 2), dtype=np.intp)
+        self.value: np.ndarray = np.empty((len(self.feature), n_classes), dtype=np.float64)
+        for tree, offset in zip(trees, offsets):
+            nodes = slice(offset, offset + tree.node_count)
+            is_leaf = tree.children_left < 0
+            node_ids = np.arange(offset, offset + tree.node_count)
+            self.children[nodes, 0] = np.where(is_leaf, node_ids, tree.children_left + offset)
+            self.children[nodes, 1] = np.where(is_leaf, node_ids, tree.children_right + offset)
+            # Rozkład klas w węźle znormalizowany tak jak w DecisionTreeClassifier.predict_proba
+            value = tree.value[:, 0, :n_classes].astype(np.float64)
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            self.value[nodes] = value / normalizer
+        # Liście nie mają cechy podziału (-2 w scikit-learn); dowolny poprawny indeks wystarczy
+        self.feature[self.feature < 0] = 0
+
+    @staticmethod
+    def supports(model: Any) -> bool:
+        """
+        Sprawdza, czy model można wyeksportować do płaskich tablic
+        (klasyfikator z jednym wyjściem, złożony z drzew decyzyjnych).
+
+        :param model: Wczytany model.
+        :type model: Any
+        :return: True, jeśli model jest obsługiwany.
+        :rtype: bool
+        """
+        estimators = getattr(model, "estimators_", None)
+        return (hasattr(model, "classes_")
+                and getattr(model, "n_outputs_", 1) == 1
+                and isinstance(estimators, list) and len(estimators) > 0
+                and all(hasattr(estimator, "tree_") for estimator in estimators))
+
+    def predict_votes(self, features: np.ndarray) -> np.ndarray:
+        """
+        Wyznacza głosy klas dla jednej obserwacji (średni rozkład klas z liści wszystkich drzew),
+        odpowiadające wierszowi wyniku predict_proba() modelu scikit-learn.
+
+        :param features: Wektor cech o długości n_features, w kolejności cech modelu.
+        :type features: np.ndarray
+        :return: Tablica głosów o kształcie (liczba_klas,).
+        :rtype: np.ndarray
+        """
+        # Drzewa scikit-learn porównują cechy rzutowane na float32 z progami float64
+        features = np.asarray(features, dtype=np.float32)
+        nodes = self.roots
+        for _ in range(self.max_depth):
+            go_right = features[self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[nodes, go_right.view(np.int8)]
+        # Sumowanie drzew po kolei, jak w predict_proba(), a następnie uśrednienie
+        return np.add.reduce(self.value[nodes], axis=0) / len(self.roots)
+
+    def predict(self, features: np.ndarray) -> Any:
+        """
+        Zwraca klasę z największą liczbą głosów dla jednej obserwacji (jak predict() w scikit-learn).
+
+        :param features: Wektor cech o długości n_features, w kolejności cech modelu.
+        :type features: np.ndarray
+        :return: Etykieta klasy (np. "Drowsy").
+        :rtype: Any
+        """
+        return self.classes_[np.argmax(self.predict_votes(features))]
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import os
+import pathlib
+import numpy as np
+from typing import Any, Dict, Optional, Tuple
+
+
+class LandmarkCacheWriter:
+    """
+    Klasa LandmarkCacheWriter zapisuje landmarki kolejnych klatek jednego nagrania
+    do pliku mapowanego w pamięci. Wpis staje się widoczny w pamięci podręcznej
+    dopiero po wywołaniu commit(), więc przerwane przetwarzanie nie pozostawia
+    niekompletnych danych.
+    """
+
+    def __init__(self, data_path: pathlib.Path, metadata_path: pathlib.Path,
+                 frame_count: int, landmark_count: int, dtype: str,
+                 metadata: Dict[str, Any]) -> None:
+        """
+        Inicjalizuje obiekt LandmarkCacheWriter, alokując plik tymczasowy
+        o kształcie (frame_count, landmark_count, 3) wypełniony wartościami NaN.
+
+        :param data_path: Docelowa ścieżka pliku z landmarkami (.npy).
+        :type data_path: pathlib.Path
+        :param metadata_path: Docelowa ścieżka pliku z metadanymi (.json).
+        :type metadata_path: pathlib.Path
+        :param frame_count: Maksymalna liczba zapisywanych klatek.
+        :type frame_count: int
+        :param landmark_count: Liczba landmarków na klatkę.
+        :type landmark_count: int
+        :param dtype: Typ danych landmarków ("float16" lub "float32").
+        :type dtype: str
+        :param metadata: Dodatkowe metadane zapisywane razem z wpisem (np. FPS).
+        :type metadata: dict
+        """
+        self.data_path = data_path
+        self.metadata_path = metadata_path
+        self.metadata = dict(metadata)
+        self._temporary_path = data_path.with_name(f"{data_path.name}.{os.getpid()}.tmp")
+        self.landmarks = np.lib.format.open_memmap(
+            self._temporary_path, mode="w+", dtype=dtype,
+            shape=(max(frame_count, 0), landmark_count, 3))
+        self.landmarks[:] = np.nan
+
+    def write(self, start_row: int, landmarks: np.ndarray) -> None:
+        """
+        Zapisuje landmarki kolejnych klatek, zaczynając od wskazanego wiersza.
+
+        :param start_row: Indeks pierwszego zapisywanego wiersza.
+        :type start_row: int
+        :param landmarks: Landmarki o kształcie (n, landmark_count, 3), NaN dla klatek bez twarzy.
+        :type landmarks: np.ndarray
+        """
+        self.landmarks[start_row:start_row + len(landmarks)] = landmarks
+
+    def commit(self, frames_written: int) -> None:
+        """
+        Zapisuje plik na dysku i udostępnia wpis w pamięci podręcznej.
+
+        :param frames_written: Liczba faktycznie przetworzonych klatek.
+        :type frames_written: int
+        """
+        self.landmarks.flush()
+        del self.landmarks
+        os.replace(self._temporary_path, self.data_path)
+
+        self.metadata["frames"] = int(frames_written)
+        temporary_metadata_path = self.metadata_path.with_name(f"{self.metadata_path.name}.{os.getpid()}.tmp")
+        with open(temporary_metadata_path, "w") as file:
+            json.dump(self.metadata, file)
+        os.replace(temporary_metadata_path, self.metadata_path)
+
+    def discard(self) -> None:
+        """
+        Porzuca niezatwierdzony wpis i usuwa plik tymczasowy.
+        """
+        if hasattr(self, "landmarks"):
+            del self.landmarks
+        if self._temporary_path.exists():
+            self._temporary_path.unlink()
+
+
+class LandmarkCache:
+    """
+    Klasa LandmarkCache przechowuje na dysku surowe landmarki wszystkich klatek nagrań,
+    dzięki czemu zmiana progów lub logiki wyznaczania parametrów nie wymaga ponownego
+    uruchamiania MediaPipe. Wpisy identyfikowane są skrótem zawartości pliku wideo
+    oraz ustawień FaceMesh i odczytywane jako tablice mapowane w pamięci.
+    """
+
+    def __init__(self, cache_folder: pathlib.Path, dtype: str = "float32") -> None:
+        """
+        Inicjalizuje obiekt LandmarkCache.
+
+        :param cache_folder: Folder przechowujący pliki pamięci podręcznej.
+        :type cache_folder: pathlib.Path
+        :param dtype: Typ danych przechowywanych landmarków: "float32" (wyniki identyczne
+                      z przetwarzaniem bez pamięci podręcznej) lub "float16" (o połowę mniejsze pliki).
+        :type dtype: str
+        """
+        if dtype not in ("float16", "float32"):
+            raise ValueError(f"Unsupported landmark cache dtype: {dtype}")
+        self.cache_folder = pathlib.Path(cache_folder)
+        self.cache_folder.mkdir(parents=True, exist_ok=True)
+        self.dtype = dtype
+
+    @staticmethod
+    def hash_file(path: pathlib.Path, block_size: int = 4 * 1024 * 1024) -> str:
+        """
+        Oblicza skrót SHA-256 zawartości pliku, czytając go blokami.
+
+        :param path: Ścieżka pliku.
+        :type path: pathlib.Path
+        :param block_size: Rozmiar czytanego bloku w bajtach.
+        :type block_size: int
+        :return: Skrót zawartości w postaci szesnastkowej.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def make_key(self, video_path: pathlib.Path, settings: Dict[str, Any]) -> str:
+        """
+        Wyznacza klucz wpisu na podstawie zawartości nagrania, ustawień przetwarzania
+        i typu danych pamięci podręcznej.
+
+        :param video_path: Ścieżka nagrania.
+        :type video_path: pathlib.Path
+        :param settings: Ustawienia wpływające na landmarki (np. ustawienia FaceMesh).
+        :type settings: dict
+        :return: Klucz wpisu.
+        :rtype: str
+        """
+        settings_json = json.dumps({**settings, "dtype": self.dtype}, sort_keys=True)
+        settings_hash = hashlib.sha256(settings_json.encode()).hexdigest()
+        return f"{self.hash_file(video_path)[:32]}_{settings_hash[:12]}"
+
+    def _paths(self, key: str) -> Tuple[pathlib.Path, pathlib.Path]:
+        return self.cache_folder / f"{key}.npy", self.cache_folder / f"{key}.json"
+
+    def load(self, key: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        """
+        Wczytuje wpis jako tablicę mapowaną w pamięci.
+
+        :param key: Klucz wpisu.
+        :type key: str
+        :return: Krotka (landmarks, metadata) lub None, jeśli wpis nie istnieje.
+        :rtype: Optional[Tuple[np.ndarray, dict]]
+        """
+        data_path, metadata_path = self._paths(key)
+        if not metadata_path.exists() or not data_path.exists():
+            return None
+
+        with open(metadata_path) as file:
+            metadata = json.load(file)
+        landmarks = np.load(data_path, mmap_mode="r")
+        return landmarks[:metadata["frames"]], metadata
+
+    def create(self, key: str, frame_count: int, landmark_count: int,
+               metadata: Dict[str, Any]) -> LandmarkCacheWriter:
+        """
+        Tworzy nowy wpis do zapisu.
+
+        :param key: Klucz wpisu.
+        :type key: str
+        :param frame_count: Maksymalna liczba zapisywanych klatek.
+        :type frame_count: int
+        :param landmark_count: Liczba landmarków na klatkę.
+        :type landmark_count: int
+        :param metadata: Metadane wpisu (np. FPS, krok próbkowania).
+        :type metadata: dict
+        :return: Obiekt zapisujący wpis.
+        :rtype: LandmarkCacheWriter
+        """
+        data_path, metadata_path = self._paths(key)
+        return LandmarkCacheWriter(data_path, metadata_path, frame_count,
+                                   landmark_count, self.dtype, metadata)
@@ -1,10 +1,15 @@
 import os
 import pathlib
-import numpy as np
 import sys
 import pickle
+import time
+import numpy as np
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from pandas import DataFrame
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from Workspace.Utilities import RollingWindow
+from .flat_forest import FlatForest
 
 
 class RandomForest:
@@ -14,18 +19,34 @@ class RandomForest:
     jak również dodawać nowe ścieżki do modeli.
     """
 
+    # Kolejność cech w wektorach przekazywanych do predict() i moving_mode_value_prediction()
+    FEATURE_NAMES: Tuple[str, ...] = ("MAR", "EAR", "Roll", "Pitch")
+
 
 
-    def __init__(self, activation_certainty: float = 0.5, prediction_memory_size: int = 60) -> None:
+    def __init__(self, activation_certainty: float = 0.5, prediction_memory_size: int = 60,
+                 cache_size: int = 0,
+                 cache_resolution: Union[float, Sequence[float]] = (1e-5, 1e-5, 1e-4, 1e-4)) -> None:
         """
         Inicjalizuje obiekt RandomForest, ustala ścieżki do modeli
         zawartych w domyślnej liście 'default_relative_model_locations'
         i zapisuje je w słowniku 'self.model_paths'.
 
+        Opcjonalna pamięć podręczna (LRU) przechowuje predykcje modelu dla wektorów cech
+        zaokrąglonych do 'cache_resolution'; kolejne klatki o niemal identycznych cechach
+        nie wywołują modelu ponownie. Dla lasów drzew zapamiętywane są tylko komórki
+        zaokrąglenia, w których nie leży żaden próg podziału, więc pamięć podręczna nie
+        zmienia predykcji. Dla innych modeli rozdzielczość należy sprawdzić metodą
+        verify_cache_resolution().
+
         :param activation_certainty: Minimalny "procent" (np. 0.5) potwierdzający senność.
         :type activation_certainty: float
         :param prediction_memory_size: Rozmiar "pamięci" (bufora) przechowującej ostatnie predykcje.
         :type prediction_memory_size: int
+        :param cache_size: Maksymalna liczba predykcji w pamięci podręcznej (0 wyłącza pamięć podręczną).
+        :type cache_size: int
+        :param cache_resolution: Krok zaokrąglenia cech (jedna wartość lub osobno dla każdej z FEATURE_NAMES).
+        :type cache_resolution: Union[float, Sequence[float]]
         """
         # Słownik przechowujący nazwy modeli i odpowiadające im ścieżki na dysku
         self.model_paths = {}
@@ -33,7 +54,14 @@ class RandomForest:
         # Wartość progowa, powyżej której uznawana jest senność
         self.activation_certainty: float = activation_certainty
         # Bufor do przechowywania ostatnich predykcji (True/False)
-        self.prediction_memory: np.ndarray = np.zeros(prediction_memory_size, dtype=bool)
+        self.prediction_memory: RollingWindow = RollingWindow(prediction_memory_size)
+
+        # Pamięć podręczna predykcji: klucz - zaokrąglony wektor cech, wartość - predykcja modelu
+        self.cache_size: int = cache_size
+        self.cache_resolution: np.ndarray = self._as_resolution(cache_resolution)
+        self._prediction_cache: "OrderedDict[bytes, bool]" = OrderedDict()
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
 
         base_dir = pathlib.Path(sys.argv[0]).parent  # The folder containing the .exe
         pkl_path = base_dir / "Workspace" / "Models" / "random_forest_drowsiness_model.pkl"
@@ -46,6 +74,7 @@ class RandomForest:
         except Exception as e:
             print(f"Not loaded. Error: {e}")
             raise e
+        self._compile_model()
 
 
     def save_model_path_from_relative_path(self, relative_path: str) -> None:
@@ -87,51 +116,300 @@ class RandomForest:
             with open(model_path, 'rb') as open_file:
                 self.random_forest = pickle.load(open_file)
                 loaded_models[model_name] = self.random_forest
+        self._compile_model()
         return loaded_models
 
-    def predict(self, data: DataFrame) -> bool:
+    def _compile_model(self) -> None:
+        """
+        Przygotowuje wczytany model do predykcji pojedynczych obserwacji: sprawdza (jednorazowo)
+        zgodność cech modelu z FEATURE_NAMES, wyznacza przestawienie wektora cech do kolejności
+        cech modelu i eksportuje las do płaskich tablic (FlatForest). Modele, których nie da się
+        wyeksportować, obsługuje scikit-learn.
+
+        :raises ValueError: Jeśli model oczekuje innych cech niż FEATURE_NAMES.
+        """
+        model_names = getattr(self.random_forest, "feature_names_in_", None)
+        # Nazwy kolumn modelu (None - model trenowany bez nazw, cechy w kolejności FEATURE_NAMES)
+        self._model_columns: Optional[List[str]] = None
+        # Indeksy FEATURE_NAMES w kolejności cech modelu (None - kolejność zgodna)
+        self._feature_order: Optional[np.ndarray] = None
+        if model_names is not None:
+            self._model_columns = [str(name) for name in model_names]
+            if sorted(self._model_columns) != sorted(self.FEATURE_NAMES):
+                raise ValueError(f"Model features {self._model_columns} do not match {list(self.FEATURE_NAMES)}")
+            if self._model_columns != list(self.FEATURE_NAMES):
+                self._feature_order = np.array([self.FEATURE_NAMES.index(name) for name in self._model_columns])
+        elif getattr(self.random_forest, "n_features_in_", len(self.FEATURE_NAMES)) != len(self.FEATURE_NAMES):
+            raise ValueError(f"Model expects {self.random_forest.n_features_in_} features, "
+                             f"got {len(self.FEATURE_NAMES)}")
+
+        self.flat_forest: Optional[FlatForest] = None
+        # Posortowane progi podziałów każdej z cech (w kolejności FEATURE_NAMES)
+        self._split_thresholds: Optional[List[List[float]]] = None
+        if FlatForest.supports(self.random_forest):
+            self.flat_forest = FlatForest(self.random_forest)
+            is_split = self.flat_forest.children[:, 0] != np.arange(len(self.flat_forest.feature))
+            model_features = list(range(len(self.FEATURE_NAMES))) if self._feature_order is None \
+                else list(self._feature_order)
+            self._split_thresholds = [
+                np.unique(self.flat_forest.threshold[is_split & (self.flat_forest.feature == column)]).tolist()
+                for column in np.argsort(model_features)]
+        # Predykcje poprzedniego modelu są nieaktualne
+        self.reset_cache()
+
+    def reset_cache(self) -> None:
+        """
+        Czyści pamięć podręczną predykcji i zeruje liczniki trafień i chybień.
+        """
+        self._prediction_cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @classmethod
+    def _as_resolution(cls, resolution: Union[float, Sequence[float]]) -> np.ndarray:
+        """
+        Zwraca krok zaokrąglenia jako tablicę z osobną wartością dla każdej z FEATURE_NAMES.
+
+        :param resolution: Jedna wartość lub wartości dla kolejnych cech.
+        :type resolution: Union[float, Sequence[float]]
+        :return: Tablica o kształcie (len(FEATURE_NAMES),).
+        :rtype: np.ndarray
+        """
+        return np.broadcast_to(np.asarray(resolution, dtype=np.float64), (len(cls.FEATURE_NAMES),)).copy()
+
+    @staticmethod
+    def _quantize(features: np.ndarray, resolution: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Zaokrągla wektor cech do wielokrotności kroku (numery komórek zaokrąglenia).
+
+        :param features: Wektor cech w kolejności FEATURE_NAMES.
+        :type features: np.ndarray
+        :param resolution: Krok zaokrąglenia każdej z cech.
+        :type resolution: np.ndarray
+        :return: Numery komórek lub None, jeśli wektor zawiera wartości nieskończone lub NaN.
+        :rtype: Optional[np.ndarray]
         """
-        Dokonuje predykcji senności na podstawie przekazanych danych (DataFrame).
+        if not np.isfinite(features).all():
+            return None
+        return np.rint(features / resolution).astype(np.int64)
 
-        :param data: Zbiór cech (m.in. EAR, MAR, PERCLOS itp.) dla pojedynczej obserwacji.
+    def _is_cacheable(self, cells: np.ndarray, resolution: np.ndarray) -> bool:
+        """
+        Sprawdza, czy wszystkie wektory z danej komórki zaokrąglenia trafiają w każdym drzewie
+        do tego samego liścia, tj. czy w komórce nie leży żaden próg podziału (z marginesem
+        na rzutowanie cech na float32). Dla modeli innych niż las drzew zwraca zawsze True.
+
+        :param cells: Numery komórek zaokrąglenia (wynik _quantize()).
+        :type cells: np.ndarray
+        :param resolution: Krok zaokrąglenia każdej z cech.
+        :type resolution: np.ndarray
+        :return: True, jeśli predykcję komórki można zapamiętać.
+        :rtype: bool
+        """
+        if self._split_thresholds is None:
+            return True
+        # Kilka wartości - bisect na listach jest tu szybszy od operacji NumPy
+        for thresholds, cell, step in zip(self._split_thresholds, cells.tolist(), resolution.tolist()):
+            low, high = (cell - 0.5) * step, (cell + 0.5) * step
+            margin = 1e-6 * max(abs(low), abs(high)) + 1e-12
+            if bisect_left(thresholds, low - margin) != bisect_right(thresholds, high + margin):
+                return False
+        return True
+
+    def _to_feature_vector(self, data: DataFrame) -> np.ndarray:
+        """
+        Zwraca pierwszy wiersz danych jako wektor cech w kolejności FEATURE_NAMES.
+
+        :param data: Zbiór cech dla pojedynczej obserwacji.
         :type data: pandas.DataFrame
+        :return: Wektor cech.
+        :rtype: np.ndarray
+        """
+        return data[list(self.FEATURE_NAMES)].to_numpy(dtype=np.float64)[0]
+
+    def _to_model_order(self, features: np.ndarray) -> np.ndarray:
+        """
+        Przestawia wektor cech z kolejności FEATURE_NAMES do kolejności cech modelu.
+
+        :param features: Wektor cech w kolejności FEATURE_NAMES.
+        :type features: np.ndarray
+        :return: Wektor cech w kolejności cech modelu.
+        :rtype: np.ndarray
+        """
+        return features if self._feature_order is None else features[self._feature_order]
+
+    def predict(self, data: Union[DataFrame, np.ndarray]) -> bool:
+        """
+        Dokonuje predykcji senności na podstawie przekazanych danych. Wektor cech NumPy
+        (w kolejności FEATURE_NAMES, np. bufor wypełniany dla każdej klatki) omija tworzenie
+        DataFrame i jest szybszy od jednowierszowego DataFrame.
+
+        :param data: Zbiór cech dla pojedynczej obserwacji (DataFrame z kolumnami FEATURE_NAMES
+                     lub wektor cech w kolejności FEATURE_NAMES).
+        :type data: Union[pandas.DataFrame, np.ndarray]
         :return: True w przypadku rozpoznania senności, False w przeciwnym wypadku.
         :rtype: bool
         """
         value_map = {"Drowsy": True, "Not_drowsy": False}
-        prediction = value_map[self.random_forest.predict(data)[0]]
+        if isinstance(data, DataFrame):
+            if self.flat_forest is None and not self.cache_size:
+                return value_map[self.random_forest.predict(data)[0]]
+            data = self._to_feature_vector(data)
+
+        cells = self._quantize(data, self.cache_resolution) if self.cache_size else None
+        if cells is None:
+            return self._predict_vector(data)
+
+        key = cells.tobytes()
+        prediction = self._prediction_cache.get(key)
+        if prediction is not None:
+            self._prediction_cache.move_to_end(key)
+            self.cache_hits += 1
+            return prediction
+
+        self.cache_misses += 1
+        prediction = self._predict_vector(data)
+        if self._is_cacheable(cells, self.cache_resolution):
+            self._prediction_cache[key] = prediction
+            if len(self._prediction_cache) > self.cache_size:
+                # Usunięcie najdawniej używanej predykcji
+                self._prediction_cache.popitem(last=False)
         return prediction
 
-    def moving_mode_value_prediction(self, data: DataFrame) -> bool:
+    def _predict_vector(self, features: np.ndarray) -> bool:
+        """
+        Dokonuje predykcji senności dla wektora cech z pominięciem pamięci podręcznej.
+
+        :param features: Wektor cech w kolejności FEATURE_NAMES.
+        :type features: np.ndarray
+        :return: True w przypadku rozpoznania senności, False w przeciwnym wypadku.
+        :rtype: bool
+        """
+        value_map = {"Drowsy": True, "Not_drowsy": False}
+        features = self._to_model_order(features)
+        if self.flat_forest is not None:
+            return value_map[self.flat_forest.predict(features)]
+        if self._model_columns is None:
+            return value_map[self.random_forest.predict(features[None, :])[0]]
+        return value_map[self.random_forest.predict(DataFrame([features], columns=self._model_columns))[0]]
+
+    def verify_cache_resolution(self, data: DataFrame,
+                                resolution: Union[float, Sequence[float], None] = None,
+                                cache_size: Optional[int] = None) -> Dict[str, float]:
+        """
+        Sprawdza, czy pamięć podręczna o podanej rozdzielczości zmienia predykcje i jak często
+        jest trafiana: odtwarza jej działanie dla kolejnych wierszy danych (np. zbioru
+        walidacyjnego, w kolejności klatek) i porównuje zwracane z niej predykcje z predykcjami modelu.
+
+        :param data: Zbiór obserwacji z kolumnami FEATURE_NAMES.
+        :type data: pandas.DataFrame
+        :param resolution: Sprawdzany krok zaokrąglenia (domyślnie 'self.cache_resolution').
+        :type resolution: Union[float, Sequence[float], None]
+        :param cache_size: Rozmiar pamięci podręcznej (domyślnie 'self.cache_size', co najmniej 1).
+        :type cache_size: Optional[int]
+        :return: Słownik z liczbą obserwacji, trafień, odsetkiem trafień i liczbą zmienionych predykcji.
+        :rtype: dict
+        """
+        resolution = self.cache_resolution if resolution is None else self._as_resolution(resolution)
+        cache_size = max(self.cache_size if cache_size is None else cache_size, 1)
+        features = data[list(self.FEATURE_NAMES)].to_numpy(dtype=np.float64)
+        predictions = self.predict_batch(features)
+
+        cache: "OrderedDict[bytes, bool]" = OrderedDict()
+        hits = mismatches = 0
+        for row, vector in enumerate(features):
+            cells = self._quantize(vector, resolution)
+            if cells is None:
+                continue
+            key = cells.tobytes()
+            if key in cache:
+                cache.move_to_end(key)
+                hits += 1
+                mismatches += int(cache[key] != predictions[row])
+            elif self._is_cacheable(cells, resolution):
+                cache[key] = predictions[row]
+                if len(cache) > cache_size:
+                    cache.popitem(last=False)
+
+        return {
+            "samples": len(features),
+            "hits": hits,
+            "hit_ratio": hits / len(features) if len(features) else 0.0,
+            "mismatches": mismatches
+        }
+
+    def benchmark(self, data: DataFrame, repeats: int = 1) -> Dict[str, float]:
+        """
+        Porównuje predykcję pojedynczych obserwacji przez scikit-learn (predict() na jednowierszowym
+        DataFrame) z predykcją FlatForest: mierzy średni czas na obserwację i sprawdza zgodność
+        klas oraz głosów (predict_proba) dla każdego wiersza danych.
+
+        :param data: Zbiór obserwacji (np. cechy MAR, EAR, Roll, Pitch z przetworzonych nagrań).
+        :type data: pandas.DataFrame
+        :param repeats: Liczba powtórzeń pomiaru dla każdego wiersza.
+        :type repeats: int
+        :return: Słownik z liczbą obserwacji, czasami na obserwację (w sekundach), przyspieszeniem,
+                 liczbą niezgodnych klas i największą różnicą głosów.
+        :rtype: dict
+        :raises ValueError: Jeśli wczytanego modelu nie da się wyeksportować do FlatForest.
+        """
+        if self.flat_forest is None:
+            raise ValueError("The loaded model is not supported by FlatForest")
+
+        if self._model_columns is not None:
+            data = data[self._model_columns]
+        rows = [data.iloc[[i]] for i in range(len(data))]
+        vectors = [self._to_model_order(self._to_feature_vector(row)) for row in rows]
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            sklearn_labels = [self.random_forest.predict(row)[0] for row in rows]
+        sklearn_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            flat_labels = [self.flat_forest.predict(vector) for vector in vectors]
+        flat_time = time.perf_counter() - start
+
+        sklearn_votes = self.random_forest.predict_proba(data)
+        flat_votes = np.array([self.flat_forest.predict_votes(vector) for vector in vectors])
+        samples = max(len(rows) * repeats, 1)
+        return {
+            "samples": len(rows),
+            "sklearn_seconds_per_sample": sklearn_time / samples,
+            "flat_seconds_per_sample": flat_time / samples,
+            "speedup": sklearn_time / flat_time if flat_time else float("inf"),
+            "label_mismatches": int(sum(a != b for a, b in zip(sklearn_labels, flat_labels))),
+            "max_vote_difference": float(np.abs(sklearn_votes - flat_votes).max()) if len(rows) else 0.0
+        }
+
+    def moving_mode_value_prediction(self, data: Union[DataFrame, np.ndarray],
+                                     prediction_memory: Optional[RollingWindow] = None) -> bool:
         """
         Dokonuje predykcji senności z wykorzystaniem "bufora pamięci" poprzednich predykcji.
         Jeśli w określonym oknie czasowym (prediction_memory_size) częstość wystąpień True
         przekracza próg 'activation_certainty', metoda zwróci True. W przeciwnym wypadku - False.
 
-        :param data: Dane (cechy) do predykcji (np. z aktualnej klatki wideo).
-        :type data: pandas.DataFrame
+        :param data: Dane (cechy) do predykcji (np. z aktualnej klatki wideo), jak w predict().
+        :type data: Union[pandas.DataFrame, np.ndarray]
+        :param prediction_memory: Bufor predykcji używany zamiast 'self.prediction_memory'
+                                  (np. osobny bufor dla każdej śledzonej twarzy).
+        :type prediction_memory: Optional[RollingWindow]
         :return: Ostateczna predykcja (True/False) uwzględniająca historyczne predykcje.
         :rtype: bool
         """
         # Predykcja z aktualnego zestawu danych
         single_prediction = self.predict(data)
 
-        # Przesuwanie i aktualizowanie bufora predykcji
-        self.prediction_memory = np.roll(self.prediction_memory, -1)
-        self.prediction_memory[-1] = single_prediction
-
-        # Zliczenie wystąpień True i False w buforze
-        unique, counts = np.unique(self.prediction_memory, return_counts=True)
-        predictions_votes_in_period = dict(zip(unique, counts))
+        if prediction_memory is None:
+            prediction_memory = self.prediction_memory
 
-        # Uzupełnienie słownika o brakujące klucze, gdyby w buforze nie było żadnej wartości True/False
-        if np.True_ not in predictions_votes_in_period:
-            predictions_votes_in_period[np.True_] = 0
-        if np.False_ not in predictions_votes_in_period:
-            predictions_votes_in_period[np.False_] = 0
+        # Aktualizowanie bufora predykcji (najstarsza predykcja wypada z okna)
+        prediction_memory.push(single_prediction)
 
-        # Obliczenie "pewności" (jaki odsetek predykcji w buforze to True)
-        prediction_certainty = predictions_votes_in_period[np.True_] / len(self.prediction_memory)
+        # Obliczenie "pewności" (jaki odsetek predykcji w buforze to True);
+        # puste miejsca bufora traktowane są jak predykcje False
+        prediction_certainty = prediction_memory.count_true() / prediction_memory.capacity
 
         # Porównanie pewności z progiem i ostateczna decyzja
         if prediction_certainty >= self.activation_certainty:
@@ -140,3 +418,46 @@ class RandomForest:
             prediction = False
 
         return prediction
+
+    def predict_batch(self, features: np.ndarray) -> np.ndarray:
+        """
+        Dokonuje predykcji senności dla wielu obserwacji jednym wywołaniem modelu scikit-learn
+        (dla całej macierzy jest ono szybsze od FlatForest, a wyniki obu są identyczne).
+
+        :param features: Macierz cech o kształcie (n, len(FEATURE_NAMES)), w kolejności FEATURE_NAMES.
+        :type features: np.ndarray
+        :return: Tablica bool o kształcie (n,) - True w przypadku rozpoznania senności.
+        :rtype: np.ndarray
+        """
+        features = np.asarray(features, dtype=np.float64).reshape(-1, len(self.FEATURE_NAMES))
+        if self._feature_order is not None:
+            features = features[:, self._feature_order]
+        if self._model_columns is None:
+            labels = self.random_forest.predict(features)
+        else:
+            labels = self.random_forest.predict(DataFrame(features, columns=self._model_columns))
+        return np.asarray(labels) == "Drowsy"
+
+    def moving_mode_value_prediction_batch(self, features: np.ndarray,
+                                           prediction_memory: Optional[RollingWindow] = None) -> np.ndarray:
+        """
+        Odpowiednik moving_mode_value_prediction() dla serii kolejnych obserwacji: model wywoływany
+        jest raz dla całej macierzy cech, a udział predykcji True w buforze pamięci po każdej
+        obserwacji wyznaczany jest sumą kroczącą (RollingWindow.push_batch). Wyniki i końcowy stan
+        bufora są takie same jak przy wywoływaniu moving_mode_value_prediction() wiersz po wierszu.
+
+        :param features: Macierz cech o kształcie (n, len(FEATURE_NAMES)), w kolejności FEATURE_NAMES.
+        :type features: np.ndarray
+        :param prediction_memory: Bufor predykcji używany zamiast 'self.prediction_memory'.
+        :type prediction_memory: Optional[RollingWindow]
+        :return: Tablica bool o kształcie (n,) z ostatecznymi predykcjami kolejnych obserwacji.
+        :rtype: np.ndarray
+        """
+        single_predictions = self.predict_batch(features)
+
+        if prediction_memory is None:
+            prediction_memory = self.prediction_memory
+
+        # Predykcje mają wartości 0/1, więc suma w oknie jest liczbą predykcji True
+        true_counts, _ = prediction_memory.push_batch(single_predictions, np.zeros(len(single_predictions)))
+        return true_counts[:, 0] / prediction_memory.capacity >= self.activation_certainty
@@ -1,4 +1,10 @@
+from .camera_capture import *
 from .camera_mode import *
+from .result_sinks import *
+from .inference_scheduler import *
 from .image_mode import *
+from .frame_reader import *
 from .video_mode import *
+from .parallel_video_runner import *
+from .threshold_sweep import *
 from .dataset_creator import *
\ No newline at end of file
@@ -0,0 +1,146 @@
+import cv2
+import time
+import threading
+
+
+class CameraCapture:
+    def __init__(self, camera_index=0, resolution=None,
+                 fourcc=None, buffer_size=1, fps=None,
+                 frame_pool_size=8):
+        self.camera = cv2.VideoCapture(camera_index)
+        if resolution is not None:
+            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+        if fourcc is not None:
+            self.camera.set(cv2.CAP_PROP_FOURCC,
+                            cv2.VideoWriter_fourcc(*fourcc))
+        if fps is not None:
+            self.camera.set(cv2.CAP_PROP_FPS, fps)
+        if buffer_size is not None:
+            self.camera.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        # Minimum time between decoded frames (0 decodes every frame)
+        self.capture_interval = 0.0
+        # Frames are decoded into recycled buffers; allocations only happen
+        # until the pool has warmed up (or when the resolution changes)
+        self.frame_pool_size = frame_pool_size
+        self.allocated_frames = 0
+        self._free_frames = []
+
+        # Single-slot buffer: only the newest frame is kept
+        self._frame = None
+        self._timestamp = 0.0
+        self._frame_id = 0
+        self._consumed_id = 0
+        self._running = False
+        self._failed = False
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def isOpened(self):
+        return self.camera.isOpened()
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._capture_loop,
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def set_capture_interval(self, interval):
+        self.capture_interval = max(interval, 0.0)
+
+    def _capture_loop(self):
+        last_decoded = 0.0
+        while self._running:
+            if self.capture_interval:
+                # Throttled - frames in between are grabbed but never decoded
+                ret = self.camera.grab()
+                if ret and time.monotonic() - last_decoded < self.capture_interval:
+                    continue
+                if ret:
+                    ret, frame = self._decode(self.camera.retrieve)
+            else:
+                ret, frame = self._decode(self.camera.read)
+            timestamp = time.monotonic()
+            last_decoded = timestamp
+
+            with self._condition:
+                if not ret:
+                    self._failed = True
+                    self._running = False
+                    self._condition.notify_all()
+                    break
+
+                # The previous frame was never processed - it is stale now
+                if self._frame_id > self._consumed_id:
+                    self.dropped_frames += 1
+                    self._recycle(self._frame)
+                self._frame = frame
+                self._timestamp = timestamp
+                self._frame_id += 1
+                self.captured_frames += 1
+                self._condition.notify_all()
+
+    def _decode(self, decode):
+        with self._condition:
+            buffer = self._free_frames.pop() if self._free_frames else None
+        ret, frame = decode(buffer) if buffer is not None else decode()
+        if not ret:
+            self.release_frame(buffer)
+            return ret, None
+        if frame is not buffer:
+            self.allocated_frames += 1
+        return ret, frame
+
+    def _recycle(self, frame):
+        if frame is not None and len(self._free_frames) < self.frame_pool_size:
+            self._free_frames.append(frame)
+
+    def release_frame(self, frame):
+        # Returns a frame obtained from read_latest() to the pool; it must
+        # not be used afterwards. Frames never released are simply not reused
+        with self._condition:
+            self._recycle(frame)
+
+    def read_latest(self, timeout=None):
+        # Waits for a frame newer than the previously returned one
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._frame_id > self._consumed_id
+                or not self._running, timeout)
+            if self._frame_id == self._consumed_id:
+                return False, None, None
+            self._consumed_id = self._frame_id
+            return True, self._frame, self._timestamp
+
+    def read(self):
+        ret, frame, _ = self.read_latest()
+        return ret, frame
+
+    def get_settings(self):
+        fourcc = int(self.camera.get(cv2.CAP_PROP_FOURCC))
+        return {
+            "Resolution": (int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                           int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))),
+            "FOURCC": "".join(chr((fourcc >> 8 * i) & 0xFF)
+                              for i in range(4)),
+            "FPS": self.camera.get(cv2.CAP_PROP_FPS),
+            "Buffer size": int(self.camera.get(cv2.CAP_PROP_BUFFERSIZE))
+        }
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+
+    def release(self):
+        self.stop()
+        self.camera.release()
@@ -1,13 +1,22 @@
-import cv2
-import pandas as pd
+import copy
+import time
+import numpy as np
 from Workspace.Utilities.utils import Utils
+from Workspace.Utilities.rolling_window import RollingWindow
+from Workspace.BackEnd.FileManagement.async_data_writer import AsyncDataWriter
+from Workspace.BackEnd.FileManagement.random_forest import RandomForest
+from .result_sinks import ResultDispatcher, ResultSink
 
 
 class CameraMode:
     def __init__(self, camera, image_processor,
                  coordinates_parser, data_saver,
                  perclos_finder, yawn_finder,
-                 face_tilt_finder, classifier, gui=None):
+                 face_tilt_finder, classifier, gui=None,
+                 gui_queue_size=2, saver_queue_size=1024,
+                 inference_scheduler=None, presence_detector=None,
+                 idle_timeout=10.0, idle_frame_interval=0.5,
+                 preview_scale=1.0, face_tracker=None):
         self.camera = camera
         self.image_processor = image_processor
         self.coordinates_parser = coordinates_parser
@@ -16,38 +25,108 @@ class CameraMode:
         self.yawn_finder = yawn_finder
         self.face_tilt_finder = face_tilt_finder
         self.classifier = classifier
+        self._features = np.empty(len(RandomForest.FEATURE_NAMES))
         self.gui = gui
+        # Landmarks are drawn on a (downscaled) preview copy only when a GUI shows it
+        self.preview_scale = preview_scale
+        self.inference_scheduler = inference_scheduler
+        self.running = False
+
+        # With a face tracker every tracked face gets its own copies of the
+        # finders and its own classifier memory, keyed by track id
+        self.face_tracker = face_tracker
+        self.face_states = {}
+
+        # Idle state: after idle_timeout seconds without a face only the
+        # presence detector runs, on frames decoded every idle_frame_interval
+        self.presence_detector = presence_detector
+        self.idle_timeout = idle_timeout
+        self.idle_frame_interval = idle_frame_interval
+        self.idle = False
+        self._last_face_timestamp = None
+
+        # Rendering and persistence consume published results on their own threads
+        self.dispatcher = ResultDispatcher()
+        if self.gui:
+            self.dispatcher.add_sink(ResultSink(
+                self._update_gui, gui_queue_size,
+                "drop_oldest", name="gui",
+                on_discard=self._release_record))
+        # Preview copy with the overlay, reused by the GUI sink thread
+        self._preview_buffer = None
+        self._no_landmarks = np.empty((0, Utils.landmark_count, 3),
+                                      dtype=np.float32)
+        self.data_writer = None
+        if self.data_saver:
+            self.data_writer = AsyncDataWriter(
+                self.data_saver, max_queue_size=saver_queue_size)
 
     def run(self):
-        while True:
+        self.running = True
+        self.dispatcher.start()
+        if self.data_writer:
+            self.data_writer.start()
+        try:
+            self._detection_loop()
+        finally:
+            self.dispatcher.stop()
+            if self.data_writer:
+                self.data_writer.stop()
+
+    def stop(self):
+        self.running = False
+
+    def close(self):
+        # Waits until every queued row has been written to the results file
+        if self.data_writer:
+            self.data_writer.stop(timeout=None)
+
+    def _detection_loop(self):
+        while self.running:
             fps = Utils.calculate_fps()
-            ret, frame = self.camera.read()
+            ret, frame, timestamp = self.camera.read_latest()
             if not ret:
                 print("Failed to read camera frame.")
                 break
 
-            processed_frame, face_mesh_coords = self.image_processor.process_face_image(
-                frame)
+            if self.presence_detector and self._check_idle(frame, timestamp):
+                self._publish_idle(frame, fps)
+                continue
+
+            if self.face_tracker:
+                _, _, landmarks = self.image_processor.process_face_image(
+                    frame)
+                self._process_faces(frame, landmarks, timestamp, fps)
+                continue
+
+            scheduler = self.inference_scheduler
+            if scheduler is None or scheduler.should_infer(timestamp):
+                inference_start = time.perf_counter()
+                _, _, landmarks = self.image_processor.process_face_image(
+                    frame)
+                if scheduler:
+                    scheduler.record_inference(
+                        landmarks, timestamp,
+                        time.perf_counter() - inference_start)
+            else:
+                # Skipped frame - the finders see landmarks from the motion model
+                landmarks = scheduler.predict_landmarks(timestamp)
 
             perclos, ear = self.perclos_finder.find_parameter(
-                face_mesh_coords)
+                landmarks, timestamp)
             is_jawning, yawn_counter, mar = self.yawn_finder.find_parameter(
-                face_mesh_coords)
+                landmarks, timestamp)
             roll, pitch = self.face_tilt_finder.find_parameter(
-                face_mesh_coords)
+                landmarks, timestamp)
+            if scheduler:
+                scheduler.record_features(ear, mar)
+            if len(landmarks):
+                self._last_face_timestamp = timestamp
 
             prediction = self._calculate_prediction(
-                face_mesh_coords, perclos, mar, ear, roll,
+                landmarks, perclos, mar, ear, roll,
                 pitch)
 
-            if self.gui:
-                self._update_gui(processed_frame,
-                                 face_mesh_coords,
-                                 prediction, mar,
-                                 is_jawning, roll, pitch,
-                                 ear, perclos, yawn_counter,
-                                 fps)
-
             packet = {
                 "MAR": mar,
                 "Obecne ziewniecie": is_jawning,
@@ -59,35 +138,163 @@ class CameraMode:
                 "Obecna sennosc": prediction,
                 "FPS": fps
             }
-            self.data_saver.save_to_csv(packet)
+            self._publish(frame, landmarks, [packet])
 
-    def _calculate_prediction(self, face_mesh_coords,
+    def _process_faces(self, frame, landmarks, timestamp, fps):
+        track_ids = self.face_tracker.update(landmarks)
+        for track_id in self.face_tracker.removed_tracks:
+            self.face_states.pop(track_id, None)
+        if len(landmarks):
+            self._last_face_timestamp = timestamp
+        # Oldest track first - the GUI shows the first face, the saver gets all
+        order = np.argsort(track_ids, kind="stable")
+        landmarks, track_ids = landmarks[order], track_ids[order]
+
+        packets = []
+        for face, track_id in zip(landmarks, track_ids.tolist()):
+            state = self.face_states.get(track_id)
+            if state is None:
+                state = self.face_states[track_id] = self._create_face_state()
+            face = face[None]
+            perclos, ear = state["perclos_finder"].find_parameter(
+                face, timestamp)
+            is_jawning, yawn_counter, mar = \
+                state["yawn_finder"].find_parameter(face, timestamp)
+            roll, pitch = state["face_tilt_finder"].find_parameter(
+                face, timestamp)
+            prediction = self._calculate_prediction(
+                face, perclos, mar, ear, roll, pitch,
+                state["prediction_memory"])
+            packets.append({
+                "Twarz": track_id,
+                "MAR": mar,
+                "Obecne ziewniecie": is_jawning,
+                "Licznik ziewniec": yawn_counter,
+                "Roll": roll,
+                "Pitch": pitch,
+                "EAR": ear,
+                "PERCLOS": perclos,
+                "Obecna sennosc": prediction,
+                "FPS": fps
+            })
+
+        if not packets:
+            packets.append(self._empty_packet(0, fps))
+        self._publish(frame, landmarks, packets)
+
+    def _create_face_state(self):
+        state = {
+            "perclos_finder": copy.deepcopy(self.perclos_finder),
+            "yawn_finder": copy.deepcopy(self.yawn_finder),
+            "face_tilt_finder": copy.deepcopy(self.face_tilt_finder),
+            "prediction_memory": RollingWindow(
+                self.classifier.prediction_memory.capacity)
+        }
+        for name in ("perclos_finder", "yawn_finder", "face_tilt_finder"):
+            state[name].reset_memory()
+        state["yawn_finder"].yawn_counter = 0
+        return state
+
+    def _publish(self, frame, landmarks, packets):
+        if self.data_writer:
+            for packet in packets:
+                self.data_writer.write(packet)
+        record = {
+            "Frame": frame,
+            "Landmarks": landmarks,
+            "Packet": packets[0],
+            "Packets": packets
+        }
+        self.dispatcher.publish(record)
+        if not self.gui:
+            # Nothing else holds the frame - back to the capture pool;
+            # otherwise the GUI sink returns it once the overlay is drawn
+            self._release_record(record)
+
+    def _release_record(self, record):
+        self.camera.release_frame(record["Frame"])
+
+    def _check_idle(self, frame, timestamp):
+        if self._last_face_timestamp is None:
+            self._last_face_timestamp = timestamp
+        if not self.idle:
+            if timestamp - self._last_face_timestamp < self.idle_timeout:
+                return False
+            self.idle = True
+            self.camera.set_capture_interval(self.idle_frame_interval)
+
+        if not self.presence_detector.detect(frame):
+            return True
+
+        # Somebody sat down - back to full-rate FaceMesh from a clean state
+        self.idle = False
+        self._last_face_timestamp = timestamp
+        self.camera.set_capture_interval(0.0)
+        self.image_processor.reset_tracking()
+        if self.inference_scheduler:
+            self.inference_scheduler.reset()
+        return False
+
+    def _publish_idle(self, frame, fps):
+        if self.face_tracker:
+            # Nobody in the seats - every track ends
+            self.face_tracker.reset()
+            self.face_states.clear()
+        packet = self._empty_packet(self.yawn_finder.yawn_counter, fps)
+        self._publish(frame, self._no_landmarks, [packet])
+
+    def _empty_packet(self, yawn_counter, fps):
+        packet = {
+            "MAR": 0.0,
+            "Obecne ziewniecie": False,
+            "Licznik ziewniec": yawn_counter,
+            "Roll": 0.0,
+            "Pitch": 0.0,
+            "EAR": 0.0,
+            "PERCLOS": 0.0,
+            "Obecna sennosc": None,
+            "FPS": fps
+        }
+        if self.face_tracker:
+            # Same columns as the per-face rows, with no face attached
+            packet = {"Twarz": None, **packet}
+        return packet
+
+    def _calculate_prediction(self, landmarks,
                               perclos, mar, ear, roll,
-                              pitch):
-        if not face_mesh_coords.multi_face_landmarks:
+                              pitch, prediction_memory=None):
+        if not len(landmarks):
             return None
 
         if perclos >= 0.25:
             return True
         elif 0.125 <= perclos < 0.25:
-            data = pd.DataFrame([[mar, ear, roll, pitch]],
-                                columns=["MAR", "EAR",
-                                         "Roll", "Pitch"])
+            # Reused buffer in RandomForest.FEATURE_NAMES order
+            self._features[:] = (mar, ear, roll, pitch)
             return self.classifier.moving_mode_value_prediction(
-                data)
+                self._features, prediction_memory)
         return False
 
-    def _update_gui(self, frame, face_mesh_coords,
-                    prediction, mar,
-                    is_jawning, roll, pitch, ear, perclos,
-                    yawn_counter, fps):
+    def _update_gui(self, record):
+        try:
+            self._preview_buffer = self.image_processor.draw_overlay(
+                record["Frame"], record["Landmarks"], self.preview_scale,
+                out=self._preview_buffer)
+        finally:
+            self._release_record(record)
+
+        packet = record["Packet"]
         face_plotter = self.gui.get_face_plotter()
         Utils.render_face_coordinates(
             self.coordinates_parser, face_plotter,
-            face_mesh_coords)
+            record["Landmarks"])
         self.gui.set_face_plotter(face_plotter)
-        self.gui.queue_parameters(prediction, mar,
-                                  is_jawning, roll, pitch,
-                                  ear, perclos,
-                                  yawn_counter, fps)
-        self.gui.queue_image(frame)
\ No newline at end of file
+        self.gui.queue_parameters(packet["Obecna sennosc"],
+                                  packet["MAR"],
+                                  packet["Obecne ziewniecie"],
+                                  packet["Roll"], packet["Pitch"],
+                                  packet["EAR"], packet["PERCLOS"],
+                                  packet["Licznik ziewniec"],
+                                  packet["FPS"])
+        # queue_image copies the preview, so the buffer is reused next time
+        self.gui.queue_image(self._preview_buffer)
@@ -2,6 +2,7 @@ import pandas as pd
 import math
 
 from tqdm import tqdm
+from Workspace.BackEnd.FileManagement.data_saver import DataSaver
 
 
 class DatasetCreator:
@@ -15,19 +16,26 @@ class DatasetCreator:
 
     def process_data(self, sequence_length):
         all_csv_files = [f for f in self.load_folder.rglob('*') if
-                  f.is_file() and f.suffix in '.csv']
+                  f.is_file() and DataSaver.is_supported_file(f)]
 
         processed_data = pd.DataFrame()
 
         for csv in tqdm(all_csv_files, desc="Processing CSVs"):
-            loaded_data = pd.read_csv(csv)
+            loaded_data = DataSaver.load_data_frame(csv)
             sequences = self.create_sequences_from_data(sequence_length, loaded_data)
             processed_data = pd.concat([processed_data, sequences], ignore_index=True)
 
-        if self.save_path.exists():
-            processed_data.to_csv(self.save_path, mode='a', header=False, index=False)
+        if self.save_path.suffix.lower() == ".csv":
+            if self.save_path.exists():
+                processed_data.to_csv(self.save_path, mode='a', header=False, index=False)
+            else:
+                processed_data.to_csv(self.save_path, index=False)
         else:
-            processed_data.to_csv(self.save_path, index=False)
+            # Columnar formats cannot be appended to - rewrite with the previous content
+            if self.save_path.exists():
+                processed_data = pd.concat([DataSaver.load_data_frame(self.save_path), processed_data],
+                                           ignore_index=True)
+            DataSaver.write_data_frame(processed_data, self.save_path)
 
     def create_sequences_from_data(self, length, df):
         output_data = pd.DataFrame()
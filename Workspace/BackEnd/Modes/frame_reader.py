@@ -0,0 +1,93 @@
+import cv2
+import queue
+import threading
+import numpy as np
+
+
+class FrameReader:
+    def __init__(self, capture, start_frame=0, end_frame=None,
+                 stride=1, queue_size=8):
+        self.capture = capture
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.stride = max(int(stride), 1)
+        self.frames_read = 0
+        self.frames_skipped = 0
+
+        # Preallocated frame buffers: queue_size decoded frames waiting,
+        # one being decoded and one held by the consumer
+        width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._free_buffers = queue.Queue()
+        for _ in range(queue_size + 2):
+            self._free_buffers.put(
+                np.empty((height, width, 3), dtype=np.uint8)
+                if width and height else None)
+        self._ready_frames = queue.Queue(maxsize=queue_size)
+
+        self._end_marker = object()
+        self._stopped = False
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._reader_loop,
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def _reader_loop(self):
+        try:
+            frame_index = self.start_frame
+            while not self._stopped and (self.end_frame is None
+                                         or frame_index < self.end_frame):
+                if frame_index % self.stride:
+                    # Frames dropped by the stride are never retrieved (decoded to BGR)
+                    if not self.capture.grab():
+                        break
+                    self.frames_skipped += 1
+                else:
+                    buffer = self._free_buffers.get()
+                    if self._stopped:
+                        break
+                    ret, frame = self.capture.read(buffer) if buffer is not None \
+                        else self.capture.read()
+                    if not ret:
+                        break
+                    self.frames_read += 1
+                    self._ready_frames.put((frame_index, frame))
+                frame_index += 1
+        finally:
+            self._ready_frames.put(self._end_marker)
+
+    def __iter__(self):
+        # Yields (frame_index, frame); a frame buffer is reused once the
+        # next frame is requested, so it must not be kept by the consumer
+        self.start()
+        previous = None
+        while True:
+            item = self._ready_frames.get()
+            if previous is not None:
+                self._free_buffers.put(previous)
+                previous = None
+            if item is self._end_marker:
+                break
+            previous = item[1]
+            yield item
+
+    def close(self):
+        self._stopped = True
+        # Unblock the reader thread whether it waits for space or for a buffer
+        self._free_buffers.put(None)
+        while self._thread is not None and self._thread.is_alive():
+            try:
+                self._ready_frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -1,20 +1,27 @@
 import os
 import cv2
-import pandas as pd
 import pathlib
+import numpy as np
+from Workspace.BackEnd.FileManagement.random_forest import RandomForest
 
 
 class ImageMode:
     def __init__(self, image_processor, data_saver,
                  perclos_finder,
                  yawn_finder, face_angle_finder,
-                 classifier):
+                 classifier, image_rate=30.0):
         self.image_processor = image_processor
         self.data_saver = data_saver
         self.perclos_finder = perclos_finder
         self.yawn_finder = yawn_finder
         self.face_angle_finder = face_angle_finder
         self.classifier = classifier
+        self._features = np.empty(len(RandomForest.FEATURE_NAMES))
+        # Images get evenly spaced timestamps, so the finders' time windows
+        # cover a fixed number of images instead of depending on how fast
+        # they are processed
+        self.image_interval = 1.0 / image_rate
+        self._image_count = 0
         self.label_map = {"0": "Not_drowsy", "1": "Drowsy",
                           "2": "Drowsy"}
 
@@ -33,18 +40,21 @@ class ImageMode:
             self._update_progress(index, total)
 
     def _process_image(self, frame, image_path):
-        processed_frame, face_mesh_coords = self.image_processor.process_face_image(
+        processed_frame, face_mesh_coords, landmarks = self.image_processor.process_face_image(
             frame)
 
         if not face_mesh_coords:
             return
 
+        timestamp = self._image_count * self.image_interval
+        self._image_count += 1
+
         perclos, ear = self.perclos_finder.find_parameter(
-            face_mesh_coords)
+            landmarks, timestamp)
         is_jawning, yawn_counter, mar = self.yawn_finder.find_parameter(
-            face_mesh_coords)
+            landmarks, timestamp)
         roll, pitch = self.face_angle_finder.find_parameter(
-            face_mesh_coords)
+            landmarks, timestamp)
 
         prediction = self._calculate_prediction(perclos,
                                                 mar, ear,
@@ -67,11 +77,10 @@ class ImageMode:
         if perclos >= 0.25:
             return True
         elif 0.125 <= perclos < 0.25:
-            data = pd.DataFrame([[mar, ear, roll, pitch]],
-                                columns=["MAR", "EAR",
-                                         "Roll", "Pitch"])
+            # Reused buffer in RandomForest.FEATURE_NAMES order
+            self._features[:] = (mar, ear, roll, pitch)
             return self.classifier.moving_mode_value_prediction(
-                data)
+                self._features)
         return False
 
     def _get_label(self, image_path):
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+
+
+class InferenceScheduler:
+    def __init__(self, eye_threshold, mouth_threshold,
+                 inference_budget=0.5, max_skip=3,
+                 motion_threshold=0.05, guard_margin=0.15,
+                 trend_tolerance=0.01, latency_smoothing=0.1):
+        # inference_budget - share of wall-clock time FaceMesh may use,
+        # motion_threshold - landmark speed (normalized units per second)
+        # above which no frames are skipped beyond what the budget requires,
+        # trend_tolerance - EAR drop / MAR rise between frames treated as movement
+        self.eye_threshold = eye_threshold
+        self.mouth_threshold = mouth_threshold
+        self.inference_budget = inference_budget
+        self.max_skip = max_skip
+        self.motion_threshold = motion_threshold
+        self.guard_margin = guard_margin
+        self.trend_tolerance = trend_tolerance
+        self.latency_smoothing = latency_smoothing
+
+        self.inferred_frames = 0
+        self.predicted_frames = 0
+        self.reset()
+
+    def reset(self):
+        self.inference_time = None
+        self.frame_period = None
+        self.motion = math.inf
+        self._skipped = 0
+        self._previous_timestamp = None
+        # The two most recent inferred landmark sets and their timestamps
+        self._landmarks = [None, None]
+        self._landmark_timestamps = [0.0, 0.0]
+        self._ear = [None, None]
+        self._mar = [None, None]
+
+    def should_infer(self, timestamp):
+        if self._previous_timestamp is not None:
+            period = max(timestamp - self._previous_timestamp, 0.0)
+            self.frame_period = period if self.frame_period is None else \
+                self.frame_period + self.latency_smoothing * (period - self.frame_period)
+        self._previous_timestamp = timestamp
+
+        if self._landmarks[1] is None or self._landmarks[0] is None:
+            return True
+        if self._features_need_inference():
+            return True
+        return self._skipped + 1 >= self.current_interval()
+
+    def current_interval(self):
+        if self.inference_time is None or not self.frame_period:
+            return 1
+
+        # Fewest inferences per frame that keep FaceMesh within the CPU budget
+        budget_interval = math.ceil(self.inference_time /
+                                    (self.inference_budget * self.frame_period))
+        # A still face may be skipped more often, a moving one only as the budget requires
+        stillness = max(1.0 - self.motion / self.motion_threshold, 0.0)
+        motion_interval = 1 + round(self.max_skip * stillness)
+        return min(max(budget_interval, motion_interval), self.max_skip + 1)
+
+    def record_inference(self, landmarks, timestamp, inference_time):
+        self.inferred_frames += 1
+        self._skipped = 0
+        self.inference_time = inference_time if self.inference_time is None else \
+            self.inference_time + self.latency_smoothing * (inference_time - self.inference_time)
+
+        if not len(landmarks):
+            # Without a face there is nothing to extrapolate
+            self._landmarks = [None, None]
+            self.motion = math.inf
+            return
+
+        previous, previous_timestamp = self._landmarks[1], self._landmark_timestamps[1]
+        self._landmarks = [previous, landmarks[:1].copy()]
+        self._landmark_timestamps = [previous_timestamp, timestamp]
+        if previous is not None and timestamp > previous_timestamp:
+            displacement = np.abs(landmarks[0, :, :2] - previous[0, :, :2]).mean()
+            self.motion = float(displacement / (timestamp - previous_timestamp))
+
+    def predict_landmarks(self, timestamp):
+        # Constant-velocity extrapolation from the last two inferences
+        self.predicted_frames += 1
+        self._skipped += 1
+        (first, last), (first_time, last_time) = self._landmarks, self._landmark_timestamps
+        if last_time <= first_time:
+            return last.copy()
+        factor = np.float32((timestamp - last_time) / (last_time - first_time))
+        return last + (last - first) * factor
+
+    def record_features(self, ear, mar):
+        self._ear = [self._ear[1], ear]
+        self._mar = [self._mar[1], mar]
+
+    def _features_need_inference(self):
+        # Closing eyes and an opening mouth always get a real FaceMesh pass
+        ear_previous, ear = self._ear
+        mar_previous, mar = self._mar
+        if ear is not None:
+            if ear < self.eye_threshold * (1 + self.guard_margin):
+                return True
+            if ear_previous is not None and ear_previous - ear > self.trend_tolerance:
+                return True
+        if mar is not None:
+            if mar > self.mouth_threshold * (1 - self.guard_margin):
+                return True
+            if mar_previous is not None and mar - mar_previous > self.trend_tolerance:
+                return True
+        return False
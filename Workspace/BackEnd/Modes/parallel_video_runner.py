@@ -0,0 +1,229 @@
+import os
+import queue
+import collections
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from tqdm import tqdm
+
+# Environment variables limiting internal thread pools of native libraries
+THREAD_LIMIT_VARIABLES = ["OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS",
+                          "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+                          "TF_NUM_INTRAOP_THREADS",
+                          "TF_NUM_INTEROP_THREADS"]
+
+@contextlib.contextmanager
+def limit_worker_threads(threads):
+    # Worker processes inherit the limits when they are spawned; the parent's
+    # own values are restored once the pool is done
+    previous = {variable: os.environ.get(variable)
+                for variable in THREAD_LIMIT_VARIABLES}
+    for variable in THREAD_LIMIT_VARIABLES:
+        os.environ.setdefault(variable, str(threads))
+    try:
+        yield
+    finally:
+        for variable, value in previous.items():
+            if value is None:
+                os.environ.pop(variable, None)
+            else:
+                os.environ[variable] = value
+
+
+# Per-process state of a worker (created once by the pool initializer)
+_worker_processor = None
+_worker_progress = None
+
+
+def _init_worker(settings, progress_queue):
+    global _worker_processor, _worker_progress
+
+    import cv2
+    cv2.setNumThreads(settings["threads_per_worker"])
+
+    from Workspace.BackEnd.DataProcessing import (ImageProcessor, MotionGate,
+                                                  PerclosFinder, YawnFinder,
+                                                  AngleFinder)
+    from Workspace.BackEnd.FileManagement import RandomForest, LandmarkCache
+    from .video_mode import VideoProcessor
+
+    landmark_cache = None
+    if settings["landmark_cache_folder"] is not None:
+        landmark_cache = LandmarkCache(settings["landmark_cache_folder"],
+                                       settings["landmark_cache_dtype"])
+
+    image_processor = ImageProcessor(
+        roi_tracking=settings["face_roi_tracking"],
+        roi_size=settings["face_roi_size"],
+        roi_margin=settings["face_roi_margin"])
+    if settings["motion_gate_threshold"] is not None:
+        image_processor = MotionGate(
+            image_processor, settings["motion_gate_threshold"],
+            max_reused_frames=settings["motion_gate_max_reused_frames"])
+
+    _worker_processor = VideoProcessor(
+        image_processor,
+        PerclosFinder(settings["perclos_threshold"],
+                      settings["perclos_windows"]),
+        YawnFinder(settings["yawn_threshold"]),
+        AngleFinder(),
+        RandomForest(activation_certainty=0.5,
+                     prediction_memory_size=50,
+                     cache_size=settings["classifier_cache_size"],
+                     cache_resolution=settings["classifier_cache_resolution"]),
+        chunk_size=settings["chunk_size"],
+        file_format=settings["file_format"],
+        frame_stride=settings["frame_stride"],
+        landmark_cache=landmark_cache,
+        batch_prediction=settings["batch_prediction"]
+    )
+    _worker_progress = progress_queue
+
+
+def _process_video_task(video_path, output_folder, mode, dataset):
+    save_path = _worker_processor.process_video(
+        video_path, output_folder, mode, dataset,
+        progress_callback=_worker_progress.put, atomic=True)
+    return str(save_path)
+
+
+def _extract_segment_task(video_path, start_frame, end_frame,
+                          warmup_frames):
+    landmarks = _worker_processor.extract_landmarks(
+        video_path, start_frame, end_frame, warmup_frames,
+        progress_callback=_worker_progress.put)
+    return start_frame, landmarks
+
+
+class ParallelVideoRunner:
+    def __init__(self, cfg, worker_count=None, threads_per_worker=1,
+                 chunk_size=512):
+        self.worker_count = worker_count or os.cpu_count() or 1
+        self.settings = {
+            "perclos_threshold": cfg.perclos_threshold,
+            "perclos_windows": cfg.perclos_windows,
+            "yawn_threshold": cfg.yawn_threshold,
+            "file_format": cfg.file_format,
+            "chunk_size": chunk_size,
+            "frame_stride": cfg.video_frame_stride,
+            "landmark_cache_folder": cfg.landmark_cache_folder,
+            "landmark_cache_dtype": cfg.landmark_cache_dtype,
+            "batch_prediction": cfg.video_batch_prediction,
+            "classifier_cache_size": cfg.classifier_cache_size,
+            "classifier_cache_resolution": cfg.classifier_cache_resolution,
+            "face_roi_tracking": cfg.face_roi_tracking,
+            "face_roi_size": cfg.face_roi_size,
+            "face_roi_margin": cfg.face_roi_margin,
+            "motion_gate_threshold": cfg.motion_gate_threshold,
+            "motion_gate_max_reused_frames": cfg.motion_gate_max_reused_frames,
+            "threads_per_worker": threads_per_worker
+        }
+
+    def run(self, videos, output_folder, mode, dataset):
+        videos = list(videos)
+        results = {}
+        with self._start_pool(videos) as (executor, progress_queue, pbar):
+            pending = {executor.submit(_process_video_task, video,
+                                       output_folder, mode,
+                                       dataset): video
+                       for video in videos}
+            while pending:
+                done, _ = wait(pending, timeout=0.5,
+                               return_when=FIRST_COMPLETED)
+                self._drain_progress(progress_queue, pbar)
+                for future in done:
+                    video = pending.pop(future)
+                    try:
+                        results[video] = future.result()
+                    except Exception as e:
+                        results[video] = None
+                        print(f"Failed to process {video}: {e}")
+            self._drain_progress(progress_queue, pbar)
+        return results
+
+    def run_sharded(self, videos, output_folder, mode, dataset,
+                    processor, segment_seconds=300.0,
+                    warmup_seconds=2.0):
+        # FaceMesh runs on the workers segment by segment; the finders and
+        # the classifier run in this process over the segments in order.
+        # FaceMesh tracking restarts at every segment, so the output is an
+        # approximation of process_video near segment starts
+        videos = list(videos)
+        results = {}
+        with self._start_pool(videos) as (executor, progress_queue, pbar):
+            for video in videos:
+                cached_path = processor.process_cached(
+                    video, output_folder, mode, dataset,
+                    frame_stride=processor.frame_stride, atomic=True)
+                if cached_path is not None:
+                    results[str(video)] = str(cached_path)
+                    continue
+                segments, fps = processor.split_segments(
+                    video, segment_seconds, warmup_seconds)
+                results[str(video)] = str(processor.process_landmark_segments(
+                    video, output_folder, mode, dataset,
+                    self._ordered_segments(executor, video, segments,
+                                           progress_queue, pbar),
+                    fps, atomic=True))
+        return results
+
+    @contextlib.contextmanager
+    def _start_pool(self, videos):
+        import cv2
+
+        total_frames = 0
+        for video in videos:
+            capture = cv2.VideoCapture(str(video))
+            total_frames += int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+            capture.release()
+
+        # Inherited by the worker processes before they import native libraries
+        context = multiprocessing.get_context("spawn")
+        with limit_worker_threads(self.settings["threads_per_worker"]), \
+                context.Manager() as manager:
+            progress_queue = manager.Queue()
+            with ProcessPoolExecutor(
+                    max_workers=self.worker_count,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(self.settings, progress_queue)) as executor, \
+                    tqdm(total=total_frames,
+                         desc=f"Processing videos ({self.worker_count} workers)") as pbar:
+                yield executor, progress_queue, pbar
+
+    def _ordered_segments(self, executor, video, segments, progress_queue,
+                          pbar):
+        # Only a few segments per worker are submitted ahead, and each one is
+        # released once it has been handed over, so memory does not grow
+        # with the length of the video
+        segments = iter(segments)
+        pending = collections.deque()
+        try:
+            while True:
+                for segment in segments:
+                    pending.append(executor.submit(_extract_segment_task,
+                                                   video, *segment))
+                    if len(pending) >= 2 * self.worker_count:
+                        break
+                if not pending:
+                    return
+                future = pending.popleft()
+                while not future.done():
+                    wait([future], timeout=0.5)
+                    self._drain_progress(progress_queue, pbar)
+                segment = future.result()
+                del future
+                yield segment
+                del segment
+        finally:
+            # Segments after an early end of the video are not needed
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _drain_progress(progress_queue, pbar):
+        while True:
+            try:
+                pbar.update(progress_queue.get_nowait())
+            except queue.Empty:
+                break
@@ -0,0 +1,104 @@
+import queue
+import threading
+
+
+class ResultSink:
+    OVERFLOW_POLICIES = ["drop_oldest", "drop_newest", "block"]
+
+    def __init__(self, handler, max_queue_size=1,
+                 overflow_policy="drop_oldest", name=None,
+                 on_discard=None):
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Invalid overflow policy: {overflow_policy}")
+
+        self.handler = handler
+        self.overflow_policy = overflow_policy
+        self.name = name or getattr(handler, "__name__", "sink")
+        # Called with every record dropped without being handled
+        # (e.g. to return borrowed buffers)
+        self.on_discard = on_discard
+        self.dropped_records = 0
+        self.failed_records = 0
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._stop_marker = object()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker,
+                                            name=self.name,
+                                            daemon=True)
+            self._thread.start()
+
+    def put(self, record):
+        if self.overflow_policy == "block":
+            self._queue.put(record)
+            return
+
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+            if self.overflow_policy == "drop_newest":
+                self._discard(record)
+                return
+            # drop_oldest: make room for the newest record
+            try:
+                self._discard(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self._discard(record)
+
+    def _discard(self, record):
+        if self.on_discard and record is not self._stop_marker:
+            self.on_discard(record)
+
+    def stop(self, timeout=5.0):
+        if self._thread is None:
+            return
+        # The marker is queued behind pending records, so they are drained first
+        self._queue.put(self._stop_marker)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _worker(self):
+        while True:
+            record = self._queue.get()
+            if record is self._stop_marker:
+                break
+            try:
+                self.handler(record)
+            except Exception as e:
+                self.failed_records += 1
+                print(f"Sink {self.name} failed: {e}")
+
+
+class ResultDispatcher:
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+
+    def publish(self, record):
+        for sink in self.sinks:
+            sink.put(record)
+
+    def stop(self):
+        for sink in self.sinks:
+            sink.stop()
+
+    def get_status(self):
+        return {sink.name: {"Dropped": sink.dropped_records,
+                            "Failed": sink.failed_records}
+                for sink in self.sinks}
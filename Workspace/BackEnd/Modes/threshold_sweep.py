@@ -0,0 +1,232 @@
+import os
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+from Workspace.BackEnd.DataProcessing.ParamFinder import (PerclosFinder,
+                                                         YawnFinder,
+                                                         AngleFinder)
+from Workspace.BackEnd.FileManagement.data_saver import DataSaver
+from Workspace.BackEnd.FileManagement.random_forest import RandomForest
+from .parallel_video_runner import limit_worker_threads
+
+# Per-process classifier of a worker (created once by the pool initializer)
+_worker_classifier = None
+
+
+def _init_worker():
+    global _worker_classifier
+
+    _worker_classifier = RandomForest()
+
+
+def _sweep_file_task(landmark_cache, cache_key, result_file, grid,
+                     max_frame_gap, yawn_window):
+    return ThresholdSweep.evaluate_series(
+        ThresholdSweep.load_series(landmark_cache, cache_key, result_file,
+                                   _worker_classifier, grid,
+                                   max_frame_gap, yawn_window),
+        grid)
+
+
+class ThresholdSweep:
+    GRID_PARAMETERS = ["perclos_thresholds", "perclos_windows",
+                       "perclos_bands", "memory_sizes",
+                       "activation_certainties"]
+    # Landmarks are read from the cache in chunks of this many frames
+    CHUNK_SIZE = 4096
+
+    def __init__(self, landmark_cache, perclos_thresholds,
+                 perclos_windows=(60.0,), perclos_bands=((0.125, 0.25),),
+                 memory_sizes=(50,), activation_certainties=(0.5,),
+                 yawn_thresholds=(0.5,), max_frame_gap=1.0,
+                 yawn_window=0.3, worker_count=None):
+        self.landmark_cache = landmark_cache
+        self.grid = {
+            "perclos_thresholds": np.asarray(perclos_thresholds, dtype=np.float64),
+            "perclos_windows": np.asarray(perclos_windows, dtype=np.float64),
+            "perclos_bands": np.asarray(perclos_bands, dtype=np.float64).reshape(-1, 2),
+            "memory_sizes": np.asarray(memory_sizes, dtype=np.int64),
+            "activation_certainties": np.asarray(activation_certainties, dtype=np.float64),
+            "yawn_thresholds": np.asarray(yawn_thresholds, dtype=np.float64)
+        }
+        self.max_frame_gap = max_frame_gap
+        self.yawn_window = yawn_window
+        self.worker_count = worker_count or os.cpu_count() or 1
+
+    def run(self, entries):
+        # (cache key, labelled result file) pairs, see
+        # VideoProcessor.find_cached_result; each video is its own task
+        entries = [(cache_key, str(result_file))
+                   for cache_key, result_file in entries]
+        totals = None
+
+        context = multiprocessing.get_context("spawn")
+        with limit_worker_threads(1), \
+                ProcessPoolExecutor(max_workers=self.worker_count,
+                                    mp_context=context,
+                                    initializer=_init_worker) as executor:
+            futures = [executor.submit(_sweep_file_task, self.landmark_cache,
+                                       cache_key, result_file, self.grid,
+                                       self.max_frame_gap,
+                                       self.yawn_window)
+                       for cache_key, result_file in entries]
+            for future in tqdm(futures, desc="Sweeping thresholds"):
+                totals = self._accumulate(totals, future.result())
+
+        return self.report(totals)
+
+    @classmethod
+    def load_series(cls, landmark_cache, cache_key, result_file, classifier,
+                    grid, max_frame_gap=1.0, yawn_window=0.3):
+        entry = landmark_cache.load(cache_key)
+        if entry is None:
+            raise ValueError(f"Landmark cache entry not found: {cache_key}")
+        landmarks, metadata = entry
+
+        # Labels are applied to result rows by position, one row per cached frame
+        labels = DataSaver.load_data_frame(result_file)["Drowsy"].to_numpy().astype(bool)
+        if len(labels) != len(landmarks):
+            raise ValueError(f"{result_file} has {len(labels)} rows, "
+                             f"but the landmark cache holds {len(landmarks)} frames")
+        timestamps = np.arange(len(landmarks)) * metadata["frame_stride"] / metadata["fps"]
+
+        # The finders VideoProcessor runs, one per swept threshold and window,
+        # so the swept PERCLOS is the PERCLOS of a real run
+        thresholds = grid["perclos_thresholds"]
+        windows = grid["perclos_windows"]
+        perclos_finders = [[PerclosFinder(threshold, (window,), max_frame_gap)
+                            for window in windows] for threshold in thresholds]
+        yawn_finders = [YawnFinder(threshold, yawn_window=yawn_window)
+                        for threshold in grid["yawn_thresholds"]]
+        angle_finder = AngleFinder()
+
+        perclos = np.zeros((len(thresholds), len(windows), len(landmarks)))
+        features = np.zeros((len(landmarks), len(RandomForest.FEATURE_NAMES)))
+        for offset in range(0, len(landmarks), cls.CHUNK_SIZE):
+            rows = slice(offset, offset + cls.CHUNK_SIZE)
+            chunk = np.asarray(landmarks[rows], dtype=np.float32)
+            # EAR and MAR do not depend on the swept thresholds
+            for t, w in np.ndindex(perclos.shape[:2]):
+                perclos[t, w, rows], ear = perclos_finders[t][w].find_parameters_batch(
+                    chunk, timestamps[rows])
+            mar = np.zeros(len(chunk))
+            for finder in yawn_finders:
+                _, _, mar = finder.find_parameters_batch(chunk, timestamps[rows])
+            roll, pitch = angle_finder.find_parameters_batch(chunk, timestamps[rows])
+            # Columns in RandomForest.FEATURE_NAMES order
+            features[rows] = np.column_stack((mar, ear, roll, pitch))
+
+        # Single classifier predictions do not depend on the swept
+        # parameters, so the forest runs once over the whole video
+        return {
+            "timestamps": timestamps,
+            "perclos": perclos,
+            "single_predictions": classifier.predict_batch(features),
+            "labels": labels,
+            "yawns": np.array([finder.yawn_counter for finder in yawn_finders],
+                              dtype=np.int64)
+        }
+
+    @classmethod
+    def evaluate_series(cls, series, grid):
+        timestamps = series["timestamps"]
+        labels = series["labels"]
+
+        memory_sizes = grid["memory_sizes"]
+        activation_certainties = grid["activation_certainties"]
+        shape = [len(grid[name]) for name in cls.GRID_PARAMETERS]
+        counts = {name: np.zeros(shape, dtype=np.int64)
+                  for name in ("true_positives", "false_positives",
+                               "true_negatives", "false_negatives")}
+        latency = np.full(shape, np.nan)
+        onset = np.argmax(labels) if labels.any() else None
+
+        for (t, w), (b, (lower, upper)) in itertools.product(
+                np.ndindex(series["perclos"].shape[:2]),
+                enumerate(grid["perclos_bands"])):
+            perclos = series["perclos"][t, w]
+            predictions = np.broadcast_to(perclos >= upper,
+                                          (len(memory_sizes), len(activation_certainties),
+                                           len(timestamps))).copy()
+            in_band = np.flatnonzero((lower <= perclos) & (perclos < upper))
+            if len(in_band):
+                # Share of drowsy predictions among the last memory_size pushes
+                pushed = np.concatenate(([0], np.cumsum(series["single_predictions"][in_band])))
+                positions = np.arange(1, len(in_band) + 1)
+                oldest = np.maximum(positions[None, :] - memory_sizes[:, None], 0)
+                certainty = (pushed[positions][None, :] - pushed[oldest]) / memory_sizes[:, None]
+                predictions[:, :, in_band] = certainty[:, None, :] >= activation_certainties[None, :, None]
+
+            index = (t, w, b)
+            counts["true_positives"][index] = (predictions & labels).sum(axis=-1)
+            counts["false_positives"][index] = (predictions & ~labels).sum(axis=-1)
+            counts["true_negatives"][index] = (~predictions & ~labels).sum(axis=-1)
+            counts["false_negatives"][index] = (~predictions & labels).sum(axis=-1)
+
+            if onset is not None:
+                # First alert at or after the first drowsy-labelled frame
+                after_onset = predictions[:, :, onset:]
+                alerted = after_onset.any(axis=-1)
+                first_alert = np.argmax(after_onset, axis=-1) + onset
+                latency[index] = np.where(alerted,
+                                          timestamps[first_alert] - timestamps[onset],
+                                          np.nan)
+
+        return {
+            **counts,
+            "latency_sum": np.nan_to_num(latency),
+            "alerts": (~np.isnan(latency)).astype(np.int64),
+            "missed_alerts": np.isnan(latency).astype(np.int64) if onset is not None
+            else np.zeros(shape, dtype=np.int64),
+            "yawns": series["yawns"],
+            "duration": float(timestamps[-1] - timestamps[0]) if len(timestamps) else 0.0
+        }
+
+    @staticmethod
+    def _accumulate(totals, result):
+        if totals is None:
+            return dict(result)
+        return {name: totals[name] + value for name, value in result.items()}
+
+    def report(self, totals):
+        if totals is None:
+            return pd.DataFrame()
+
+        positives = totals["true_positives"] + totals["false_positives"]
+        labelled_drowsy = totals["true_positives"] + totals["false_negatives"]
+        frames = labelled_drowsy + totals["true_negatives"] + totals["false_positives"]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics = {
+                "Accuracy": (totals["true_positives"] + totals["true_negatives"]) / frames,
+                "Precision": totals["true_positives"] / positives,
+                "Recall": totals["true_positives"] / labelled_drowsy,
+                "MeanAlertLatency": totals["latency_sum"] / totals["alerts"],
+                "MissedAlerts": totals["missed_alerts"]
+            }
+            yawns_per_minute = totals["yawns"] / (totals["duration"] / 60.0)
+
+        rows = []
+        for index in itertools.product(*(range(len(self.grid[name]))
+                                         for name in self.GRID_PARAMETERS)):
+            t, w, b, m, a = index
+            row = {
+                "PerclosThreshold": self.grid["perclos_thresholds"][t],
+                "PerclosWindow": self.grid["perclos_windows"][w],
+                "LowerBand": self.grid["perclos_bands"][b][0],
+                "UpperBand": self.grid["perclos_bands"][b][1],
+                "MemorySize": self.grid["memory_sizes"][m],
+                "ActivationCertainty": self.grid["activation_certainties"][a]
+            }
+            row.update({name: values[index] for name, values in metrics.items()})
+            rows.append(row)
+
+        # The yawn threshold does not take part in the prediction - it is
+        # reported as a separate axis of the grid
+        yawns = pd.DataFrame({"YawnThreshold": self.grid["yawn_thresholds"],
+                              "YawnsPerMinute": yawns_per_minute})
+        return pd.DataFrame(rows).merge(yawns, how="cross").sort_values(
+            ["Accuracy", "MeanAlertLatency"], ascending=[False, True],
+            ignore_index=True)
@@ -1,95 +1,385 @@
 import re
+import math
 import cv2
-import pandas as pd
+import numpy as np
 from tqdm import tqdm
 from pathlib import Path
 from Workspace.BackEnd.FileManagement.data_saver import DataSaver
+from Workspace.BackEnd.FileManagement.random_forest import RandomForest
+from Workspace.Utilities import Utils
+from .frame_reader import FrameReader
 
 
 class VideoProcessor:
     def __init__(self, image_processor, perclos_finder,
                  yawn_finder, face_angle_finder,
-                 classifier):
+                 classifier, chunk_size=512, file_format="csv",
+                 frame_stride=1, prefetch_size=8, landmark_cache=None,
+                 batch_prediction=False):
         self.image_processor = image_processor
         self.perclos_finder = perclos_finder
         self.yawn_finder = yawn_finder
         self.face_angle_finder = face_angle_finder
         self.classifier = classifier
+        self._features = np.empty(len(RandomForest.FEATURE_NAMES))
+        self.chunk_size = chunk_size
+        self.file_format = file_format
+        self.frame_stride = frame_stride
+        self.prefetch_size = prefetch_size
+        self.landmark_cache = landmark_cache
+        # Offline runs collect the features of the whole video and classify
+        # them with one model call before the results are saved
+        self.batch_prediction = batch_prediction
+        self._pending_rows = []
 
     def process_video(self, video_path, output_folder,
-                      mode, dataset):
+                      mode, dataset, progress_callback=None,
+                      atomic=False):
+        # Landmarks cached by an earlier run skip decoding and FaceMesh entirely
+        cache_key = self._cache_key(video_path, self.frame_stride)
+        saving_path = self._process_from_cache(cache_key, video_path,
+                                               output_folder, mode,
+                                               dataset, atomic)
+        if saving_path is not None:
+            return saving_path
+
         cap = cv2.VideoCapture(str(video_path))
         if not cap.isOpened():
             raise IOError(
                 f"Error opening video: {video_path}")
 
-        filename = self._generate_filename(video_path, mode, dataset)
-        data_saver = DataSaver(filename,
-                               save_path=output_folder)
+        data_saver = self._create_data_saver(video_path, output_folder,
+                                             mode, dataset, atomic)
 
         total_frames = int(
             cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
 
         self._reset_finders()
+        self.image_processor.reset_tracking()
+        cache_writer = self._create_cache_writer(
+            cache_key, math.ceil(total_frames / self.frame_stride),
+            fps, self.frame_stride)
+        cached_rows = 0
 
-        with tqdm(total=total_frames,
-                  desc="Processing frames") as pbar:
-            for frame_count in range(total_frames):
-                ret, frame = cap.read()
-                if not ret:
-                    break
+        # Landmarks of a chunk of frames, NaN rows mark frames without a face
+        landmarks_chunk = np.full((self.chunk_size, Utils.landmark_count, 3), np.nan, dtype=np.float32)
+        frame_indices = []
+
+        # Decoding runs ahead on a reader thread; frames dropped by the stride are only grabbed
+        reader = FrameReader(cap, end_frame=total_frames,
+                             stride=self.frame_stride,
+                             queue_size=self.prefetch_size)
+        try:
+            with tqdm(total=total_frames,
+                      desc="Processing frames",
+                      disable=progress_callback is not None) as pbar, reader:
+                for frame_count, frame in reader:
+                    _, _, landmarks = self.image_processor.process_face_image(
+                        frame)
+                    row = len(frame_indices)
+                    landmarks_chunk[row] = landmarks[0] if len(landmarks) else np.nan
+                    frame_indices.append(frame_count)
+
+                    if len(frame_indices) == self.chunk_size:
+                        chunk = landmarks_chunk[:len(frame_indices)]
+                        self._process_chunk(chunk, frame_indices,
+                                            fps, data_saver)
+                        if cache_writer:
+                            cache_writer.write(cached_rows, chunk)
+                            cached_rows += len(chunk)
+                        if progress_callback:
+                            progress_callback(len(frame_indices) * self.frame_stride)
+                        pbar.update(len(frame_indices) * self.frame_stride)
+                        frame_indices = []
+
+                if frame_indices:
+                    chunk = landmarks_chunk[:len(frame_indices)]
+                    self._process_chunk(chunk, frame_indices, fps,
+                                        data_saver)
+                    if cache_writer:
+                        cache_writer.write(cached_rows, chunk)
+                        cached_rows += len(chunk)
+                    if progress_callback:
+                        progress_callback(len(frame_indices) * self.frame_stride)
+                    pbar.update(len(frame_indices) * self.frame_stride)
+        except BaseException:
+            if cache_writer:
+                cache_writer.discard()
+            raise
+        finally:
+            cap.release()
 
-                self._process_frame(frame, frame_count, fps,
-                                    data_saver)
-                if frame_count % 1000 == 0:
-                    pbar.update(1000)
+        if cache_writer:
+            cache_writer.commit(cached_rows)
+        self._save_pending_rows(data_saver)
+        data_saver.close()
+        return data_saver.saving_path
 
+    def split_segments(self, video_path, segment_seconds,
+                       warmup_seconds):
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise IOError(
+                f"Error opening video: {video_path}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
         cap.release()
-        data_saver.flush_batch()
+
+        # Segments start on frames kept by the stride, as in a sequential run
+        segment_frames = max(int(round(segment_seconds * fps)), 1)
+        segment_frames = math.ceil(segment_frames / self.frame_stride) * self.frame_stride
+        warmup_frames = int(math.ceil(warmup_seconds * fps))
+        segments = [(start, min(start + segment_frames, total_frames),
+                     warmup_frames)
+                    for start in range(0, total_frames, segment_frames)]
+        return segments, fps
+
+    def extract_landmarks(self, video_path, start_frame, end_frame,
+                          warmup_frames=0, progress_callback=None):
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise IOError(
+                f"Error opening video: {video_path}")
+
+        # Warm-up frames let the FaceMesh tracker settle before the segment starts;
+        # its state still differs from a run over the whole video, so landmarks
+        # near the segment start are an approximation of the sequential ones
+        first_frame = max(start_frame - warmup_frames, 0)
+        self._seek(cap, first_frame)
+        self.image_processor.reset_tracking()
+
+        landmarks = np.full((math.ceil((end_frame - start_frame) / self.frame_stride),
+                             Utils.landmark_count, 3),
+                            np.nan, dtype=np.float32)
+        frames_read = 0
+        with FrameReader(cap, first_frame, end_frame,
+                         stride=self.frame_stride,
+                         queue_size=self.prefetch_size) as reader:
+            for frame_count, frame in reader:
+                _, _, face_landmarks = self.image_processor.process_face_image(
+                    frame)
+                if frame_count >= start_frame:
+                    if len(face_landmarks):
+                        landmarks[(frame_count - start_frame) // self.frame_stride] = face_landmarks[0]
+                    frames_read += 1
+                    if progress_callback and frames_read % self.chunk_size == 0:
+                        progress_callback(self.chunk_size * self.frame_stride)
+
+        cap.release()
+        if progress_callback and frames_read % self.chunk_size:
+            progress_callback((frames_read % self.chunk_size) * self.frame_stride)
+        return landmarks[:frames_read]
+
+    def process_landmark_segments(self, video_path, output_folder,
+                                  mode, dataset, segments, fps,
+                                  atomic=False):
+        # Segments are (start_frame, landmarks) pairs in frame order; the
+        # finders and the classifier run over them in order, as in a
+        # sequential run (only the landmarks themselves may differ near
+        # segment starts, see extract_landmarks)
+        data_saver = self._create_data_saver(video_path, output_folder,
+                                             mode, dataset, atomic)
+        self._reset_finders()
+        cache_key = self._cache_key(video_path, self.frame_stride)
+        cache_writer = None
+
+        next_frame = 0
+        try:
+            for start_frame, landmarks in segments:
+                if start_frame != next_frame:
+                    # An earlier segment ended early - a sequential run stops there too
+                    break
+                if cache_writer is None:
+                    cache_writer = self._create_cache_writer(
+                        cache_key, math.ceil(self._count_frames(video_path) / self.frame_stride),
+                        fps, self.frame_stride)
+                # Segment rows hold every frame_stride-th frame from start_frame
+                frame_indices = (start_frame + np.arange(len(landmarks))
+                                 * self.frame_stride).tolist()
+                self._process_landmarks(landmarks, frame_indices, fps,
+                                        data_saver)
+                if cache_writer:
+                    cache_writer.write(start_frame // self.frame_stride, landmarks)
+                next_frame = start_frame + len(landmarks) * self.frame_stride
+        except BaseException:
+            if cache_writer:
+                cache_writer.discard()
+            raise
+
+        if cache_writer:
+            cache_writer.commit(next_frame // self.frame_stride)
+        self._save_pending_rows(data_saver)
+        data_saver.close()
         return data_saver.saving_path
 
-    def _process_frame(self, frame, frame_count, fps,
+    def process_cached(self, video_path, output_folder, mode, dataset,
+                       frame_stride=1, atomic=False):
+        return self._process_from_cache(
+            self._cache_key(video_path, frame_stride), video_path,
+            output_folder, mode, dataset, atomic)
+
+    def find_cached_result(self, video_path, output_folder, mode, dataset):
+        # Landmark cache key and result file of a video processed earlier with
+        # the current settings, or None if either of them is missing
+        cache_key = self._cache_key(video_path, self.frame_stride)
+        if cache_key is None or self.landmark_cache.load(cache_key) is None:
+            return None
+        stem = Path(self._generate_filename(video_path, mode, dataset)).stem
+        for result_file in sorted(Path(output_folder).glob(f"{stem}.*")):
+            if DataSaver.is_supported_file(result_file):
+                return cache_key, result_file
+        return None
+
+    def _process_from_cache(self, cache_key, video_path, output_folder,
+                            mode, dataset, atomic):
+        if cache_key is None:
+            return None
+        entry = self.landmark_cache.load(cache_key)
+        if entry is None:
+            return None
+
+        landmarks, metadata = entry
+        data_saver = self._create_data_saver(video_path, output_folder,
+                                             mode, dataset, atomic)
+        self._reset_finders()
+        frame_indices = (np.arange(len(landmarks)) * metadata["frame_stride"]).tolist()
+        self._process_landmarks(landmarks, frame_indices, metadata["fps"],
+                                data_saver)
+        self._save_pending_rows(data_saver)
+        data_saver.close()
+        return data_saver.saving_path
+
+    def _process_landmarks(self, landmarks, frame_indices, fps,
+                           data_saver):
+        for offset in range(0, len(landmarks), self.chunk_size):
+            chunk = np.asarray(landmarks[offset:offset + self.chunk_size],
+                               dtype=np.float32)
+            self._process_chunk(chunk,
+                                frame_indices[offset:offset + self.chunk_size],
+                                fps, data_saver)
+
+    def _cache_key(self, video_path, frame_stride):
+        if self.landmark_cache is None:
+            return None
+        settings = self.image_processor.get_settings()
+        settings["frame_stride"] = frame_stride
+        return self.landmark_cache.make_key(video_path, settings)
+
+    def _create_cache_writer(self, cache_key, frame_count, fps,
+                             frame_stride):
+        if cache_key is None:
+            return None
+        return self.landmark_cache.create(
+            cache_key, frame_count, Utils.landmark_count,
+            {"fps": fps, "frame_stride": frame_stride})
+
+    @staticmethod
+    def _count_frames(video_path):
+        cap = cv2.VideoCapture(str(video_path))
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        return total_frames
+
+    def _create_data_saver(self, video_path, output_folder, mode,
+                           dataset, atomic):
+        filename = self._generate_filename(video_path, mode, dataset)
+        return DataSaver(filename,
+                         save_path=output_folder,
+                         file_format=self.file_format,
+                         atomic=atomic)
+
+    @staticmethod
+    def _seek(cap, frame_index):
+        if frame_index == 0:
+            return
+        if cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index) and int(
+                cap.get(cv2.CAP_PROP_POS_FRAMES)) == frame_index:
+            return
+        # Inexact seeking - skip frames from the beginning without decoding them
+        cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        for _ in range(frame_index):
+            cap.grab()
+
+    def _process_chunk(self, landmarks, frame_indices, fps,
                        data_saver):
-        processed_frame, face_mesh_coords = self.image_processor.process_face_image(
-            frame)
+        timestamps = np.asarray(frame_indices) / fps
+
+        perclos, ear = self.perclos_finder.find_parameters_batch(
+            landmarks, timestamps)
+        _, _, mar = self.yawn_finder.find_parameters_batch(
+            landmarks, timestamps)
+        roll, pitch = self.face_angle_finder.find_parameters_batch(
+            landmarks, timestamps)
 
-        if not face_mesh_coords:
+        # Every frame gets a row (labels are applied by row position); frames
+        # without a face have zero features and PERCLOS, so Drowsy is False
+        if self.batch_prediction:
+            self._pending_rows.append((
+                list(frame_indices), timestamps, np.array(mar),
+                np.array(roll), np.array(pitch), np.array(ear),
+                np.array(perclos)))
             return
 
-        perclos, ear = self.perclos_finder.find_parameter(
-            face_mesh_coords)
-        is_jawning, yawn_counter, mar = self.yawn_finder.find_parameter(
-            face_mesh_coords)
-        roll, pitch = self.face_angle_finder.find_parameter(
-            face_mesh_coords)
-
-        prediction = self._calculate_prediction(perclos,
-                                                mar, ear,
-                                                roll, pitch)
-
-        packet = {
-            "Frame": frame_count,
-            "Timestamp": frame_count / fps,
-            "MAR": mar,
-            "Roll": roll,
-            "Pitch": pitch,
-            "EAR": ear,
-            "PERCLOS": perclos,
-            "Drowsy": prediction
-        }
-        data_saver.add_to_batch(packet)
+        predictions = [
+            self._calculate_prediction(
+                float(perclos[row]), float(mar[row]), float(ear[row]),
+                float(roll[row]), float(pitch[row]))
+            for row in range(len(frame_indices))]
+        self._save_rows(data_saver, frame_indices, timestamps, mar, roll,
+                        pitch, ear, perclos, predictions)
+
+    def _save_pending_rows(self, data_saver):
+        if not self._pending_rows:
+            return
+        frame_indices = [frame_count for rows in self._pending_rows
+                         for frame_count in rows[0]]
+        timestamps, mar, roll, pitch, ear, perclos = (
+            np.concatenate(column)
+            for column in list(zip(*self._pending_rows))[1:])
+        self._pending_rows = []
+
+        predictions = self._calculate_predictions(perclos, mar, ear, roll,
+                                                  pitch)
+        self._save_rows(data_saver, frame_indices, timestamps, mar, roll,
+                        pitch, ear, perclos, predictions)
+
+    @staticmethod
+    def _save_rows(data_saver, frame_indices, timestamps, mar, roll, pitch,
+                   ear, perclos, predictions):
+        for row, frame_count in enumerate(frame_indices):
+            packet = {
+                "Frame": frame_count,
+                "Timestamp": float(timestamps[row]),
+                "MAR": float(mar[row]),
+                "Roll": float(roll[row]),
+                "Pitch": float(pitch[row]),
+                "EAR": float(ear[row]),
+                "PERCLOS": float(perclos[row]),
+                "Drowsy": predictions[row]
+            }
+            data_saver.add_to_batch(packet)
+
+    def _calculate_predictions(self, perclos, mar, ear, roll, pitch):
+        # Same gating as _calculate_prediction, as boolean masks over the video
+        predictions = perclos >= 0.25
+        gated = (0.125 <= perclos) & (perclos < 0.25)
+        if gated.any():
+            features = np.column_stack(
+                (mar, ear, roll, pitch)).astype(np.float64)[gated]
+            predictions[gated] = \
+                self.classifier.moving_mode_value_prediction_batch(features)
+        return predictions.tolist()
 
     def _calculate_prediction(self, perclos, mar, ear, roll,
                               pitch):
         if perclos >= 0.25:
             return True
         elif 0.125 <= perclos < 0.25:
-            data = pd.DataFrame([[mar, ear, roll, pitch]],
-                                columns=["MAR", "EAR",
-                                         "Roll", "Pitch"])
+            # Reused buffer in RandomForest.FEATURE_NAMES order
+            self._features[:] = (mar, ear, roll, pitch)
             return self.classifier.moving_mode_value_prediction(
-                data)
+                self._features)
         return False
 
     def _generate_filename(self, video_path, mode, dataset):
@@ -114,9 +404,13 @@ class VideoProcessor:
             raise ValueError("Invalid dataset")
 
     def _reset_finders(self):
+        self._pending_rows = []
         self.perclos_finder.reset_memory()
         self.yawn_finder.reset_memory()
         self.face_angle_finder.reset_memory()
+        # Each video starts with an empty prediction window, independent of
+        # which videos a worker processed before
+        self.classifier.prediction_memory.reset()
 
 
 class DrowsinessLabelApplier:
@@ -125,12 +419,12 @@ class DrowsinessLabelApplier:
         self.output_folder = Path(output_folder)
 
     def apply_labels_from_folders(self):
-        csv_files = list(self.output_folder.glob('*.csv'))
+        csv_files = self._find_result_files()
 
         for i, csv_file in enumerate(csv_files, 1):
             match = re.search(
-                r"(\d+)_([^_]+(?:_[^_]+)*)_([^_]+)\.csv$",
-                csv_file.name)
+                r"(\d+)_([^_]+(?:_[^_]+)*)_([^_]+)$",
+                csv_file.stem)
             if not match:
                 continue
 
@@ -144,7 +438,7 @@ class DrowsinessLabelApplier:
         kss_file = open(self.label_source)
         labels = kss_file.read().split()
         # Access it by (x-1)*3 + (y-1)
-        csv_files = list(self.output_folder.glob('*.csv'))
+        csv_files = self._find_result_files()
 
         for i,file in enumerate(csv_files,1):
             numbers = list(map(int, re.findall(r'\d+', file.name)))
@@ -155,10 +449,10 @@ class DrowsinessLabelApplier:
             else:
                 drowsiness_label = 0
 
-            df = pd.read_csv(file)
+            df = DataSaver.load_data_frame(file)
             df['Drowsy'] = drowsiness_label
             # df.drop('PERCLOS', axis=1, inplace=True)
-            df.to_csv(file, index=False)
+            DataSaver.write_data_frame(df, file)
             print(f"Processed {i}/{len(csv_files)}: {file.name}")
 
     def _apply_label_from_txt(self, csv_file, txt_path):
@@ -169,10 +463,14 @@ class DrowsinessLabelApplier:
             print(f"Label file not found: {txt_path}")
             return
 
-        df = pd.read_csv(csv_file)
+        df = DataSaver.load_data_frame(csv_file)
         if len(drowsiness_data) != len(df):
             print(f"Label length mismatch in {txt_path}")
 
         df['Drowsy'] = list(map(int, drowsiness_data.ljust(
             len(df), '0')[:len(df)]))
-        df.to_csv(csv_file, index=False)
\ No newline at end of file
+        DataSaver.write_data_frame(df, csv_file)
+
+    def _find_result_files(self):
+        return [f for f in self.output_folder.glob('*')
+                if f.is_file() and DataSaver.is_supported_file(f)]
\ No newline at end of file
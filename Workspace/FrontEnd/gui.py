@@ -1,5 +1,6 @@
 import customtkinter
 import queue
+import threading
 from PIL import Image, ImageTk
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
@@ -31,10 +32,18 @@ class GUI:
 
         # Kolejki do przechowywania danych o parametrach i obrazu z kamery.
         self.data_queue = queue.Queue()
-        self.image_queue = queue.Queue()
 
-        # Bieżący obraz z kamery, przetworzony dla tkinter.
+        # Podwójne buforowanie obrazu z kamery: wątek przetwarzania konwertuje klatkę do RGB
+        # w buforze tylnym, a wątek GUI wyświetla bufor przedni. Bufory są wykorzystywane
+        # ponownie, więc wyświetlanie kolejnych klatek nie wymaga nowych alokacji.
+        self._image_lock = threading.Lock()
+        self._front_image = None
+        self._back_image = None
+        self._has_new_image = False
+
+        # Bieżący obraz z kamery, przetworzony dla tkinter, i element płótna, który go wyświetla.
         self.current_image = None
+        self._canvas_image_id = None
 
         # Ustawienie rozmiarów głównego okna.
         self.width = 1450
@@ -241,13 +250,21 @@ Note:
 
     def queue_image(self, image: 'np.ndarray') -> None:
         """
-        Dodaje nowy obraz (np. z kamery) do kolejki image_queue, skąd
-        będzie pobierany i wyświetlany w metodzie update_webcam().
+        Przekazuje nowy obraz (np. z kamery) do wyświetlenia w metodzie update_webcam().
+        Obraz jest od razu konwertowany do RGB w buforze tylnym (kopia), więc po powrocie
+        z metody przekazana tablica może zostać ponownie wykorzystana przez wywołującego.
+        Niewyświetlony jeszcze obraz zastępowany jest nowszym.
 
         :param image: Obraz w formacie kompatybilnym z OpenCV (np. BGR).
         :type image: numpy.ndarray
         """
-        self.image_queue.put(image)
+        if self._back_image is None or self._back_image.shape != image.shape:
+            self._back_image = np.empty_like(image)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._back_image)
+
+        with self._image_lock:
+            self._front_image, self._back_image = self._back_image, self._front_image
+            self._has_new_image = True
 
     def get_face_plotter(self) -> FacePlotter:
         """
@@ -341,20 +358,26 @@ Note:
     def update_webcam(self) -> None:
         """
         Cykl aktualizacji obrazu w oknie 'Kamera'. Metoda co około 33 ms (30 FPS)
-        pobiera z kolejki najnowszy obraz, konwertuje go do formatu RGB i wyświetla
-        na płótnie (Canvas). Następnie ponownie planuje wywołanie samej siebie
-        (window.after()).
+        pobiera najnowszy obraz (już w formacie RGB) i wyświetla go na płótnie (Canvas).
+        Obraz PhotoImage i element płótna tworzone są tylko raz (lub przy zmianie rozmiaru),
+        a kolejne klatki kopiowane są do istniejącego obrazu. Następnie metoda ponownie
+        planuje wywołanie samej siebie (window.after()).
         """
-        try:
-            while not self.image_queue.empty():
-                image = self.image_queue.get_nowait()
-                # Konwersja obrazu z BGR (OpenCV) do RGB, a następnie do formatu PIL.
-                image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-                self.current_image = ImageTk.PhotoImage(image)
-                self.webcam_canvas.create_image(0, 0, image=self.current_image, anchor="nw")
-
-        except queue.Empty:
-            pass
+        with self._image_lock:
+            if self._has_new_image:
+                self._has_new_image = False
+                height, width = self._front_image.shape[:2]
+                # Obraz PIL korzysta bezpośrednio z pamięci bufora (bez kopiowania)
+                image = Image.frombuffer("RGB", (width, height), self._front_image, "raw", "RGB", 0, 1)
+                if self.current_image is None or (self.current_image.width(), self.current_image.height()) != (width, height):
+                    self.current_image = ImageTk.PhotoImage(image)
+                    if self._canvas_image_id is None:
+                        self._canvas_image_id = self.webcam_canvas.create_image(
+                            0, 0, image=self.current_image, anchor="nw")
+                    else:
+                        self.webcam_canvas.itemconfig(self._canvas_image_id, image=self.current_image)
+                else:
+                    self.current_image.paste(image)
 
         if self.running:
             # Zaplanowanie ponownego wywołania metody po 33 ms (≈30 FPS).
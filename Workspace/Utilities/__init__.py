@@ -1,2 +1,3 @@
 from .utils import *
-from .config import *
\ No newline at end of file
+from .config import *
+from .rolling_window import *
\ No newline at end of file
@@ -3,7 +3,7 @@ import pathlib
 
 class Config:
     DATASETS = ["nthuddd", "drozy"]
-    MODES = ["camera", "image", "video", "dataset"]
+    MODES = ["camera", "image", "video", "dataset", "sweep"]
     PROCESSING_MODES = ["training", "evaluation",
                         "apply_drowsiness"]
 
@@ -23,6 +23,58 @@ class Config:
         self.validation_folder = self.base_path / "Evaluation Dataset"
         self.output_folder = self.base_path / "Processed_dataset"
 
+        # Camera capture settings (None keeps the driver default)
+        self.camera_index = 0
+        self.camera_resolution = (640, 480)
+        self.camera_fourcc = "MJPG"
+        self.camera_fps = None
+        self.camera_buffer_size = 1
+        # Scale of the camera preview with the landmark overlay shown in the GUI
+        self.camera_preview_scale = 1.0
+        # Run FaceMesh on a downscaled crop around the previously found face (camera and video modes)
+        self.face_roi_tracking = False
+        # Side (pixels) of the downscaled face crop and the margin added around the landmarks
+        self.face_roi_size = 256
+        self.face_roi_margin = 0.25
+        # Share of time FaceMesh may use in camera mode; frames beyond it get predicted
+        # landmarks (None runs FaceMesh on every frame)
+        self.camera_inference_budget = None
+        # Maximum number of consecutive frames with predicted landmarks
+        self.camera_max_skipped_frames = 3
+        # Reuse the previous landmarks when the downsampled grayscale frame changes less than
+        # this mean difference (0-255) in camera and video modes (None disables the gate)
+        self.motion_gate_threshold = None
+        self.motion_gate_max_reused_frames = 30
+        # Seconds without a face before camera mode idles on a lightweight face detector
+        # (None keeps full-rate FaceMesh all the time) and the frame interval while idle
+        self.camera_idle_timeout = None
+        self.camera_idle_frame_interval = 0.5
+        # Faces tracked in camera mode, each with its own PERCLOS, yawn, angle and classifier
+        # state (e.g. driver and co-driver); more than one disables ROI tracking and the scheduler
+        self.camera_max_faces = 1
+
+        # Output format of processed video and sequence files: "csv", "parquet", "feather" or "npz"
+        self.file_format = "csv"
+
+        # Worker processes for video extraction (1 runs sequentially, None uses all cores)
+        self.video_workers = 1
+        # Split each video into segments of this length (seconds) across the workers; None disables.
+        # FaceMesh restarts its tracking at every segment, so landmarks near segment starts can
+        # differ slightly from a run over the whole video
+        self.video_segment_seconds = None
+        # Frames decoded before each segment so the FaceMesh tracker settles (seconds); this
+        # narrows, but does not remove, the difference at segment starts
+        self.video_warmup_seconds = 2.0
+        # Process every n-th video frame (skipped frames are grabbed but not decoded)
+        self.video_frame_stride = 1
+        # Folder caching raw per-frame landmarks of processed videos; None disables
+        self.landmark_cache_folder = None
+        # Precision of cached landmarks: "float32" (exact) or "float16" (half the size)
+        self.landmark_cache_dtype = "float32"
+        # Classify all frames of a video with one model call after extraction (same results as
+        # classifying frame by frame, at a fraction of the cost)
+        self.video_batch_prediction = True
+
         # File names
         self.results_name = "results.csv"
         self.training_name = "training_data.csv"
@@ -31,4 +83,20 @@ class Config:
 
         # Thresholds
         self.perclos_threshold = 0.3
-        self.yawn_threshold = 0.5
\ No newline at end of file
+        # PERCLOS windows (seconds); the first one drives the prediction
+        self.perclos_windows = (60.0,)
+        self.yawn_threshold = 0.5
+
+        # Classifier predictions remembered for rounded (MAR, EAR, Roll, Pitch) vectors (0 disables);
+        # rounding cells containing a split threshold are never cached, so predictions do not change
+        self.classifier_cache_size = 0
+        self.classifier_cache_resolution = (1e-5, 1e-5, 1e-4, 1e-4)
+
+        # Parameter grid evaluated in "sweep" mode on cached landmarks against the labelled results
+        self.sweep_perclos_thresholds = (0.2, 0.25, 0.3, 0.35)
+        self.sweep_perclos_windows = (30.0, 60.0)
+        # (lower, upper) PERCLOS bands: above upper is drowsy, within the band the classifier decides
+        self.sweep_perclos_bands = ((0.125, 0.25), (0.1, 0.2), (0.15, 0.3))
+        self.sweep_memory_sizes = (25, 50, 100)
+        self.sweep_activation_certainties = (0.4, 0.5, 0.6)
+        self.sweep_yawn_thresholds = (0.4, 0.5, 0.6)
\ No newline at end of file
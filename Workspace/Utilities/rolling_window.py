@@ -0,0 +1,235 @@
+import math
+import numpy as np
+from typing import Optional, Sequence, Tuple
+
+
+class RollingWindow:
+    """
+    Okno kroczące o stałej pojemności, oparte na prealokowanym buforze cyklicznym.
+    Próbki są usuwane z okna na podstawie znaczników czasu (okna zdefiniowane w sekundach)
+    lub, gdy bufor jest pełny, według kolejności dodania. Suma i średnia wartości
+    w oknie wyznaczane są w czasie O(1) na podstawie skumulowanej sumy, dzięki czemu
+    dodanie nowej próbki nie wymaga kopiowania ani przeglądania całej historii.
+    Jeden bufor może obsługiwać kilka okien o różnej długości jednocześnie.
+    Analogicznie, w czasie O(1) zwracana jest liczba niezerowych próbek w oknie.
+    """
+
+    def __init__(self, capacity: int, durations: Optional[Sequence[float]] = None) -> None:
+        """
+        Inicjalizuje okno kroczące, alokując bufory na znaczniki czasu i sumy skumulowane.
+
+        :param capacity: Maksymalna liczba próbek przechowywanych w buforze.
+        :type capacity: int
+        :param durations: Długości okien w sekundach. Brak wartości oznacza jedno okno
+                          ograniczone wyłącznie pojemnością bufora.
+        :type durations: Sequence[float] lub None
+        """
+        if capacity <= 0:
+            raise ValueError("RollingWindow capacity must be positive")
+
+        self.capacity: int = int(capacity)
+        self.durations: Optional[tuple] = None if durations is None else tuple(float(d) for d in durations)
+
+        self._timestamps: np.ndarray = np.zeros(self.capacity)
+        # Suma wszystkich wcześniejszych próbek w chwili dodania danej próbki
+        self._cumulative_before: np.ndarray = np.zeros(self.capacity)
+        self._total: float = 0.0
+        # Liczba wszystkich wcześniejszych niezerowych próbek w chwili dodania danej próbki
+        self._nonzero_before: np.ndarray = np.zeros(self.capacity, dtype=np.int64)
+        self._nonzero_total: int = 0
+        self._count: int = 0
+        # Indeks (bezwzględny) najstarszej próbki należącej do każdego z okien
+        self._starts: np.ndarray = np.zeros(1 if self.durations is None else len(self.durations), dtype=np.int64)
+
+    @classmethod
+    def for_duration(cls, durations: Sequence[float], max_frame_rate: float) -> "RollingWindow":
+        """
+        Tworzy okno czasowe o pojemności wystarczającej do przechowania najdłuższego
+        z okien przy zadanej maksymalnej liczbie klatek na sekundę.
+
+        :param durations: Długości okien w sekundach.
+        :type durations: Sequence[float]
+        :param max_frame_rate: Maksymalna spodziewana liczba próbek na sekundę.
+        :type max_frame_rate: float
+        :return: Nowy obiekt RollingWindow.
+        :rtype: RollingWindow
+        """
+        capacity = math.ceil(max(durations) * max_frame_rate) + 1
+        return cls(capacity, durations)
+
+    def reset(self) -> None:
+        """
+        Czyści zawartość okna bez ponownej alokacji buforów.
+        """
+        self._timestamps.fill(0.0)
+        self._cumulative_before.fill(0.0)
+        self._total = 0.0
+        self._nonzero_before.fill(0)
+        self._nonzero_total = 0
+        self._count = 0
+        self._starts.fill(0)
+
+    def evict(self, timestamp: float) -> None:
+        """
+        Usuwa z okien próbki starsze niż długość okna względem podanego znacznika czasu.
+
+        :param timestamp: Bieżący znacznik czasu w sekundach.
+        :type timestamp: float
+        """
+        if self.durations is None:
+            return
+
+        for index, duration in enumerate(self.durations):
+            start = int(self._starts[index])
+            limit = timestamp - duration
+            while start < self._count and self._timestamps[start % self.capacity] <= limit:
+                start += 1
+            self._starts[index] = start
+
+    def push(self, value: float, timestamp: float = 0.0) -> None:
+        """
+        Dodaje próbkę do okna, usuwając wcześniej próbki, które wypadły poza okno
+        (czasowo lub z powodu zapełnienia bufora).
+
+        :param value: Wartość próbki.
+        :type value: float
+        :param timestamp: Znacznik czasu próbki w sekundach (wymagany dla okien czasowych).
+        :type timestamp: float
+        """
+        self.evict(timestamp)
+
+        slot = self._count % self.capacity
+        self._timestamps[slot] = timestamp
+        self._cumulative_before[slot] = self._total
+        self._nonzero_before[slot] = self._nonzero_total
+        self._total += value
+        self._nonzero_total += int(value != 0)
+        self._count += 1
+
+        # Najstarsza próbka została nadpisana - przesunięcie początku okien
+        oldest_stored = self._count - self.capacity
+        np.maximum(self._starts, oldest_stored, out=self._starts)
+
+    def push_batch(self, values: np.ndarray, timestamps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Dodaje do okna całą serię próbek naraz i zwraca sumy oraz liczności wszystkich okien
+        po dodaniu każdej z próbek. Wyniki są identyczne (bit po bicie) z wywoływaniem push()
+        i sum()/size() próbka po próbce, ponieważ sumy skumulowane liczone są w tej samej
+        kolejności (np.cumsum), a granice okien wyznaczane są wyszukiwaniem binarnym.
+        Znaczniki czasu muszą być niemalejące.
+
+        :param values: Wartości kolejnych próbek, tablica o kształcie (N,).
+        :type values: np.ndarray
+        :param timestamps: Znaczniki czasu kolejnych próbek w sekundach, tablica o kształcie (N,).
+        :type timestamps: np.ndarray
+        :return: Krotka (sums, sizes) - tablice o kształcie (N, liczba_okien).
+        :rtype: Tuple[np.ndarray, np.ndarray]
+        """
+        values = np.asarray(values, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        sample_count = len(values)
+        sums = np.zeros((sample_count, len(self._starts)))
+        sizes = np.zeros((sample_count, len(self._starts)), dtype=np.int64)
+        if sample_count == 0:
+            return sums, sizes
+
+        # Próbki już obecne w buforze (od najstarszej) połączone z nowymi próbkami
+        stored = min(self._count, self.capacity)
+        first_stored = self._count - stored
+        stored_slots = np.arange(first_stored, self._count) % self.capacity
+        cumulative = np.cumsum(np.concatenate(([self._total], values)))
+        all_timestamps = np.concatenate((self._timestamps[stored_slots], timestamps))
+        all_cumulative_before = np.concatenate((self._cumulative_before[stored_slots], cumulative[:-1]))
+        nonzero = np.cumsum(np.concatenate(([self._nonzero_total], values != 0)))
+        all_nonzero_before = np.concatenate((self._nonzero_before[stored_slots], nonzero[:-1]))
+        positions = np.arange(stored, stored + sample_count)
+
+        for index in range(len(self._starts)):
+            starts = np.maximum(positions - self.capacity + 1, int(self._starts[index]) - first_stored)
+            if self.durations is not None:
+                limits = timestamps - self.durations[index]
+                expired = np.minimum(np.searchsorted(all_timestamps, limits, side="right"), positions)
+                starts = np.maximum(starts, expired)
+            starts = np.maximum.accumulate(starts)
+            sums[:, index] = cumulative[1:] - all_cumulative_before[starts]
+            sizes[:, index] = positions + 1 - starts
+            self._starts[index] = first_stored + int(starts[-1])
+
+        # Zapisanie w buforze najnowszych próbek, tak aby można było kontynuować przez push()
+        self._count += sample_count
+        kept = min(self._count, self.capacity)
+        kept_slots = np.arange(self._count - kept, self._count) % self.capacity
+        self._timestamps[kept_slots] = all_timestamps[-kept:]
+        self._cumulative_before[kept_slots] = all_cumulative_before[-kept:]
+        self._nonzero_before[kept_slots] = all_nonzero_before[-kept:]
+        self._total = float(cumulative[-1])
+        self._nonzero_total = int(nonzero[-1])
+
+        return sums, sizes
+
+    def size(self, window: int = 0) -> int:
+        """
+        Zwraca liczbę próbek w wybranym oknie.
+
+        :param window: Indeks okna (zgodny z kolejnością w 'durations').
+        :type window: int
+        :return: Liczba próbek.
+        :rtype: int
+        """
+        return self._count - int(self._starts[window])
+
+    def sum(self, window: int = 0) -> float:
+        """
+        Zwraca sumę wartości w wybranym oknie.
+
+        :param window: Indeks okna (zgodny z kolejnością w 'durations').
+        :type window: int
+        :return: Suma wartości próbek w oknie.
+        :rtype: float
+        """
+        start = int(self._starts[window])
+        if start >= self._count:
+            return 0.0
+        return self._total - float(self._cumulative_before[start % self.capacity])
+
+    def mean(self, window: int = 0) -> float:
+        """
+        Zwraca średnią wartości w wybranym oknie (0, gdy okno jest puste).
+
+        :param window: Indeks okna (zgodny z kolejnością w 'durations').
+        :type window: int
+        :return: Średnia wartości próbek w oknie.
+        :rtype: float
+        """
+        size = self.size(window)
+        if size == 0:
+            return 0.0
+        return self.sum(window) / size
+
+    def count_true(self, window: int = 0) -> int:
+        """
+        Zwraca liczbę niezerowych próbek (np. wartości True) w wybranym oknie.
+
+        :param window: Indeks okna (zgodny z kolejnością w 'durations').
+        :type window: int
+        :return: Liczba niezerowych próbek w oknie.
+        :rtype: int
+        """
+        start = int(self._starts[window])
+        if start >= self._count:
+            return 0
+        return self._nonzero_total - int(self._nonzero_before[start % self.capacity])
+
+    def any(self, window: int = 0) -> bool:
+        """
+        Sprawdza, czy w wybranym oknie znajduje się choć jedna niezerowa próbka.
+
+        :param window: Indeks okna (zgodny z kolejnością w 'durations').
+        :type window: int
+        :return: True, jeśli w oknie jest co najmniej jedna niezerowa próbka.
+        :rtype: bool
+        """
+        return self.count_true(window) > 0
+
+    def __len__(self) -> int:
+        return self.size(0)
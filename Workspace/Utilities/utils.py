@@ -1,7 +1,8 @@
 import pathlib
 import time
 import numpy as np
-from typing import List, Type, Union
+from typing import Any, List, Type
+from .rolling_window import RollingWindow
 
 
 class Utils:
@@ -10,44 +11,65 @@ class Utils:
     przetwarzania danych związanych z analizą twarzy i obliczaniem
     wskaźników takich jak FPS, a także metody do konwersji struktur danych.
 
-    :ivar tick_memory: Tablica (ruchoma pamięć) wykorzystywana do obliczania
+    :ivar tick_memory: Okno kroczące chwilowych wartości FPS wykorzystywane do obliczania
                        średniej liczby klatek na sekundę (FPS).
-    :type tick_memory: numpy.ndarray
+    :type tick_memory: RollingWindow
     """
 
-    # Tablica do obliczania średniej ruchomej FPS (15 ostatnich znaczników czasu).
-    tick_memory: np.ndarray = np.zeros(15)
+    # Okno do obliczania średniej ruchomej FPS (14 odstępów pomiędzy 15 ostatnimi znacznikami czasu).
+    tick_memory: RollingWindow = RollingWindow(14)
+    previous_tick: float = 0.0
+
+    # Liczba landmarków zwracanych przez FaceMesh z włączoną opcją refine_landmarks.
+    landmark_count: int = 478
 
     @classmethod
     def calculate_fps(cls) -> float:
         """
-        Oblicza i zwraca liczbę klatek na sekundę (FPS) na podstawie znaczników czasu
-        przechowywanych w tablicy cls.tick_memory. Wykorzystuje w tym celu metodę
-        średniej kroczącej. Dla każdej pary kolejnych znaczników obliczana jest
-        tymczasowa wartość FPS, a następnie wyniki te są uśredniane, by uzyskać
-        końcową wartość.
+        Oblicza i zwraca liczbę klatek na sekundę (FPS) metodą średniej kroczącej.
+        Dla każdej pary kolejnych znaczników czasu obliczana jest tymczasowa wartość FPS,
+        zapisywana w oknie cls.tick_memory, a następnie wyniki te są uśredniane
+        (w czasie O(1), bez kopiowania historii), by uzyskać końcową wartość.
 
         :rtype: float
         :return: Obliczona liczba klatek na sekundę (FPS).
         """
         current_tick = time.time()
 
-        # Przesunięcie zawartości tablicy w lewo o 1 (usuwa najstarszy znacznik, dopisuje najnowszy).
-        cls.tick_memory = np.roll(cls.tick_memory, -1)
-        cls.tick_memory[-1] = current_tick
-
-        partial_fps = np.zeros(len(cls.tick_memory) - 1)
-        # Dla każdej pary (tick_memory[i], tick_memory[i+1]) wyliczamy FPS,
-        # a następnie tworzymy średnią z otrzymanych wartości.
-        for i in range(len(cls.tick_memory) - 1):
-            if cls.tick_memory[-1 - i] != cls.tick_memory[-2 - i]:
-                diff = cls.tick_memory[-1 - i] - cls.tick_memory[-2 - i]
-                if diff != 0:
-                    partial_fps[i] = 1.0 / diff
+        # Chwilowy FPS dla pary (poprzedni znacznik, bieżący znacznik)
+        diff = current_tick - cls.previous_tick
+        cls.tick_memory.push(1.0 / diff if diff != 0 else 0.0)
+        cls.previous_tick = current_tick
 
-        fps = float(np.mean(partial_fps))
+        # Średnia liczona po całej pojemności okna (brakujące wartości traktowane jako 0)
+        fps = cls.tick_memory.sum() / cls.tick_memory.capacity
         return fps
 
+    @classmethod
+    def landmarks_to_array(cls, face_coords: Any) -> np.ndarray:
+        """
+        Konwertuje wynik działania MediaPipe (multi_face_landmarks) na jedną, ciągłą
+        tablicę NumPy o kształcie (liczba_twarzy, liczba_landmarków, 3) i typie float32.
+        Jeżeli przekazana wartość jest już tablicą NumPy, zwracana jest bez kopiowania.
+
+        :param face_coords: Wynik działania MediaPipe lub gotowa tablica landmarków.
+        :type face_coords: Any
+        :return: Tablica współrzędnych (x, y, z) wszystkich landmarków dla każdej twarzy.
+                 Przy braku twarzy zwracana jest tablica o kształcie (0, 478, 3).
+        :rtype: numpy.ndarray
+        """
+        if isinstance(face_coords, np.ndarray):
+            return face_coords
+
+        if not face_coords.multi_face_landmarks:
+            return np.empty((0, cls.landmark_count, 3), dtype=np.float32)
+
+        faces = face_coords.multi_face_landmarks
+        landmarks = np.empty((len(faces), len(faces[0].landmark), 3), dtype=np.float32)
+        for face_index, face_mesh in enumerate(faces):
+            landmarks[face_index] = [(point.x, point.y, point.z) for point in face_mesh.landmark]
+        return landmarks
+
     @classmethod
     def fix_pathlib(cls) -> Type[pathlib.WindowsPath]:
         """
@@ -66,7 +88,7 @@ class Utils:
         cls,
         coordinates_parser: "CoordinatesParser",
         face_plt: "FacePlotter",
-        face_mesh_coords: list
+        face_mesh_coords: Any
     ) -> None:
         """
         Wyodrębnia konkretne cechy twarzy (oczy, usta, tęczówki) z przekazanej
@@ -79,9 +101,10 @@ class Utils:
         :param face_plt: Obiekt odpowiedzialny za aktualizację i rysowanie
                          współrzędnych twarzy na wykresie 3D.
         :type face_plt: FacePlotter
-        :param face_mesh_coords: Pełna lista współrzędnych siatki twarzy (zazwyczaj 468 punktów),
+        :param face_mesh_coords: Pełna lista współrzędnych siatki twarzy (zazwyczaj 478 punktów),
                                  z której wyodrębniamy poszczególne fragmenty (np. oczy, usta, tęczówki).
-        :type face_mesh_coords: list
+                                 Może to być wynik MediaPipe lub tablica landmarków (twarze, 478, 3).
+        :type face_mesh_coords: Any
         :return: Nic nie zwraca. Efekt widoczny na wykresie.
         :rtype: None
         """
@@ -0,0 +1,23 @@
+import pathlib
+import sys
+import pandas as pd
+import pytest
+from Workspace.BackEnd.FileManagement.random_forest import RandomForest
+
+REPO_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def load_random_forest(monkeypatch):
+    # RandomForest loads the model relative to the main script (Main.py)
+    monkeypatch.setattr(sys, "argv", [str(REPO_ROOT / "Main.py")])
+
+    def load(**kwargs):
+        return RandomForest(**kwargs)
+    return load
+
+
+@pytest.fixture
+def validating_data():
+    data = pd.read_csv(REPO_ROOT / "Workspace" / "Models" / "DatabaseFiles" / "validating_data.csv")
+    return data[list(RandomForest.FEATURE_NAMES)]
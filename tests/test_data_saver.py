@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Workspace.BackEnd.FileManagement.data_saver import DataSaver
+
+
+def _rows(count):
+    rng = np.random.default_rng(0)
+    return [{"Frame": frame, "Timestamp": frame / 30, "MAR": float(rng.random()), "EAR": float(rng.random()),
+             "Roll": float(rng.normal()), "Pitch": float(rng.normal()), "Drowsy": bool(frame % 7 == 0)}
+            for frame in range(count)]
+
+
+@pytest.mark.parametrize("atomic", [False, True])
+@pytest.mark.parametrize("file_format", sorted(DataSaver.FILE_FORMATS))
+def test_round_trip(tmp_path, monkeypatch, file_format, atomic):
+    # Small row groups, so that the file is written in several parts
+    monkeypatch.setattr(DataSaver, "ROW_GROUP_SIZE", 64)
+    rows = _rows(1000)
+    saver = DataSaver("results", tmp_path, batch_size=50, file_format=file_format, atomic=atomic)
+    assert saver.saving_path.suffix == DataSaver.FILE_FORMATS[file_format]
+    for row in rows:
+        saver.add_to_batch(row)
+    saver.flush_batch()
+    saver.close()
+    saver.close()
+
+    assert [path.name for path in tmp_path.iterdir()] == [saver.saving_path.name]
+    assert DataSaver.is_supported_file(saver.saving_path)
+    loaded = DataSaver.load_data_frame(saver.saving_path)
+    expected = pd.DataFrame(rows)
+    assert list(loaded.columns) == list(expected.columns)
+    np.testing.assert_array_equal(loaded["Frame"], expected["Frame"])
+    np.testing.assert_array_equal(loaded["Drowsy"].astype(bool), expected["Drowsy"])
+    for column in ("Timestamp", "MAR", "EAR", "Roll", "Pitch"):
+        np.testing.assert_allclose(loaded[column], expected[column], rtol=1e-6)
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "feather", "npz"])
+def test_columnar_file_appears_only_on_close(tmp_path, file_format):
+    saver = DataSaver("results", tmp_path, batch_size=10, file_format=file_format)
+    for row in _rows(25):
+        saver.add_to_batch(row)
+    saver.flush_batch()
+    assert not saver.saving_path.exists()
+    saver.close()
+    assert len(DataSaver.load_data_frame(saver.saving_path)) == 25
+
+
+def test_write_data_frame_round_trip(tmp_path):
+    df = DataSaver.compact_dtypes(pd.DataFrame(_rows(20)))
+    for suffix in DataSaver.FILE_FORMATS.values():
+        path = tmp_path / f"frame{suffix}"
+        DataSaver.write_data_frame(df, path)
+        pd.testing.assert_frame_equal(DataSaver.load_data_frame(path), df, check_dtype=suffix != ".csv")
+
+
+def test_unsupported_format():
+    with pytest.raises(ValueError):
+        DataSaver("results", file_format="xlsx")
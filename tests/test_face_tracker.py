@@ -0,0 +1,42 @@
+import numpy as np
+from Workspace.BackEnd.DataProcessing.face_tracker import FaceTracker
+from Workspace.Utilities import Utils
+
+
+def _faces(*centres):
+    landmarks = np.zeros((len(centres), Utils.landmark_count, 3), dtype=np.float32)
+    for face, (x, y) in enumerate(centres):
+        landmarks[face, :, 0] = x
+        landmarks[face, :, 1] = y
+    return landmarks
+
+
+def test_ids_follow_faces():
+    tracker = FaceTracker(max_distance=0.15, max_missed_frames=2)
+    np.testing.assert_array_equal(tracker.update(_faces((0.2, 0.5), (0.7, 0.5))), [0, 1])
+    # Faces returned in a different order and slightly moved keep their ids
+    np.testing.assert_array_equal(tracker.update(_faces((0.72, 0.48), (0.21, 0.52))), [1, 0])
+    # A face far from every track gets a new id
+    np.testing.assert_array_equal(tracker.update(_faces((0.22, 0.5), (0.74, 0.5), (0.45, 0.1))), [0, 1, 2])
+
+
+def test_closest_face_gets_the_track():
+    tracker = FaceTracker(max_distance=0.15)
+    tracker.update(_faces((0.5, 0.5)))
+    np.testing.assert_array_equal(tracker.update(_faces((0.6, 0.5), (0.52, 0.5))), [1, 0])
+
+
+def test_tracks_are_removed_after_missed_frames():
+    tracker = FaceTracker(max_distance=0.15, max_missed_frames=2)
+    tracker.update(_faces((0.2, 0.5), (0.7, 0.5)))
+    for _ in range(2):
+        np.testing.assert_array_equal(tracker.update(_faces((0.2, 0.5))), [0])
+        assert tracker.removed_tracks == []
+    tracker.update(_faces((0.2, 0.5)))
+    assert tracker.removed_tracks == [1]
+    # The face coming back is a new track
+    np.testing.assert_array_equal(tracker.update(_faces((0.2, 0.5), (0.7, 0.5))), [0, 2])
+
+    tracker.reset()
+    assert sorted(tracker.removed_tracks) == [0, 2]
+    assert len(tracker.update(np.empty((0, Utils.landmark_count, 3), dtype=np.float32))) == 0
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from Workspace.BackEnd.FileManagement.flat_forest import FlatForest
+
+
+def _assert_matches_sklearn(forest, features):
+    flat_forest = FlatForest(forest)
+    votes = np.array([flat_forest.predict_votes(row) for row in features])
+    predictions = np.array([flat_forest.predict(row) for row in features])
+    model_input = pd.DataFrame(features, columns=flat_forest.feature_names) \
+        if flat_forest.feature_names is not None else features
+    np.testing.assert_array_equal(predictions, forest.predict(model_input))
+    np.testing.assert_allclose(votes, forest.predict_proba(model_input), rtol=0, atol=1e-12)
+
+
+def test_matches_sklearn_on_trained_forest():
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(400, 4))
+    labels = np.where(features[:, 0] + 0.5 * features[:, 1] ** 2 > 0.3, "Drowsy", "Not_drowsy")
+    forest = RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0).fit(features, labels)
+
+    # Training points, fresh points and points lying exactly on split thresholds
+    thresholds = np.unique(np.concatenate([tree.tree_.threshold for tree in forest.estimators_]))
+    on_splits = np.repeat(features[:1], len(thresholds), axis=0)
+    on_splits[:, 0] = thresholds
+    _assert_matches_sklearn(forest, np.concatenate((features, rng.normal(size=(200, 4)), on_splits)))
+
+
+def test_matches_loaded_model(load_random_forest, validating_data):
+    forest = load_random_forest().random_forest
+    _assert_matches_sklearn(forest, validating_data[list(forest.feature_names_in_)].to_numpy(dtype=np.float64))
+
+
+def test_rejects_models_without_trees():
+    model = LogisticRegression().fit(np.arange(8.0)[:, None], [0, 1] * 4)
+    assert not FlatForest.supports(model)
+    with pytest.raises(ValueError):
+        FlatForest(model)
@@ -0,0 +1,69 @@
+import cv2
+import numpy as np
+from Workspace.BackEnd.Modes.frame_reader import FrameReader
+
+
+class _FakeCapture:
+    # Frames filled with their own index, like cv2.VideoCapture reading into a buffer
+    def __init__(self, frame_count, width=8, height=6):
+        self.frame_count = frame_count
+        self.width = width
+        self.height = height
+        self.position = 0
+        self.retrieved = 0
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height}[prop]
+
+    def grab(self):
+        if self.position >= self.frame_count:
+            return False
+        self.position += 1
+        return True
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        if image is None:
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image.fill((self.position - 1) % 256)
+        self.retrieved += 1
+        return True, image
+
+
+def _read_all(reader):
+    # Frames are copied, as the reader reuses the buffers
+    return [(index, int(frame[0, 0, 0]), frame.copy()) for index, frame in reader]
+
+
+def test_frames_are_read_in_order_until_eof():
+    capture = _FakeCapture(50)
+    with FrameReader(capture, queue_size=2) as reader:
+        frames = _read_all(reader)
+    assert [index for index, _, _ in frames] == list(range(50))
+    assert all(index == value and (frame == value).all() for index, value, frame in frames)
+    assert reader.frames_read == 50
+
+
+def test_stride_and_range():
+    capture = _FakeCapture(40)
+    # The capture is positioned at start_frame by the caller
+    capture.position = 5
+    with FrameReader(capture, start_frame=5, end_frame=30, stride=4) as reader:
+        frames = _read_all(reader)
+    assert [index for index, _, _ in frames] == [8, 12, 16, 20, 24, 28]
+    assert all(index == value for index, value, _ in frames)
+    # Skipped frames are grabbed but never retrieved
+    assert capture.retrieved == 6
+    assert reader.frames_skipped == 25 - 6
+
+
+def test_close_stops_the_reader_early():
+    capture = _FakeCapture(10_000)
+    reader = FrameReader(capture, queue_size=2)
+    for index, _ in reader:
+        if index == 3:
+            break
+    reader.close()
+    assert reader._thread is None
+    assert capture.position < 100
@@ -0,0 +1,70 @@
+import numpy as np
+from Workspace.BackEnd.Modes.inference_scheduler import InferenceScheduler
+from Workspace.Utilities import Utils
+
+FRAME_PERIOD = 1 / 30
+
+
+def _face(offset=0.0):
+    landmarks = np.full((1, Utils.landmark_count, 3), 0.5, dtype=np.float32)
+    landmarks[..., 0] += offset
+    return landmarks
+
+
+def _run(scheduler, frame_count, landmarks_at, ear=0.35, mar=0.1, inference_time=0.005):
+    decisions = []
+    for frame in range(frame_count):
+        timestamp = frame * FRAME_PERIOD
+        infer = scheduler.should_infer(timestamp)
+        decisions.append(infer)
+        if infer:
+            scheduler.record_inference(landmarks_at(timestamp), timestamp, inference_time)
+        else:
+            scheduler.predict_landmarks(timestamp)
+        scheduler.record_features(ear, mar)
+    return decisions
+
+
+def test_still_face_is_skipped_up_to_max_skip():
+    scheduler = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5, max_skip=3)
+    decisions = _run(scheduler, 40, lambda timestamp: _face())
+    # Two inferences are needed before landmarks can be extrapolated
+    assert decisions[:2] == [True, True]
+    # Then every fourth frame (max_skip=3 predicted frames in between)
+    assert decisions[2:] == [False, False, False, True] * 9 + [False, False]
+    assert scheduler.current_interval() == 4
+    assert scheduler.inferred_frames + scheduler.predicted_frames == 40
+
+
+def test_moving_face_and_budget_prevent_skipping():
+    moving = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5, motion_threshold=0.05)
+    assert all(_run(moving, 20, lambda timestamp: _face(0.5 * timestamp)))
+
+    # FaceMesh slower than the budget allows forces the longest interval
+    slow = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5, inference_budget=0.5, max_skip=3)
+    _run(slow, 5, lambda timestamp: _face(0.5 * timestamp), inference_time=0.1)
+    assert slow.current_interval() == 4
+
+
+def test_closing_eyes_and_opening_mouth_are_always_inferred():
+    low_ear = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5)
+    assert all(_run(low_ear, 20, lambda timestamp: _face(), ear=0.22))
+
+    high_mar = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5)
+    assert all(_run(high_mar, 20, lambda timestamp: _face(), mar=0.45))
+
+    # A falling EAR above the guard band still needs a real pass
+    falling = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5)
+    _run(falling, 10, lambda timestamp: _face())
+    falling.record_features(0.3, 0.1)
+    assert falling.should_infer(10 * FRAME_PERIOD)
+
+
+def test_landmarks_are_extrapolated_and_lost_faces_reinferred():
+    scheduler = InferenceScheduler(eye_threshold=0.2, mouth_threshold=0.5)
+    scheduler.record_inference(_face(0.0), 0.0, 0.005)
+    scheduler.record_inference(_face(0.1), 0.1, 0.005)
+    np.testing.assert_allclose(scheduler.predict_landmarks(0.2), _face(0.2), atol=1e-6)
+
+    scheduler.record_inference(np.empty((0, Utils.landmark_count, 3), dtype=np.float32), 0.3, 0.005)
+    assert scheduler.should_infer(0.4)
@@ -0,0 +1,52 @@
+import numpy as np
+from Workspace.BackEnd.DataProcessing.image_processsor import ImageProcessor
+from Workspace.BackEnd.DataProcessing.motion_gate import MotionGate
+from Workspace.Utilities import Utils
+
+
+class _CountingProcessor(ImageProcessor):
+    # Returns the frame brightness as landmarks instead of running FaceMesh
+    def __init__(self):
+        self.calls = 0
+
+    def process_face_image(self, image):
+        self.calls += 1
+        landmarks = np.full((1, Utils.landmark_count, 3), image.mean(), dtype=np.float32)
+        return image, None, landmarks
+
+
+def _frame(brightness):
+    return np.full((48, 64, 3), brightness, dtype=np.uint8)
+
+
+def test_unchanged_frames_reuse_the_previous_result():
+    processor = _CountingProcessor()
+    gate = MotionGate(processor, threshold=2.0)
+    results = [gate.process_face_image(_frame(brightness))[2][0, 0, 0]
+               for brightness in (100, 101, 100, 101, 110, 111)]
+    # Only the first frame and the clearly brighter one are processed
+    assert processor.calls == 2
+    assert results == [100, 100, 100, 100, 110, 110]
+    status = gate.get_status()
+    assert status["processed_frames"] == 2
+    assert status["skipped_frames"] == 4
+    assert status["last_difference"] == 1.0
+
+
+def test_reused_results_are_limited():
+    processor = _CountingProcessor()
+    gate = MotionGate(processor, threshold=2.0, max_reused_frames=2)
+    for _ in range(7):
+        gate.process_face_image(_frame(100))
+    # Processed, reused twice, processed, reused twice, processed
+    assert processor.calls == 3
+
+
+def test_reset_tracking_forgets_the_reference(monkeypatch):
+    processor = _CountingProcessor()
+    monkeypatch.setattr(processor, "reset_tracking", lambda: None)
+    gate = MotionGate(processor, threshold=2.0)
+    gate.process_face_image(_frame(100))
+    gate.reset_tracking()
+    gate.process_face_image(_frame(100))
+    assert processor.calls == 2
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from Workspace.BackEnd.DataProcessing.ParamFinder import AngleFinder, PerclosFinder, SaccadeVel, YawnFinder
+from Workspace.Utilities import Utils
+
+
+def _landmarks(frame_count=300):
+    # Slowly moving face with closed eyes and an open mouth in a few segments
+    rng = np.random.default_rng(1)
+    base = rng.random((Utils.landmark_count, 3)).astype(np.float32)
+    drift = np.cumsum(rng.normal(0.0, 0.002, (frame_count, Utils.landmark_count, 3)), axis=0)
+    landmarks = (base + drift).astype(np.float32)
+    for upper, lower in ((385, 380), (387, 373), (160, 144), (158, 153)):
+        landmarks[100:160, upper] = landmarks[100:160, lower]
+    # Upper lip on the lower one, except for one yawn
+    landmarks[:, [37, 0, 267]] = landmarks[:, [84, 17, 314]]
+    landmarks[200:230, [37, 0, 267], 1] -= 0.5
+    landmarks[50:70] = np.nan
+    landmarks[240] = np.nan
+    return landmarks
+
+
+def _timestamps(frame_count=300):
+    rng = np.random.default_rng(2)
+    return np.cumsum(rng.uniform(0.02, 0.05, frame_count))
+
+
+def _run_streaming(finder, landmarks, timestamps):
+    no_face = np.empty((0, Utils.landmark_count, 3), dtype=np.float32)
+    return [finder.find_parameter(no_face if np.isnan(frame[0, 0]) else frame[None], timestamp)
+            for frame, timestamp in zip(landmarks, timestamps)]
+
+
+def _run_batch(finder, landmarks, timestamps):
+    # Two batches, so the state carried between calls is checked as well
+    first = finder.find_parameters_batch(landmarks[:120], timestamps[:120])
+    second = finder.find_parameters_batch(landmarks[120:], timestamps[120:])
+    if isinstance(first, tuple):
+        return tuple(np.concatenate(parts) for parts in zip(first, second))
+    return np.concatenate((first, second))
+
+
+@pytest.mark.parametrize("finder_factory", [
+    lambda: PerclosFinder(0.2, (1.0, 3.0)),
+    lambda: YawnFinder(0.5),
+    lambda: AngleFinder(0.5, 1.0),
+])
+def test_batch_matches_streaming(finder_factory):
+    landmarks, timestamps = _landmarks(), _timestamps()
+    streaming = np.array(_run_streaming(finder_factory(), landmarks, timestamps), dtype=np.float64)
+    batch = _run_batch(finder_factory(), landmarks, timestamps)
+
+    for column, values in enumerate(batch):
+        np.testing.assert_allclose(values.astype(np.float64), streaming[:, column], rtol=1e-9, atol=1e-12)
+
+
+def test_perclos_and_yawns_are_detected():
+    landmarks, timestamps = _landmarks(), _timestamps()
+    perclos, _ = PerclosFinder(0.2, (3.0,)).find_parameters_batch(landmarks, timestamps)
+    is_yawning, yawn_counter, _ = YawnFinder(0.5).find_parameters_batch(landmarks, timestamps)
+    assert perclos.max() > 0.3
+    assert is_yawning[200:230].all()
+    assert not is_yawning[:200].any()
+    assert yawn_counter[-1] == 1
+
+
+def test_saccade_batch_matches_streaming():
+    landmarks, timestamps = _landmarks(), _timestamps()
+    streaming = np.array(_run_streaming(SaccadeVel(), landmarks, timestamps))
+    batch = _run_batch(SaccadeVel(), landmarks, timestamps)
+
+    np.testing.assert_allclose(batch, streaming, rtol=1e-9, atol=1e-12)
+    np.testing.assert_array_equal(batch[np.isnan(landmarks[:, 0, 0])], 0.0)
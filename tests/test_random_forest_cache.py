@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def _near_threshold_features(classifier, base_features):
+    # Features moved onto, just below and just above split thresholds of every feature,
+    # each vector followed by the same vector so that a cached prediction would be used
+    rng = np.random.default_rng(0)
+    resolution = classifier.cache_resolution
+    vectors = []
+    for column, thresholds in enumerate(classifier._split_thresholds):
+        for threshold in rng.choice(thresholds, size=20, replace=False):
+            base = base_features[rng.integers(len(base_features))].copy()
+            for offset in (-0.4, -1e-9, 0.0, 1e-9, 0.4):
+                vector = base.copy()
+                vector[column] = threshold + offset * resolution[column]
+                vectors.extend((vector, vector.copy()))
+    return np.array(vectors)
+
+
+def test_cached_predictions_match_uncached_near_thresholds(load_random_forest, validating_data):
+    classifier = load_random_forest(cache_size=64)
+    uncached = load_random_forest()
+    base_features = validating_data.to_numpy(dtype=np.float64)
+    features = np.concatenate((base_features, _near_threshold_features(classifier, base_features), base_features))
+
+    cached_predictions = [classifier.predict(vector) for vector in features]
+    expected = [uncached.predict(vector) for vector in features]
+    assert cached_predictions == expected
+    np.testing.assert_array_equal(uncached.predict_batch(features), expected)
+    assert classifier.cache_hits > 0
+    assert len(classifier._prediction_cache) <= classifier.cache_size
+
+
+def test_threshold_cells_are_not_cached(load_random_forest):
+    classifier = load_random_forest(cache_size=8)
+    threshold = classifier._split_thresholds[1][0]
+    vector = np.array([0.1, threshold, 0.0, 0.0])
+    cells = classifier._quantize(vector, classifier.cache_resolution)
+    assert not classifier._is_cacheable(cells, classifier.cache_resolution)
+
+    classifier.predict(vector)
+    classifier.predict(vector)
+    assert classifier.cache_hits == 0
+    assert not classifier._prediction_cache
+
+    assert classifier._quantize(np.array([np.nan, 0.0, 0.0, 0.0]), classifier.cache_resolution) is None
+
+
+def test_verify_cache_resolution(load_random_forest, validating_data):
+    classifier = load_random_forest()
+    report = classifier.verify_cache_resolution(validating_data, cache_size=64)
+    assert report["samples"] == len(validating_data)
+    assert report["mismatches"] == 0
@@ -0,0 +1,57 @@
+import numpy as np
+from Workspace.Utilities.rolling_window import RollingWindow
+
+
+def _push_one_by_one(window, values, timestamps):
+    sums, sizes = [], []
+    for value, timestamp in zip(values, timestamps):
+        window.push(value, timestamp)
+        sums.append([window.sum(index) for index in range(len(window.durations))])
+        sizes.append([window.size(index) for index in range(len(window.durations))])
+    return np.array(sums), np.array(sizes)
+
+
+def test_push_batch_matches_push():
+    rng = np.random.default_rng(0)
+    values = rng.random(500) * (rng.random(500) > 0.3)
+    timestamps = np.cumsum(rng.uniform(0.0, 0.1, 500))
+    durations = (0.5, 2.0, 10.0)
+
+    expected_window = RollingWindow(64, durations)
+    expected_sums, expected_sizes = _push_one_by_one(expected_window, values, timestamps)
+
+    # Batches of different lengths, continued by push() in the middle
+    window = RollingWindow(64, durations)
+    sums, sizes = [], []
+    for start, end in ((0, 7), (7, 200), (200, 201)):
+        batch_sums, batch_sizes = window.push_batch(values[start:end], timestamps[start:end])
+        sums.append(batch_sums)
+        sizes.append(batch_sizes)
+    one_sums, one_sizes = _push_one_by_one(window, values[201:260], timestamps[201:260])
+    sums.append(one_sums)
+    sizes.append(one_sizes)
+    batch_sums, batch_sizes = window.push_batch(values[260:], timestamps[260:])
+    sums.append(batch_sums)
+    sizes.append(batch_sizes)
+
+    np.testing.assert_array_equal(np.concatenate(sums), expected_sums)
+    np.testing.assert_array_equal(np.concatenate(sizes), expected_sizes)
+    for index in range(len(durations)):
+        assert window.count_true(index) == expected_window.count_true(index)
+        assert window.mean(index) == expected_window.mean(index)
+
+
+def test_capacity_limits_window_without_durations():
+    window = RollingWindow(3)
+    sums, sizes = window.push_batch(np.arange(1.0, 6.0), np.zeros(5))
+    np.testing.assert_array_equal(sums[:, 0], [1.0, 3.0, 6.0, 9.0, 12.0])
+    np.testing.assert_array_equal(sizes[:, 0], [1, 2, 3, 3, 3])
+    window.push(0.0)
+    assert window.sum() == 9.0
+    assert window.count_true() == 2
+    assert len(window) == 3
+
+    window.reset()
+    assert len(window) == 0
+    assert window.mean() == 0.0
+    assert not window.any()
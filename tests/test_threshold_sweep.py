@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from Workspace.BackEnd.DataProcessing.ParamFinder import PerclosFinder
+from Workspace.BackEnd.FileManagement.landmark_cache import LandmarkCache
+from Workspace.BackEnd.Modes.threshold_sweep import ThresholdSweep
+from Workspace.Utilities import Utils
+
+
+class _NeverDrowsy:
+    def predict_batch(self, features):
+        return np.zeros(len(features), dtype=bool)
+
+
+def test_swept_perclos_matches_perclos_finder(tmp_path):
+    fps, stride = 30.0, 2
+    rng = np.random.default_rng(0)
+    landmarks = rng.random((900, Utils.landmark_count, 3)).astype(np.float32)
+    # Eyes closed (upper eyelid on the lower one) for a few seconds at a time
+    for upper, lower in ((385, 380), (387, 373), (160, 144), (158, 153)):
+        landmarks[400:550, upper] = landmarks[400:550, lower]
+        landmarks[700:760, upper] = landmarks[700:760, lower]
+    landmarks[200:260] = np.nan
+    labels = np.zeros(len(landmarks), dtype=bool)
+    labels[450:] = True
+
+    cache = LandmarkCache(tmp_path / "cache")
+    writer = cache.create("video", len(landmarks), Utils.landmark_count,
+                          {"fps": fps, "frame_stride": stride})
+    writer.write(0, landmarks)
+    writer.commit(len(landmarks))
+    result_file = tmp_path / "video.csv"
+    pd.DataFrame({"Drowsy": labels.astype(int)}).to_csv(result_file, index=False)
+
+    # A band with equal bounds leaves the decision to PERCLOS alone
+    sweep = ThresholdSweep(cache, perclos_thresholds=(0.25, 0.3),
+                           perclos_windows=(5.0, 10.0),
+                           perclos_bands=((0.2, 0.2),))
+    series = ThresholdSweep.load_series(cache, "video", result_file,
+                                        _NeverDrowsy(), sweep.grid)
+    result = ThresholdSweep.evaluate_series(series, sweep.grid)
+
+    # Grid point: threshold 0.3, window 10 s, run frame by frame
+    finder = PerclosFinder(0.3, (10.0,))
+    no_face = np.empty((0, Utils.landmark_count, 3), dtype=np.float32)
+    expected = np.array([
+        finder.find_parameter(no_face if np.isnan(frame[0, 0]) else frame[None],
+                              row * stride / fps)[0]
+        for row, frame in enumerate(landmarks)])
+    assert expected.max() > 0.2
+
+    np.testing.assert_allclose(series["perclos"][1, 1], expected)
+    predictions = expected >= 0.2
+    index = (1, 1, 0, 0, 0)
+    assert result["true_positives"][index] == (predictions & labels).sum()
+    assert result["false_positives"][index] == (predictions & ~labels).sum()
+    assert result["true_negatives"][index] == (~predictions & ~labels).sum()
+    assert result["false_negatives"][index] == (~predictions & labels).sum()